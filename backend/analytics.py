@@ -0,0 +1,291 @@
+"""
+Zone occupancy, line-crossing and dwell-time analytics.
+
+Zones (polygons) and lines are configured per source in normalised 0..1
+image coordinates and persisted to ``analytics.json``.  Every frame the
+detection loop passes the tracked boxes as one array; membership and
+crossings are computed with NumPy over all boxes at once, so the cost
+stays flat as crowds grow.  Each person is represented by the bottom
+centre of their box (where their feet touch the floor).
+"""
+
+import json
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+_EPS = 1e-9
+
+
+def _inside_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Ray-casting point-in-polygon for (N, 2) points -> (N,) bool."""
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    xi, yi = polygon[:, 0][None, :], polygon[:, 1][None, :]
+    xj, yj = np.roll(polygon[:, 0], 1)[None, :], np.roll(polygon[:, 1], 1)[None, :]
+    crosses = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi + _EPS) + xi)
+    return (crosses.sum(axis=1) % 2) == 1
+
+
+def _orient(a: np.ndarray, b: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """Twice the signed area of triangle (a, b, p), broadcasting over leading axes."""
+    return (b[..., 0] - a[..., 0]) * (p[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (p[..., 0] - a[..., 0])
+
+
+def _validate_config(config: dict) -> dict:
+    """Normalise a {zones, lines} config; raises ValueError on bad input."""
+    zones = []
+    for i, z in enumerate(config.get("zones", [])):
+        points = np.asarray(z.get("points", []), dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+            raise ValueError(f"zone {i}: needs at least 3 [x, y] points")
+        if points.min() < 0 or points.max() > 1:
+            raise ValueError(f"zone {i}: points must be normalised to 0..1")
+        zones.append({
+            "name": str(z.get("name") or f"zone{i + 1}"),
+            "points": points.tolist(),
+            "record": bool(z.get("record", False)),
+        })
+    lines = []
+    for i, ln in enumerate(config.get("lines", [])):
+        points = np.asarray(ln.get("points", []), dtype=np.float64)
+        if points.shape != (2, 2):
+            raise ValueError(f"line {i}: needs exactly 2 [x, y] points")
+        if points.min() < 0 or points.max() > 1:
+            raise ValueError(f"line {i}: points must be normalised to 0..1")
+        lines.append({"name": str(ln.get("name") or f"line{i + 1}"), "points": points.tolist()})
+    names = [z["name"] for z in zones] + [ln["name"] for ln in lines]
+    if len(set(names)) != len(names):
+        raise ValueError("zone and line names must be unique")
+    return {"zones": zones, "lines": lines}
+
+
+class _TrackState:
+    __slots__ = ("point", "last_seen", "entered", "last_inside")
+
+    def __init__(self, n_zones: int) -> None:
+        self.point: np.ndarray | None = None
+        self.last_seen = 0.0
+        self.entered = np.full(n_zones, np.nan)       # zone entry time, nan = outside
+        self.last_inside = np.full(n_zones, np.nan)
+
+
+class AnalyticsEngine:
+    """Per-frame zone / line analytics for one active source.
+
+    Tracks unseen for *ttl* seconds are treated as gone: any open dwell is
+    closed at the last time they were inside, and their state is dropped.
+    """
+
+    def __init__(self, config_path: Path, ttl: float = 10.0) -> None:
+        self._path = config_path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._configs: dict[str, dict] = {}
+        if self._path.exists():
+            try:
+                self._configs = json.loads(self._path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._configs = {}
+        self._source: str | None = None
+        self._apply(None)
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    def get_config(self, source: str) -> dict:
+        with self._lock:
+            return self._configs.get(source, {"zones": [], "lines": []})
+
+    def set_config(self, source: str, config: dict) -> dict:
+        config = _validate_config(config)
+        with self._lock:
+            self._configs[source] = config
+            self._path.write_text(json.dumps(self._configs, indent=2), encoding="utf-8")
+            if source == self._source:
+                self._apply(source)
+        return config
+
+    def _apply(self, source: str | None) -> None:
+        """(Re)build geometry and reset counters for *source*.  Lock must be held."""
+        config = self._configs.get(source, {"zones": [], "lines": []}) if source is not None else {"zones": [], "lines": []}
+        self._source = source
+        self._zones = config["zones"]
+        self._lines = config["lines"]
+        self._zone_polys = [np.asarray(z["points"], dtype=np.float64) for z in self._zones]
+        if self._lines:
+            pts = np.asarray([ln["points"] for ln in self._lines], dtype=np.float64)
+            self._line_a, self._line_b = pts[:, 0], pts[:, 1]
+        else:
+            self._line_a = self._line_b = np.empty((0, 2))
+        nz, nl = len(self._zones), len(self._lines)
+        self._tracks: OrderedDict[int, _TrackState] = OrderedDict()   # by last seen
+        self._occupancy = np.zeros(nz, dtype=np.int64)
+        self._entered = np.zeros(nz, dtype=np.int64)
+        self._exited = np.zeros(nz, dtype=np.int64)
+        self._dwell_total = np.zeros(nz)
+        self._dwell_max = np.zeros(nz)
+        self._line_in = np.zeros(nl, dtype=np.int64)
+        self._line_out = np.zeros(nl, dtype=np.int64)
+        self._publish()
+
+    def reset(self, source: str) -> None:
+        """Start a fresh session on *source* (counters and track state cleared)."""
+        with self._lock:
+            self._apply(source)
+
+    # ------------------------------------------------------------------
+    # Per-frame update
+    # ------------------------------------------------------------------
+
+    def update(self, ts: float, width: int, height: int, track_ids: np.ndarray, boxes: np.ndarray) -> list[dict]:
+        """Process one frame of (N,) track IDs and (N, 4) xyxy boxes; return events."""
+        with self._lock:
+            if not self._zones and not self._lines:
+                return []
+            events: list[dict] = []
+            n = len(track_ids)
+            if n:
+                points = np.empty((n, 2))
+                points[:, 0] = (boxes[:, 0] + boxes[:, 2]) / (2.0 * width)
+                points[:, 1] = boxes[:, 3] / float(height)
+            else:
+                points = np.empty((0, 2))
+
+            states = []
+            for tid in track_ids.tolist():
+                state = self._tracks.get(tid)
+                if state is None:
+                    state = _TrackState(len(self._zones))
+                    self._tracks[tid] = state
+                else:
+                    self._tracks.move_to_end(tid)
+                state.last_seen = ts
+                states.append(state)
+
+            if self._zones:
+                self._update_zones(ts, track_ids, points, states, events)
+            if self._lines and n:
+                self._update_lines(ts, track_ids, points, states, events)
+
+            for state, point in zip(states, points):
+                state.point = point
+            self._expire(ts, events)
+            self._publish()
+            return events
+
+    def _update_zones(self, ts, track_ids, points, states, events) -> None:
+        n, nz = len(points), len(self._zones)
+        inside = np.zeros((n, nz), dtype=bool)
+        for z, poly in enumerate(self._zone_polys):
+            if n:
+                inside[:, z] = _inside_polygon(points, poly)
+        self._occupancy = inside.sum(axis=0)
+        if not n:
+            return
+        entered = np.stack([s.entered for s in states])          # (N, Z)
+        was_inside = ~np.isnan(entered)
+        enters = inside & ~was_inside
+        exits = ~inside & was_inside
+
+        for i, z in zip(*np.nonzero(enters)):
+            states[i].entered[z] = ts
+            self._entered[z] += 1
+            events.append({"type": "zone_enter", "zone": self._zones[z]["name"],
+                           "track_id": int(track_ids[i]), "ts": ts})
+        for i, z in zip(*np.nonzero(exits)):
+            self._close_dwell(states[i], int(track_ids[i]), z, states[i].last_inside[z], events)
+        for i, z in zip(*np.nonzero(inside)):
+            states[i].last_inside[z] = ts
+
+    def _close_dwell(self, state: _TrackState, track_id: int, z: int, left_at: float, events: list[dict]) -> None:
+        dwell = max(0.0, float(left_at - state.entered[z]))
+        state.entered[z] = np.nan
+        state.last_inside[z] = np.nan
+        self._exited[z] += 1
+        self._dwell_total[z] += dwell
+        self._dwell_max[z] = max(self._dwell_max[z], dwell)
+        events.append({"type": "zone_exit", "zone": self._zones[z]["name"], "track_id": track_id,
+                       "ts": float(left_at), "dwell": round(dwell, 2)})
+
+    def _update_lines(self, ts, track_ids, points, states, events) -> None:
+        has_prev = np.array([s.point is not None for s in states])
+        if not has_prev.any():
+            return
+        idx = np.flatnonzero(has_prev)
+        p = np.stack([states[i].point for i in idx])[:, None, :]   # (M, 1, 2)
+        q = points[idx][:, None, :]
+        a, b = self._line_a[None, :, :], self._line_b[None, :, :]   # (1, L, 2)
+        o1, o2 = _orient(a, b, p), _orient(a, b, q)                 # (M, L)
+        o3, o4 = _orient(p, q, a), _orient(p, q, b)
+        # Image y points down, so orient > 0 is the right of A->B as seen on
+        # screen.  A point exactly on the line counts as being on its left,
+        # so a track stepping onto the line and then off it is counted once.
+        right_before, right_now = o1 > 0, o2 > 0
+        crossed = (right_before != right_now) & (o3 * o4 <= 0)
+        for m, ln in zip(*np.nonzero(crossed)):
+            # moving from the right of A->B to its left counts as "in"
+            direction = "out" if right_now[m, ln] else "in"
+            if direction == "in":
+                self._line_in[ln] += 1
+            else:
+                self._line_out[ln] += 1
+            events.append({"type": "line_cross", "line": self._lines[ln]["name"], "direction": direction,
+                           "track_id": int(track_ids[idx[m]]), "ts": ts})
+
+    def _expire(self, now: float, events: list[dict]) -> None:
+        """Drop lost tracks, closing any open dwell.  Lock must be held."""
+        cutoff = now - self._ttl
+        while self._tracks:
+            tid, state = next(iter(self._tracks.items()))
+            if state.last_seen >= cutoff:
+                break
+            del self._tracks[tid]
+            for z in np.flatnonzero(~np.isnan(state.entered)):
+                self._close_dwell(state, tid, int(z), state.last_inside[z], events)
+
+    def flush(self) -> list[dict]:
+        """Treat every track as gone, closing open dwells (end of a clip)."""
+        events: list[dict] = []
+        with self._lock:
+            self._expire(math.inf, events)
+            self._publish()
+        return events
+
+    def zones_to_record(self, events: list[dict]) -> list[str]:
+        """Names of zones with recording enabled that were entered in *events*."""
+        with self._lock:
+            flagged = {z["name"] for z in self._zones if z["record"]}
+        return [e["zone"] for e in events if e["type"] == "zone_enter" and e["zone"] in flagged]
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Counters as of the last update(); published by reference, so
+        readers never wait for the detection loop.  Treat it as read-only."""
+        return self._snapshot
+
+    def _publish(self) -> None:
+        """Replace the snapshot with the current counters.  Lock must be held."""
+        zones = []
+        for z, zone in enumerate(self._zones):
+            exited = int(self._exited[z])
+            zones.append({
+                "name": zone["name"],
+                "occupancy": int(self._occupancy[z]) if z < len(self._occupancy) else 0,
+                "entered": int(self._entered[z]),
+                "exited": exited,
+                "avg_dwell": round(float(self._dwell_total[z]) / exited, 2) if exited else 0.0,
+                "max_dwell": round(float(self._dwell_max[z]), 2),
+            })
+        lines = [
+            {"name": ln["name"], "in": int(self._line_in[i]), "out": int(self._line_out[i])}
+            for i, ln in enumerate(self._lines)
+        ]
+        self._snapshot = {"zones": zones, "lines": lines}
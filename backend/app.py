@@ -2,15 +2,19 @@
 FastAPI application — serves the React frontend and the detection API.
 """
 
+import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 
-from backend.detector import DetectionEngine
-from backend.routes import stream, controls, settings, stats, screenshots, faces
+from backend.cluster import Coordinator, parse_address
+from backend.detector import DetectionEngine, _writable_dir
+from backend.engine_process import EngineProcess, EngineUnavailable
+from backend.routes import stream, controls, settings, stats, screenshots, faces, recording, history, analytics, analysis, metrics, profile, health, resources, cluster
 
 
 def _find_frontend_dist() -> Path:
@@ -20,22 +24,72 @@ def _find_frontend_dist() -> Path:
     return Path(__file__).resolve().parent.parent / "frontend" / "dist"
 
 
-# Single shared engine instance
-engine = DetectionEngine()
+FRONTEND_DIST = _find_frontend_dist()
 
-app = FastAPI(title="Person Detection System")
 
-# Register API routes under /api
-for module in (stream, controls, settings, stats, screenshots, faces):
-    app.include_router(module.create_router(engine), prefix="/api")
+def create_app(engine: DetectionEngine | EngineProcess, serve_frontend: bool = True,
+               coordinator: Coordinator | None = None) -> FastAPI:
+    """Build the FastAPI app around *engine* (the load test uses its own),
+    with the cluster API when a *coordinator* is given."""
 
-# Serve built React frontend (production)
-FRONTEND_DIST = _find_frontend_dist()
-if FRONTEND_DIST.is_dir():
-    # Serve static assets (JS/CSS/images)
-    app.mount("/assets", StaticFiles(directory=FRONTEND_DIST / "assets"), name="assets")
-
-    # Catch-all: serve index.html for any non-API route (SPA routing)
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        return FileResponse(FRONTEND_DIST / "index.html")
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        # returns at once: the model loads while the server starts listening
+        engine.warm_up()
+        if coordinator is not None:
+            coordinator.start()
+        yield
+        if coordinator is not None:
+            coordinator.shutdown()
+        engine.shutdown()
+
+    app = FastAPI(title="Person Detection System", lifespan=lifespan)
+
+    @app.exception_handler(EngineUnavailable)
+    async def engine_unavailable(_request: Request, exc: EngineUnavailable):
+        # the engine process crashed and is being restarted
+        return JSONResponse({"status": "error", "message": str(exc)}, status_code=503)
+
+    # Register API routes under /api
+    for module in (stream, controls, settings, stats, screenshots, faces, recording, history, analytics, analysis,
+                   metrics, profile, health, resources):
+        app.include_router(module.create_router(engine), prefix="/api")
+    if coordinator is not None:
+        app.include_router(cluster.create_router(coordinator), prefix="/api")
+
+    # Serve built React frontend (production)
+    if serve_frontend and FRONTEND_DIST.is_dir():
+        # Serve static assets (JS/CSS/images)
+        app.mount("/assets", StaticFiles(directory=FRONTEND_DIST / "assets"), name="assets")
+
+        # Catch-all: serve index.html for any non-API route (SPA routing)
+        @app.get("/{full_path:path}")
+        async def serve_spa(full_path: str):
+            return FileResponse(FRONTEND_DIST / "index.html")
+
+    return app
+
+
+def _create_engine() -> DetectionEngine | EngineProcess:
+    """DETECTOR_ENGINE=process runs detection in its own process, so API
+    traffic can't slow it down (see engine_process.py)."""
+    if os.environ.get("DETECTOR_ENGINE", "thread").lower() == "process":
+        return EngineProcess()
+    return DetectionEngine()
+
+
+def _create_coordinator() -> Coordinator | None:
+    """DETECTOR_COORDINATOR=[host]:port accepts detection workers there
+    (see cluster.py); DETECTOR_CLUSTER_TOKEN is their shared secret, and is
+    required unless the host is loopback (the default)."""
+    address = os.environ.get("DETECTOR_COORDINATOR")
+    if not address:
+        return None
+    host, port = parse_address(address)
+    return Coordinator(_writable_dir() / "cluster.json", host, port, os.environ.get("DETECTOR_CLUSTER_TOKEN"))
+
+
+# Single shared engine instance; cheap to create, the model loads in the
+# background once the server starts (see GET /api/health)
+engine = _create_engine()
+app = create_app(engine, coordinator=_create_coordinator())
@@ -0,0 +1,521 @@
+"""
+Coordinator — spreads camera sources over detection workers on other machines.
+
+One machine can only run YOLO on so many cameras.  In cluster mode the
+server also listens for worker nodes (``python -m backend.worker``) on a
+TCP port.  Each source (camera index, stream URL or video file, as seen
+from the worker) is assigned to the worker with the most free capacity;
+the worker runs detection on it and streams back a compact result per
+frame plus a small JPEG thumbnail a couple of times a second.
+
+Sources are moved when their worker disconnects or stops sending
+heartbeats, and when a worker falls behind (sustained FPS well below the
+source's) while another worker has room.  The source list is persisted.
+
+Wire format, both directions: an 8-byte header with the JSON length and the
+binary payload length (big-endian), the JSON object (``{"type": ..., ...}``)
+and the payload (a thumbnail, or nothing).
+"""
+
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from backend.trackers import DEFAULT_TRACKER, TRACKERS
+
+_HEADER = struct.Struct(">II")
+_MAX_MESSAGE = 16 * 1024 * 1024
+
+_HEARTBEAT_INTERVAL = 1.0    # seconds between worker heartbeats
+_HEARTBEAT_TIMEOUT = 5.0     # a worker silent this long is dropped
+_RETRY_FAILED = 30.0         # seconds before a source that failed to open is tried again
+_BEHIND_RATIO = 0.7          # below this share of the source FPS a source is behind...
+_BEHIND_SECONDS = 10.0       # ...once it stays there this long
+_MOVE_COOLDOWN = 30.0        # minimum seconds between moves of one source
+
+DEFAULT_PORT = 8765
+
+
+# ----------------------------------------------------------------------
+# Wire protocol
+# ----------------------------------------------------------------------
+
+def send_message(sock: socket.socket, kind: str, data: dict | None = None, payload: bytes = b"") -> None:
+    body = json.dumps({"type": kind, **(data or {})}, separators=(",", ":")).encode()
+    sock.sendall(_HEADER.pack(len(body), len(payload)) + body + payload)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> tuple[dict, bytes]:
+    """The next (message, payload); raises ConnectionError when closed."""
+    body_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if body_len + payload_len > _MAX_MESSAGE:
+        raise ConnectionError(f"message of {body_len + payload_len} bytes is too large")
+    message = json.loads(_recv_exact(sock, body_len))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return message, payload
+
+
+def hang_up(sock: socket.socket) -> None:
+    """Close *sock*, waking a thread blocked reading it."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+def parse_address(value: str, default_port: int = DEFAULT_PORT) -> tuple[str, int]:
+    """``host:port``, ``host`` or ``:port`` -> (host, port); the host
+    defaults to loopback."""
+    host, _, port = value.rpartition(":") if ":" in value else (value, "", "")
+    return host or "127.0.0.1", int(port) if port else default_port
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# ----------------------------------------------------------------------
+# Coordinator
+# ----------------------------------------------------------------------
+
+@dataclass
+class _Worker:
+    name: str
+    sock: socket.socket
+    address: str
+    capacity: int
+    cores: int | None
+    connected_at: float
+    last_seen: float
+    sources: set[str] = field(default_factory=set)
+    send_lock: threading.Lock = field(default_factory=threading.Lock)
+    load: float | None = None
+
+
+@dataclass
+class _Source:
+    id: str
+    spec: dict
+    worker: str | None = None
+    state: str = "pending"       # pending, assigned, running, error
+    error: str | None = None
+    retry_at: float = 0.0
+    assigned_at: float = 0.0
+    last_move: float = 0.0
+    moves: int = 0
+    seq: int = 0                 # the worker's frame count: restarts with every assignment
+    assignments: int = 0
+    updated: float = 0.0
+    fps: float = 0.0
+    source_fps: float | None = None
+    people: int = 0
+    tracks: list = field(default_factory=list)
+    behind_since: float | None = None
+    thumbnail: bytes | None = None
+    thumbnail_version: str = ""
+
+
+class Coordinator:
+    """Accepts worker connections, assigns sources and aggregates results."""
+
+    def __init__(self, path: Path, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 token: str | None = None) -> None:
+        if not token and not _is_loopback(host):
+            # anyone who can reach the port could join and receive the camera URLs
+            raise ValueError(f"a cluster token is required to accept workers on {host}")
+        self._path = path
+        self._host = host
+        self._port = port
+        self._token = token
+        self._lock = threading.Lock()
+        self._workers: dict[str, _Worker] = {}
+        self._sources: dict[str, _Source] = {}
+        self._server: socket.socket | None = None
+        self._closing = threading.Event()
+        self._events: list[dict] = []        # recent joins, drops and moves
+        self._epoch = os.urandom(4).hex()    # thumbnail ETags must not repeat after a restart
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    def start(self) -> None:
+        server = socket.create_server((self._host, self._port))
+        self._port = server.getsockname()[1]
+        self._server = server
+        threading.Thread(target=self._accept, name="cluster-accept", daemon=True).start()
+        threading.Thread(target=self._monitor, name="cluster-monitor", daemon=True).start()
+        print(f"[cluster] coordinator listening on {self._host}:{self._port}", flush=True)
+
+    def shutdown(self) -> None:
+        self._closing.set()
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            hang_up(worker.sock)
+
+    def _accept(self) -> None:
+        while not self._closing.is_set():
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(
+                target=self._serve_worker, args=(sock, f"{address[0]}:{address[1]}"),
+                name="cluster-worker", daemon=True,
+            ).start()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _serve_worker(self, sock: socket.socket, address: str) -> None:
+        # covers sends too: a worker that neither reads nor writes for this
+        # long is dropped and its sources go elsewhere
+        sock.settimeout(_HEARTBEAT_TIMEOUT)
+        worker = None
+        try:
+            hello, _ = recv_message(sock)
+            if hello.get("type") != "hello":
+                raise ConnectionError("expected hello")
+            if self._token and not hmac.compare_digest(str(hello.get("token") or "").encode(), self._token.encode()):
+                send_message(sock, "reject", {"message": "bad token"})
+                raise ConnectionError("bad token")
+            name = str(hello.get("name") or address)
+            now = time.time()
+            joining = _Worker(
+                name=name, sock=sock, address=address,
+                capacity=max(1, int(hello.get("capacity", 1))), cores=hello.get("cores"),
+                connected_at=now, last_seen=now,
+            )
+            with self._lock:
+                duplicate = name in self._workers
+                if not duplicate:
+                    self._workers[name] = joining
+                    self._log("worker_joined", worker=name, address=address, capacity=joining.capacity)
+            if duplicate:
+                # sent without the lock: a peer that doesn't read must not stall result handling
+                send_message(sock, "reject", {"message": f"a worker named {name} is connected"})
+                raise ConnectionError(f"duplicate worker name {name}")
+            worker = joining
+            self._send(worker, "welcome", {"heartbeat_interval": _HEARTBEAT_INTERVAL})
+            self._assign_pending()
+
+            while True:
+                message, payload = recv_message(sock)
+                kind = message.get("type")
+                with self._lock:
+                    worker.last_seen = time.time()
+                    if kind == "result":
+                        self._on_result(worker, message, payload)
+                    elif kind == "heartbeat":
+                        worker.load = message.get("load")
+                    elif kind == "failed":
+                        self._on_failed(worker, message)
+        except (OSError, ConnectionError, ValueError) as e:
+            if worker is None:
+                print(f"[cluster] rejected {address}: {e}", flush=True)
+        finally:
+            sock.close()
+            if worker is not None:
+                self._drop_worker(worker)
+
+    def _send(self, worker: _Worker, kind: str, data: dict) -> bool:
+        """Send to *worker*; a failed send disconnects it."""
+        try:
+            with worker.send_lock:
+                send_message(worker.sock, kind, data)
+            return True
+        except OSError:
+            hang_up(worker.sock)    # its reader thread drops it
+            return False
+
+    def _drop_worker(self, worker: _Worker) -> None:
+        with self._lock:
+            if self._workers.get(worker.name) is not worker:
+                return
+            del self._workers[worker.name]
+            orphans = sorted(worker.sources)
+            for source_id in orphans:
+                source = self._sources.get(source_id)
+                if source is not None and source.worker == worker.name:
+                    source.worker = None
+                    source.state = "pending"
+            self._log("worker_lost", worker=worker.name, sources=orphans)
+        if self._closing.is_set():
+            return
+        print(f"[cluster] worker {worker.name} disconnected; reassigning {len(orphans)} source(s)", flush=True)
+        self._assign_pending()
+
+    def _on_result(self, worker: _Worker, message: dict, payload: bytes) -> None:
+        """Store a frame result; lock held."""
+        source = self._sources.get(message.get("source_id"))
+        if source is None or source.worker != worker.name:
+            return                  # removed or moved meanwhile
+        source.state = "running"
+        source.error = None
+        source.seq = int(message.get("seq", source.seq + 1))
+        source.updated = time.time()
+        source.fps = float(message.get("fps", 0.0))
+        source.source_fps = message.get("source_fps")
+        source.people = int(message.get("people", 0))
+        source.tracks = message.get("tracks", [])
+        if payload:
+            source.thumbnail = payload
+            source.thumbnail_version = f"{self._epoch}-{source.assignments}-{source.seq}"
+
+    def _on_failed(self, worker: _Worker, message: dict) -> None:
+        """A worker could not run a source (e.g. cannot open it); lock held."""
+        source = self._sources.get(message.get("source_id"))
+        if source is None or source.worker != worker.name:
+            return
+        worker.sources.discard(source.id)
+        source.worker = None
+        source.state = "error"
+        source.error = f"{worker.name}: {message.get('error')}"
+        source.retry_at = time.time() + _RETRY_FAILED
+        self._log("source_failed", source=source.id, worker=worker.name, error=message.get("error"))
+
+    # ------------------------------------------------------------------
+    # Assignment
+    # ------------------------------------------------------------------
+
+    def _pick_worker(self, exclude: str | None = None) -> _Worker | None:
+        """The worker with the most free capacity; lock held."""
+        candidates = [
+            w for w in self._workers.values()
+            if w.name != exclude and len(w.sources) < w.capacity
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda w: (w.capacity - len(w.sources), -len(w.sources), -w.connected_at))
+
+    def _assign(self, source: _Source, worker: _Worker, now: float) -> tuple[_Worker, str, dict]:
+        """Book *source* on *worker*; lock held.  Returns the _send() arguments."""
+        worker.sources.add(source.id)
+        source.worker = worker.name
+        source.state = "assigned"
+        source.assigned_at = now
+        source.assignments += 1
+        source.behind_since = None
+        source.fps = 0.0
+        return worker, "assign", {"source_id": source.id, "spec": source.spec}
+
+    def _assign_pending(self) -> None:
+        now = time.time()
+        messages = []
+        with self._lock:
+            for source in self._sources.values():
+                if source.worker is not None or (source.state == "error" and now < source.retry_at):
+                    continue
+                worker = self._pick_worker()
+                if worker is None:
+                    break
+                messages.append(self._assign(source, worker, now))
+                self._log("source_assigned", source=source.id, worker=worker.name)
+        for message in messages:
+            self._send(*message)
+
+    def _move_lagging(self) -> None:
+        """Move one source off a worker that can't keep up, if another has room."""
+        now = time.time()
+        move = None
+        with self._lock:
+            for source in self._sources.values():
+                if source.state != "running" or not source.source_fps:
+                    source.behind_since = None
+                    continue
+                if source.fps >= _BEHIND_RATIO * source.source_fps:
+                    source.behind_since = None
+                    continue
+                if source.behind_since is None:
+                    source.behind_since = now
+                if (move is None and now - source.behind_since >= _BEHIND_SECONDS
+                        and now - max(source.last_move, source.assigned_at) >= _MOVE_COOLDOWN):
+                    target = self._pick_worker(exclude=source.worker)
+                    if target is not None:
+                        move = (source, self._workers[source.worker], target)
+            if move is None:
+                return
+            source, old, new = move
+            old.sources.discard(source.id)
+            source.last_move = now
+            source.moves += 1
+            self._log("source_moved", source=source.id, from_worker=old.name, to_worker=new.name,
+                      fps=round(source.fps, 1), source_fps=source.source_fps)
+            assignment = self._assign(source, new, now)
+        print(f"[cluster] {source.id} falls behind on {old.name}; moving it to {new.name}", flush=True)
+        self._send(old, "unassign", {"source_id": source.id})
+        self._send(*assignment)
+
+    def _monitor(self) -> None:
+        """Retry failed sources and move lagging ones (silent workers time
+        out in their reader threads)."""
+        while not self._closing.wait(1.0):
+            self._assign_pending()
+            self._move_lagging()
+
+    # ------------------------------------------------------------------
+    # Sources (API)
+    # ------------------------------------------------------------------
+
+    def add_source(self, data: dict) -> dict:
+        source = str(data.get("source", "")).strip()
+        if not source:
+            return {"status": "error", "message": "source is required"}
+        tracker = str(data.get("tracker") or DEFAULT_TRACKER)
+        if tracker not in TRACKERS:
+            return {"status": "error", "message": f"Unknown tracker '{tracker}'"}
+        try:
+            fps = float(data["fps"]) if data.get("fps") else None
+            confidence = max(0.1, min(0.95, float(data.get("confidence", 0.45))))
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "fps and confidence must be numbers"}
+        spec = {
+            "source": source,
+            "name": str(data.get("name") or source),
+            "loop": bool(data.get("loop", False)),
+            "fps": fps,
+            "model_name": str(data.get("model_name") or "yolov8n.pt"),
+            "confidence": confidence,
+            "tracker": tracker,
+        }
+        source_id = uuid.uuid4().hex[:8]
+        with self._lock:
+            self._sources[source_id] = _Source(id=source_id, spec=spec)
+            self._save()
+        self._assign_pending()
+        return {"status": "ok", "source_id": source_id, **spec}
+
+    def remove_source(self, source_id: str) -> dict:
+        with self._lock:
+            source = self._sources.pop(source_id, None)
+            if source is None:
+                return {"status": "error", "message": f"Source '{source_id}' not found"}
+            worker = self._workers.get(source.worker) if source.worker else None
+            if worker is not None:
+                worker.sources.discard(source_id)
+            self._save()
+        if worker is not None:
+            self._send(worker, "unassign", {"source_id": source_id})
+        self._assign_pending()
+        return {"status": "ok"}
+
+    def thumbnail(self, source_id: str) -> tuple[bytes, str] | None:
+        """(jpeg, version) of the newest thumbnail of a source; the version
+        is unique across reassignments and coordinator restarts."""
+        with self._lock:
+            source = self._sources.get(source_id)
+            if source is None or source.thumbnail is None:
+                return None
+            return source.thumbnail, source.thumbnail_version
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            workers = [
+                {
+                    "name": w.name,
+                    "address": w.address,
+                    "capacity": w.capacity,
+                    "cores": w.cores,
+                    "sources": sorted(w.sources),
+                    "load": w.load,
+                    "fps": round(sum(self._sources[s].fps for s in w.sources if s in self._sources), 1),
+                    "connected_for": round(now - w.connected_at, 1),
+                    "last_seen": round(now - w.last_seen, 2),
+                }
+                for w in self._workers.values()
+            ]
+            sources = [
+                {
+                    "source_id": s.id,
+                    **s.spec,
+                    "worker": s.worker,
+                    "state": s.state,
+                    "error": s.error,
+                    "fps": round(s.fps, 1),
+                    "source_fps": s.source_fps,
+                    "behind": s.behind_since is not None,
+                    "people": s.people,
+                    "tracks": s.tracks,
+                    "seq": s.seq,
+                    "age": round(now - s.updated, 2) if s.updated else None,
+                    "moves": s.moves,
+                }
+                for s in self._sources.values()
+            ]
+            events = list(self._events)
+        running = [s for s in sources if s["state"] == "running"]
+        return {
+            "port": self._port,
+            "workers": workers,
+            "sources": sources,
+            "totals": {
+                "workers": len(workers),
+                "capacity": sum(w["capacity"] for w in workers),
+                "sources": len(sources),
+                "running": len(running),
+                "people": sum(s["people"] for s in running),
+                "fps": round(sum(s["fps"] for s in running), 1),
+            },
+            "events": events,
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence / log
+    # ------------------------------------------------------------------
+
+    def _log(self, kind: str, **data) -> None:
+        """Remember a cluster event for status(); lock held."""
+        self._events.append({"type": kind, "time": time.time(), **data})
+        del self._events[:-50]
+
+    def _load(self) -> None:
+        if not self._path.is_file():
+            return
+        try:
+            for item in json.loads(self._path.read_text()).get("sources", []):
+                self._sources[item["source_id"]] = _Source(id=item["source_id"], spec=item["spec"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[cluster] ignoring {self._path.name}: {e}", flush=True)
+
+    def _save(self) -> None:
+        """Persist the source list; lock held."""
+        data = {"sources": [{"source_id": s.id, "spec": s.spec} for s in self._sources.values()]}
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2))
+        os.replace(tmp, self._path)
@@ -0,0 +1,184 @@
+"""
+DetectionCache — persistent per-frame YOLO detections for recorded sources.
+
+Raw detections (before tracking) are keyed by the source file's content
+hash, the frame index, the model and the confidence threshold, so
+re-analysing the same clip with different tracking, analytics or
+rendering options skips inference entirely.  Frames are grouped into
+fixed-size blocks, one small ``.npz`` per block, under one folder per
+(source, model, confidence) key.  The cache is safe to use from several
+worker processes at once; eviction (least recently used key first, by
+total size) runs in the parent process.
+
+Layout::
+
+    cache/detections/<key>/block_000012.npz   frames 12*256 .. 13*256-1
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+_BLOCK_FRAMES = 256
+_MAX_BYTES = 1024 ** 3
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's content, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """Size-bounded on-disk cache of per-frame (N, 5) x1, y1, x2, y2, conf arrays."""
+
+    def __init__(self, directory: Path, max_bytes: int = _MAX_BYTES, block_frames: int = _BLOCK_FRAMES) -> None:
+        self._dir = directory
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._block_frames = block_frames
+
+    @property
+    def directory(self) -> Path:
+        return self._dir
+
+    @staticmethod
+    def key(source_hash: str, model_name: str, conf: float) -> str:
+        raw = f"{source_hash}|{model_name}|{conf:.3f}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+    def frames(self, key: str) -> "FrameDetections":
+        return FrameDetections(self._dir / key, self._block_frames)
+
+    def known_frames(self, key: str) -> int | None:
+        """Total frame count of the source, once a full pass has recorded it."""
+        try:
+            return int((self._dir / key / "frames.txt").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def set_known_frames(self, key: str, frames: int) -> None:
+        folder = self._dir / key
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / "frames.txt").write_text(str(frames))
+
+    def enforce_limit(self) -> int:
+        """Evict least recently used keys until under the size limit.
+
+        The most recently used key is always kept.
+        """
+        entries = []
+        total = 0
+        for folder in self._dir.iterdir():
+            if not folder.is_dir():
+                continue
+            size = sum(p.stat().st_size for p in folder.glob("*.npz"))
+            entries.append((folder.stat().st_mtime, size, folder))
+            total += size
+        entries.sort()
+        evicted = 0
+        while len(entries) > 1 and total > self._max_bytes:
+            _, size, folder = entries.pop(0)
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self) -> dict:
+        keys = [p for p in self._dir.iterdir() if p.is_dir()]
+        size = sum(p.stat().st_size for k in keys for p in k.glob("*.npz"))
+        return {"keys": len(keys), "bytes": size, "max_bytes": self._max_bytes}
+
+    def clear(self) -> None:
+        for folder in self._dir.iterdir():
+            if folder.is_dir():
+                shutil.rmtree(folder, ignore_errors=True)
+
+
+class FrameDetections:
+    """Per-frame get/put over one cache key, buffering one block at a time.
+
+    Access is expected to be mostly sequential (a video segment); a block
+    is written back when access moves to another block and on flush().
+    """
+
+    def __init__(self, folder: Path, block_frames: int) -> None:
+        self._dir = folder
+        self._dir.mkdir(parents=True, exist_ok=True)
+        os.utime(self._dir)     # mark as recently used for eviction
+        self._block_frames = block_frames
+        self._block = -1
+        self._covered: np.ndarray | None = None
+        self._dets: list[np.ndarray | None] = []
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, block: int) -> Path:
+        return self._dir / f"block_{block:06d}.npz"
+
+    def _load(self, block: int) -> None:
+        if block == self._block:
+            return
+        self.flush()
+        self._block = block
+        self._covered = np.zeros(self._block_frames, dtype=bool)
+        self._dets = [None] * self._block_frames
+        path = self._path(block)
+        if not path.exists():
+            return
+        try:
+            with np.load(path) as z:
+                covered, counts, dets = z["covered"], z["counts"], z["dets"]
+        except (OSError, ValueError, KeyError):
+            return      # partially written or corrupt — recompute
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        for i in np.flatnonzero(covered):
+            self._dets[i] = dets[offsets[i]:offsets[i + 1]]
+        self._covered = covered.copy()
+
+    def get(self, frame: int) -> np.ndarray | None:
+        block, i = divmod(frame, self._block_frames)
+        self._load(block)
+        if self._covered[i]:
+            self.hits += 1
+            return self._dets[i]
+        self.misses += 1
+        return None
+
+    def put(self, frame: int, dets: np.ndarray) -> None:
+        block, i = divmod(frame, self._block_frames)
+        self._load(block)
+        self._dets[i] = np.asarray(dets, dtype=np.float32).reshape(-1, 5)
+        self._covered[i] = True
+        self._dirty = True
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        path = self._path(self._block)
+        # another process may have filled other frames of this block since
+        # it was loaded (adjacent segments overlap) — keep those too
+        if path.exists():
+            try:
+                with np.load(path) as z:
+                    covered, counts, dets = z["covered"], z["counts"], z["dets"]
+                offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+                for i in np.flatnonzero(covered & ~self._covered):
+                    self._dets[i] = dets[offsets[i]:offsets[i + 1]]
+                    self._covered[i] = True
+            except (OSError, ValueError, KeyError):
+                pass
+        empty = np.empty((0, 5), dtype=np.float32)
+        parts = [d if d is not None else empty for d in self._dets]
+        counts = np.asarray([len(d) for d in parts], dtype=np.uint16)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, covered=self._covered, counts=counts, dets=np.concatenate(parts))
+        os.replace(tmp, path)
+        self._dirty = False
@@ -5,18 +5,38 @@ Extracted from the original gui_detector.py tkinter application.
 Designed to be driven by FastAPI route handlers.
 """
 
+import json
+import os
+import shutil
 import sys
 import cv2
+import numpy as np
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
-from ultralytics import YOLO
-
-from backend.face_db import FaceDatabase, _recognize_worker
+from backend.analytics import AnalyticsEngine
+from backend.detection_cache import DetectionCache
+from backend.engine_state import NO_STATS, EngineSettings, LiveStats
+from backend.events import EventBus
+from backend.frame_ring import FrameRing
+from backend.history import DetectionHistory
+from backend.face_db import FaceDatabase, content_hash, encoding_key, _encode_worker, _recognize_worker
+from backend.jobs import JobRegistry
+from backend.model_cache import ModelCache
+from backend.offline import analyze_video
+from backend.profiler import MemoryTracer, SamplingProfiler, collapsed, profiled_call, speedscope
+from backend.recorder import VideoRecorder
+from backend.reid import AppearanceCache, appearance_descriptor
+from backend.resources import ResourceManager, init_face_worker
+from backend.screenshot_store import ScreenshotStore
+from backend.snapshots import SnapshotCache
+from backend.timing import StageTimings, prometheus_text
+from backend.track_cache import TrackCache, UniqueCounter
+from backend.trackers import TRACKERS, make_tracker
 
 # Colors assigned to tracking IDs
 _COLORS = [
@@ -45,51 +65,120 @@ SCREENSHOT_DIR.mkdir(exist_ok=True)
 
 MODEL_DIR = _base_dir()
 
+_MAX_ANALYSIS_DIRS = 20
+
+# model.predict() arguments shared by the detection loop and model warm-up, so
+# a warmed-up model's predictor matches what the loop expects; tracking runs
+# separately (backend/trackers.py) on the engine's own tracker
+_PREDICT_ARGS = {"classes": [0], "verbose": False}
+# frame rate trackers are configured for (their lost-track buffer is in frames)
+_TRACKER_FPS = 30.0
+_NO_DETECTIONS = np.empty((0, 5), dtype=np.float32)
+
+# What the detection loop is doing while a session is open:
+#   running  -- full rate, someone is watching (stream, events, recording)
+#   watching -- nobody is: detection continues at watch_fps
+#   paused   -- paused by the user: blocked, camera still open
+#   idle     -- paused longer than idle_timeout: camera released
+_STATES = ("stopped", "running", "watching", "paused", "idle")
 
-class DetectionEngine:
-    """Thread-safe person detection engine backed by YOLOv8 + ByteTrack."""
 
-    def __init__(self) -> None:
-        # --- lock protects all mutable state below ---
+class DetectionEngine:
+    """Thread-safe person detection engine backed by YOLOv8 and a pluggable
+    tracker (ByteTrack by default)."""
+
+    def __init__(self, data_dir: Path | None = None) -> None:
+        # everything the engine writes lives under data_dir (benchmarks and
+        # load tests pass a scratch folder)
+        data = data_dir or _writable_dir()
+
+        # Settings and per-frame stats are immutable snapshots (see
+        # backend/engine_state.py) read without any lock.  _lock serialises
+        # control changes (start/stop/pause, settings writes, model
+        # switches); _face_lock guards the face bookkeeping.  The detection
+        # loop takes neither on a normal frame except _face_lock, briefly.
         self._lock = threading.Lock()
 
-        # state
+        # state: _running/_paused are what the user asked for; _activity is
+        # what the loop is doing about it (see _STATES).  _wake interrupts
+        # the loop's waits: pause/resume, stop, settings, a new consumer.
         self._running = False
         self._paused = False
+        self._activity = "stopped"
+        self._wake = threading.Event()
         self._cap: cv2.VideoCapture | None = None
+        self._owns_camera = False        # opened by start(), so it may be released when idle
+        self._source_index = 0           # camera index of the running session
         self._thread: threading.Thread | None = None
 
-        # stats
-        self._people_count = 0
-        self._total_unique = 0
-        self._all_seen_ids: set[int] = set()
-        self._fps = 0.0
+        # stats: _live is replaced by the detection loop once per frame
+        self._live: LiveStats = NO_STATS
+        self._unique_ids = UniqueCounter()   # detection thread only
         self._session_start: float | None = None
         self._screenshot_count = 0
+        self._timings = StageTimings()   # per-stage latency samples (off by default)
+        self._stream_clients = 0         # connected MJPEG viewers
+        self._remote_consumers: int | None = None   # viewers counted by an EngineProcess parent
+        self._profiler = SamplingProfiler()   # on-demand, idle until requested
+        self._memory = MemoryTracer()
+
+        # settings: replaced as a whole by update_settings()
+        self._settings = EngineSettings()
+
+        # the live source's tracker, (re)created by the detection loop when
+        # None or no longer the configured one; IDs keep counting up across
+        # sessions and tracker changes
+        self._tracker = None
+        self._next_track_id = 1
+
+        # the current frame's JPEG (for MJPEG streaming) lives in _live; its
+        # frame_seq numbers it for snapshot ETags, and the epoch tells this
+        # engine's numbers apart from an earlier run's
+        self._frame_epoch = os.urandom(4).hex()
+        self._snapshots = SnapshotCache()
+        self._frame_event = threading.Event()
+        # called with (timestamp, jpeg, tracks) for every frame; see set_frame_sink()
+        self._frame_sink = None
 
-        # settings
-        self._confidence = 0.45
-        self._camera_index = 0
-        self._model_name = "yolov8n.pt"
-        self._show_labels = True
-        self._show_confidence = True
+        # recently encoded frames, reused as-is for screenshots and bursts
+        _RING_SECONDS = 10.0
+        _RING_MAX_BYTES = 64 * 1024 * 1024
+        self._frame_ring = FrameRing(max_seconds=_RING_SECONDS, max_bytes=_RING_MAX_BYTES)
+        self._screenshots = ScreenshotStore(data / "screenshots" if data_dir else SCREENSHOT_DIR)
 
-        # current JPEG-encoded frame (bytes) for MJPEG streaming
-        self._jpeg_frame: bytes | None = None
-        self._frame_event = threading.Event()
+        # on-disk per-frame track history with minute/hour rollups
+        self._history = DetectionHistory(data / "history")
 
-        # raw BGR frame for screenshots
-        self._raw_frame = None
+        # zone / line analytics and the live event stream
+        self._analytics = AnalyticsEngine(data / "analytics.json")
+        self._events = EventBus(on_change=self._wake.set)
+
+        # event-triggered video recording
+        _RECORD_HOLD = 5.0           # seconds to keep recording after a trigger
+        self._recorder = VideoRecorder(data / "recordings")
+        self._record_hold = _RECORD_HOLD
 
         # face recognition
-        self._face_db = FaceDatabase(_writable_dir() / "faces")
-        self._face_recognition_enabled = False
-        self._face_recognition_tolerance = 0.6
-        self._face_cache: dict[int, str | None] = {}
+        self._face_db = FaceDatabase(data / "faces")
+        self._face_lock = threading.Lock()   # _tracks, _appearance, _face_in_flight
+        _TRACK_CACHE_SIZE = 512      # max tracks with face bookkeeping
+        _TRACK_TTL = 10.0            # seconds after which an unseen track is lost
+        self._tracks = TrackCache(max_size=_TRACK_CACHE_SIZE, ttl=_TRACK_TTL)
         self._face_in_flight: set[int] = set()           # track IDs with pending bg jobs
-        self._face_attempts: dict[int, int] = {}          # track ID -> attempt count
-        self._face_last_attempt: dict[int, float] = {}    # track ID -> timestamp
-        self._face_thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="face")
+        _REID_MAX_ATTEMPTS = 3       # frames a new track tries to match a lost one
+        _REID_REFRESH = 1.0          # seconds between descriptor refreshes of named tracks
+        self._appearance = AppearanceCache()
+        self._reid_max_attempts = _REID_MAX_ATTEMPTS
+        self._reid_refresh = _REID_REFRESH
+        # written by the detection loop only, for the metrics
+        self._reid_hits = 0          # unnamed tracks named by re-ID (each one a face job avoided)
+        self._face_jobs = 0          # face recognition jobs submitted
+        # thread counts / core pinning for torch, OpenCV and face workers
+        self._resources = ResourceManager(data / "resources.json")
+        self._autotuning = False     # start() refuses while an autotune job runs
+        self._face_thread_pool = ThreadPoolExecutor(
+            max_workers=self._resources.budget.face_workers + 1, thread_name_prefix="face"
+        )
         self._face_proc_pool: ProcessPoolExecutor | None = None
         self._face_proc_crashes = 0
         _FACE_RETRY_INTERVAL = 1.0   # seconds between retries
@@ -97,64 +186,287 @@ class DetectionEngine:
         self._face_retry_interval = _FACE_RETRY_INTERVAL
         self._face_max_retries = _FACE_MAX_RETRIES
 
-        # model (loaded once, reloaded on model change)
-        self._model: YOLO | None = None
-        self._load_model()
+        # background jobs (bulk enrollment, offline analysis, ...)
+        self._jobs = JobRegistry()
+        self._detection_cache = DetectionCache(data / "cache" / "detections")
+        self._analysis_dir = data / "analysis"
+
+        # model: an ultralytics YOLO, loaded and warmed up in the background
+        # by warm_up() (the server starts listening first).  Model switches
+        # load on the "model" thread; the detection loop swaps the result in
+        # between frames.  Recently used models stay cached.
+        self._model = None
+        self._active_model_name: str | None = None
+        self._pending_model: tuple[str, object] | None = None   # loaded, not yet swapped in
+        self._model_loading: str | None = None
+        self._model_error: str | None = None
+        self._model_cache = ModelCache()
+        self._model_lock = threading.Lock()      # serialises model loads
+        self._model_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self._model_ready = threading.Event()
+        self._warm_up_done = threading.Event()   # set on success and on failure
+        self._warm_up_thread: threading.Thread | None = None
+        self._startup = {
+            "stage": "pending",
+            "progress": 0.0,
+            "error": None,
+            "stages": {},            # stage -> seconds taken
+            "created": time.time(),
+            "ready_at": None,
+        }
 
     # ------------------------------------------------------------------
     # Model
     # ------------------------------------------------------------------
 
-    def _load_model(self) -> None:
-        model_path = MODEL_DIR / self._model_name
-        self._model = YOLO(str(model_path))
+    def _get_model(self, name: str):
+        """A warmed-up model from the cache, loading it if needed.
+
+        Blocks for the load; only called from background threads.
+        """
+        from ultralytics import YOLO
+        with self._model_lock:
+            model = self._model_cache.get(name)
+            if model is None:
+                model = YOLO(str(MODEL_DIR / name))
+                self._warm_up_model(model)
+                evicted = self._model_cache.put(name, model)
+                if evicted:
+                    print(f"[model] evicted {', '.join(evicted)} from the model cache", flush=True)
+        return model
+
+    @staticmethod
+    def _warm_up_model(model) -> None:
+        """One throwaway inference so the first real frame isn't slow
+        (predictor setup, layer fusion, allocator)."""
+        model.predict(np.zeros((384, 640, 3), dtype=np.uint8), conf=0.5, **_PREDICT_ARGS)
+
+    def _load_initial_model(self) -> None:
+        name = self._settings.model_name
+        model = self._get_model(name)
+        with self._lock:
+            if self._model is None:      # a model switch may have got there first
+                self._model = model
+                self._active_model_name = name
+
+    def _switch_model(self, name: str) -> None:
+        """Load *name* on the model thread, then hand it to the detection loop."""
+        if name != self._settings.model_name:
+            return                       # superseded by a later switch
+        try:
+            model = self._get_model(name)
+        except Exception as e:
+            print(f"[model] failed to load {name}: {e}", flush=True)
+            with self._lock:
+                self._model_error = f"{name}: {e}"
+                if self._settings.model_name == name:
+                    self._model_loading = None
+                    if self._active_model_name:
+                        self._settings = self._settings.updated({"model_name": self._active_model_name})
+            return
+        with self._lock:
+            if name != self._settings.model_name:
+                return
+            self._model_loading = None
+            self._model_error = None
+            if self._running and self._model is not None:
+                self._pending_model = (name, model)
+            else:
+                self._model = model
+                self._active_model_name = name
+            recovered = not self._model_ready.is_set()
+            if recovered:
+                # the start-up model failed but this one works: health() must
+                # no longer report the start-up error
+                self._startup.update(stage="ready", progress=1.0, error=None, ready_at=time.time())
+        if recovered:
+            self._model_ready.set()
+            self._warm_up_done.set()
+
+    def _swap_model(self) -> None:
+        """Put the pending model in place.  The tracker belongs to the engine,
+        not the model, so track IDs (and the names attached to them) survive
+        the switch.
+
+        Called by the detection thread between frames, with the lock held.
+        """
+        name, model = self._pending_model
+        self._pending_model = None
+        self._model = model
+        self._active_model_name = name
+
+    def models(self) -> dict:
+        """Active, loading and cached models."""
+        with self._lock:
+            status = {
+                "active": self._active_model_name,
+                "loading": self._model_loading,
+                "error": self._model_error,
+            }
+        return {**status, **self._model_cache.stats()}
+
+    def warm_up(self) -> None:
+        """Load the model in the background, once; see health()."""
+        with self._lock:
+            if self._warm_up_thread is not None:
+                return
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name="warm-up", daemon=True)
+        self._warm_up_thread.start()
+
+    def _warm_up(self) -> None:
+        # (stage, share of the total warm-up time it usually takes)
+        stages = [
+            ("import", 0.5, self._import_inference_libs),
+            ("model", 0.5, self._load_initial_model),
+        ]
+        startup = self._startup
+        for name, share, step in stages:
+            with self._lock:
+                startup["stage"] = name
+            t0 = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                with self._lock:
+                    startup["stage"] = "error"
+                    startup["error"] = f"{name}: {e}"
+                print(f"[startup] {name} failed: {e}", flush=True)
+                self._warm_up_done.set()
+                return
+            with self._lock:
+                startup["stages"][name] = round(time.perf_counter() - t0, 3)
+                startup["progress"] = round(startup["progress"] + share, 2)
+        with self._lock:
+            startup["stage"] = "ready"
+            startup["progress"] = 1.0
+            startup["ready_at"] = time.time()
+        self._model_ready.set()
+        self._warm_up_done.set()
+
+        # face recognition is optional; import dlib now so enabling it later
+        # doesn't stall, but don't hold readiness back for it
+        t0 = time.perf_counter()
+        try:
+            from backend.face_db import face_lib
+            face_lib()
+            with self._lock:
+                startup["stages"]["face_recognition"] = round(time.perf_counter() - t0, 3)
+        except Exception as e:
+            print(f"[startup] face recognition unavailable: {e}", flush=True)
+
+    def _import_inference_libs(self) -> None:
+        import torch  # noqa: F401
+        import ultralytics  # noqa: F401
+        # before the first inference, while torch still accepts inter-op changes
+        self._resources.apply()
+
+    def _wait_for_model(self, timeout: float) -> dict | None:
+        """Start the warm-up if needed and wait for it; an error dict on failure."""
+        self.warm_up()
+        self._warm_up_done.wait(timeout)
+        if self._model_ready.is_set():
+            return None
+        with self._lock:
+            error = self._startup["error"]
+        if error:
+            return {"status": "error", "message": f"Model failed to load: {error}"}
+        return {"status": "error", "message": "Model is still loading"}
+
+    def health(self) -> dict:
+        """Readiness for load balancers and the UI: ``ready`` once the model
+        is loaded and warmed up, otherwise the current stage and progress."""
+        with self._lock:
+            startup = dict(self._startup, stages=dict(self._startup["stages"]))
+        ready = self._model_ready.is_set()
+        return {
+            "status": "ready" if ready else ("error" if startup["error"] else "starting"),
+            "ready": ready,
+            "stage": startup["stage"],
+            "progress": startup["progress"],
+            "error": startup["error"],
+            "stages": startup["stages"],
+            "uptime": round(time.time() - startup["created"], 3),
+            "time_to_ready": round(startup["ready_at"] - startup["created"], 3) if startup["ready_at"] else None,
+        }
 
     # ------------------------------------------------------------------
     # Public control methods (called from route handlers)
     # ------------------------------------------------------------------
 
-    def start(self) -> dict:
+    def start(self, capture=None) -> dict:
+        """Start detection on the configured camera.
+
+        *capture* replaces the camera with any opened object that has
+        cv2.VideoCapture's read()/release() (a video file, a synthetic
+        source); detection stops by itself when it runs out of frames.
+        Waits up to a minute for the model if it is still loading.
+        """
+        error = self._wait_for_model(timeout=60.0)
+        if error:
+            return error
         with self._lock:
             if self._running:
                 return {"status": "already_running"}
-
-            cap = cv2.VideoCapture(self._camera_index)
-            if not cap.isOpened():
-                return {"status": "error", "message": f"Cannot open camera {self._camera_index}"}
-
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            if self._autotuning:
+                # detection would compete with the benchmark and skew it
+                return {"status": "error", "message": "CPU tuning is running, try again when it finishes"}
+
+            camera_index = self._settings.camera_index
+            if capture is not None:
+                cap = capture
+            else:
+                cap = self._open_camera(camera_index)
+                if cap is None:
+                    return {"status": "error", "message": f"Cannot open camera {camera_index}"}
 
             self._cap = cap
-            self._running = True
-            self._paused = False
-            self._all_seen_ids.clear()
-            self._total_unique = 0
-            self._people_count = 0
+            self._owns_camera = capture is None
+            self._source_index = camera_index
+            self._unique_ids.clear()
             self._screenshot_count = 0
-            self._fps = 0.0
             self._session_start = time.time()
-            self._jpeg_frame = None
-            self._face_cache = {}
-            self._face_in_flight = set()
-            self._face_attempts = {}
-            self._face_last_attempt = {}
+            # frame numbers carry on, so snapshot ETags never repeat
+            self._live = LiveStats(frame_seq=self._live.frame_seq)
+            self._tracker = None
+            self._running = True
+            self._paused = False
+            self._activity = "running"
+            source = str(camera_index)
+        self._invalidate_face_cache()
+        self._frame_ring.clear()
+        self._history.start_session(self._session_start)
+        self._analytics.reset(source)
 
         # start detection in a daemon thread
         self._thread = threading.Thread(target=self._detection_loop, daemon=True)
         self._thread.start()
         return {"status": "started"}
 
+    @staticmethod
+    def _open_camera(index: int) -> cv2.VideoCapture | None:
+        cap = cv2.VideoCapture(index)
+        if not cap.isOpened():
+            return None
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        return cap
+
     def stop(self) -> dict:
         with self._lock:
-            if not self._running:
+            # a loop that ran out of frames has stopped itself but still
+            # needs the cleanup below
+            if not self._running and self._thread is None:
                 return {"status": "not_running"}
             self._running = False
+        self._wake.set()
+
+        self._recorder.stop()
 
         # wait for thread to finish
         if self._thread is not None:
             self._thread.join(timeout=3)
             self._thread = None
+        self._history.flush()
 
         with self._lock:
             if self._cap is not None:
@@ -164,80 +476,96 @@ class DetectionEngine:
             summary = {
                 "status": "stopped",
                 "duration": self._format_time(time.time() - self._session_start) if self._session_start else "00:00:00",
-                "total_unique": self._total_unique,
+                "total_unique": self._live.total_unique,
                 "screenshots": self._screenshot_count,
             }
             self._session_start = None
-            self._jpeg_frame = None
-            self._face_cache = {}
-            self._face_in_flight = set()
-            self._face_attempts = {}
-            self._face_last_attempt = {}
-            # signal any waiting generator
-            self._frame_event.set()
-            return summary
+            self._activity = "stopped"
+            self._live = LiveStats(frame_seq=self._live.frame_seq)
+        self._invalidate_face_cache()
+        # signal any waiting generator
+        self._frame_event.set()
+        return summary
+
+    def shutdown(self) -> None:
+        """Stop detection when the server exits (releases the camera,
+        flushes history, recordings and the face encoding cache)."""
+        self.stop()
+        self._recorder.close()
+        self._face_db.flush_encoding_cache()
 
     def pause(self) -> dict:
         with self._lock:
             if not self._running:
                 return {"status": "not_running"}
             self._paused = not self._paused
-            return {"status": "paused" if self._paused else "resumed"}
+            status = "paused" if self._paused else "resumed"
+        self._wake.set()
+        return {"status": status}
+
+    def set_remote_consumers(self, count: int | None) -> dict:
+        """Viewers of this engine counted elsewhere: an EngineProcess parent
+        serves the streams and event clients itself, so it reports them here
+        (the engine's own event bus then only feeds the parent)."""
+        with self._lock:
+            self._remote_consumers = None if count is None else max(0, int(count))
+        self._wake.set()
+        return {"status": "ok"}
+
+    def _has_consumers(self) -> bool:
+        """Anyone watching live: MJPEG viewers or event stream clients."""
+        remote = self._remote_consumers
+        events = remote if remote is not None else self._events.subscriber_count()
+        return self._stream_clients > 0 or events > 0
 
     # ------------------------------------------------------------------
     # Stats / settings
     # ------------------------------------------------------------------
 
     def get_stats(self) -> dict:
-        with self._lock:
-            elapsed = ""
-            if self._session_start and self._running:
-                elapsed = self._format_time(time.time() - self._session_start)
-            return {
-                "people_count": self._people_count,
-                "total_unique": self._total_unique,
-                "fps": round(self._fps, 1),
-                "session_time": elapsed,
-                "screenshots": self._screenshot_count,
-                "running": self._running,
-                "paused": self._paused,
-            }
+        # lock-free: each attribute read is atomic, and the counters all come
+        # from one published LiveStats
+        live = self._live
+        session_start = self._session_start
+        running = self._running
+        elapsed = ""
+        if session_start and running:
+            elapsed = self._format_time(time.time() - session_start)
+        stats = {
+            "people_count": live.people_count,
+            "total_unique": live.total_unique,
+            "fps": round(live.fps, 1),
+            "session_time": elapsed,
+            "screenshots": self._screenshot_count,
+            "running": running,
+            "paused": self._paused,
+            "state": self._activity,
+        }
+        stats.update(self._analytics.snapshot())
+        return stats
 
     def get_settings(self) -> dict:
-        with self._lock:
-            return {
-                "confidence": self._confidence,
-                "camera_index": self._camera_index,
-                "model_name": self._model_name,
-                "show_labels": self._show_labels,
-                "show_confidence": self._show_confidence,
-                "face_recognition_enabled": self._face_recognition_enabled,
-                "face_recognition_tolerance": self._face_recognition_tolerance,
-            }
+        return {
+            **self._settings.as_dict(),
+            "model_loading": self._model_loading is not None,
+        }
 
     def update_settings(self, data: dict) -> dict:
         reload_model = False
-        with self._lock:
-            if "confidence" in data:
-                self._confidence = max(0.1, min(0.95, float(data["confidence"])))
-            if "camera_index" in data:
-                self._camera_index = int(data["camera_index"])
-            if "show_labels" in data:
-                self._show_labels = bool(data["show_labels"])
-            if "show_confidence" in data:
-                self._show_confidence = bool(data["show_confidence"])
-            if "model_name" in data:
-                new_model = data["model_name"]
-                if new_model != self._model_name:
-                    self._model_name = new_model
-                    reload_model = True
-            if "face_recognition_enabled" in data:
-                self._face_recognition_enabled = bool(data["face_recognition_enabled"])
-            if "face_recognition_tolerance" in data:
-                self._face_recognition_tolerance = max(0.3, min(0.8, float(data["face_recognition_tolerance"])))
+        with self._lock:         # one writer at a time; readers use the old snapshot meanwhile
+            settings = self._settings.updated(data)
+            if settings.model_name != self._settings.model_name:
+                new_model = settings.model_name
+                self._model_loading = new_model
+                reload_model = True
+            # the loop starts a changed tracker on its next frame
+            self._settings = settings
+        self._wake.set()     # re-evaluate waits with the new settings
 
         if reload_model:
-            self._load_model()
+            # load and warm up off the request thread; the detection loop
+            # keeps using the current model until the new one is swapped in
+            self._model_loader.submit(self._switch_model, new_model)
 
         return self.get_settings()
 
@@ -246,50 +574,462 @@ class DetectionEngine:
     # ------------------------------------------------------------------
 
     def take_screenshot(self) -> dict:
-        with self._lock:
-            if self._raw_frame is None:
-                return {"status": "error", "message": "No frame available"}
-            frame = self._raw_frame.copy()
+        latest = self._frame_ring.latest()
+        if latest is None:
+            return {"status": "error", "message": "No frame available"}
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"detection_{timestamp}.jpg"
-        filepath = SCREENSHOT_DIR / filename
-        cv2.imwrite(str(filepath), frame)
+        # The stream's JPEG bytes are written as-is on the store's writer
+        # thread; the counter only moves once the file is listed, so a
+        # gallery refresh triggered by it always finds the new screenshot.
+        filename = self._screenshots.reserve_name()
+        future = self._screenshots.save_jpeg_async(filename, latest[1])
+        future.add_done_callback(lambda f: f.result() and self._count_screenshot())
 
+        return {"status": "ok", "filename": filename}
+
+    def capture_burst(self, seconds: float = 5.0, after: float = 0.0) -> dict:
+        """Save the last *seconds* of frames, plus the next *after* seconds.
+
+        Frames come from the in-memory ring, so nothing is re-encoded and the
+        pre-trigger part is available instantly.
+        """
+        if self._frame_ring.latest() is None:
+            return {"status": "error", "message": "No frame available"}
+        limit = self._frame_ring.max_seconds
+        seconds = max(0.0, min(float(seconds), limit))
+        after = max(0.0, min(float(after), limit - seconds))
+        trigger = time.time()
+        name = f"burst_{datetime.fromtimestamp(trigger).strftime('%Y%m%d_%H%M%S_%f')[:-3]}"
+
+        def _collect() -> None:
+            frames = self._frame_ring.window(trigger - seconds, trigger + after)
+            if frames:
+                self._screenshots.save_burst_async(name, frames)
+
+        if after > 0:
+            threading.Timer(after, _collect).start()
+        else:
+            _collect()
+        return {"status": "ok", "burst": name, "seconds": seconds, "after": after}
+
+    def _count_screenshot(self) -> None:
         with self._lock:
             self._screenshot_count += 1
 
-        return {"status": "ok", "filename": filename}
+    def snapshot(self, width: int | None = None, quality: int | None = None,
+                 if_none_match: str | None = None) -> tuple[str, bytes | None] | None:
+        """(etag, jpeg) of the current frame, scaled down to *width* and/or
+        re-encoded at *quality* (cached per frame), or None while stopped.
+
+        The jpeg is None when *if_none_match* is already the current ETag.
+        """
+        live = self._live
+        jpeg, seq = live.jpeg, live.frame_seq
+        if jpeg is None:
+            return None
+        etag = f'"{self._frame_epoch}-{seq}-{width or 0}-{quality or 0}"'
+        if if_none_match == etag:
+            return etag, None
+        return etag, self._snapshots.get(seq, jpeg, width, quality)
+
+    def list_screenshots(self, limit: int = 60, cursor: str | None = None) -> dict:
+        return self._screenshots.page(limit=limit, cursor=cursor)
+
+    @property
+    def screenshots(self) -> ScreenshotStore:
+        return self._screenshots
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+
+    def query_history(self, start: float, end: float, resolution: str = "minute", limit: int = 10000) -> dict:
+        if end <= start:
+            return {"status": "error", "message": "end must be after start"}
+        if resolution == "raw":
+            result = self._history.tracks(start, end, limit=limit)
+            return {"status": "ok", "resolution": "raw", **result}
+        if resolution not in ("minute", "hour"):
+            return {"status": "error", "message": f"Unknown resolution '{resolution}'"}
+        return {"status": "ok", "resolution": resolution, "rows": self._history.rollups(start, end, resolution)}
 
-    def list_screenshots(self) -> list[dict]:
-        files = sorted(SCREENSHOT_DIR.glob("*.jpg"), reverse=True)
-        return [{"name": f.name, "size": f.stat().st_size} for f in files]
+    # ------------------------------------------------------------------
+    # Analytics
+    # ------------------------------------------------------------------
+
+    def _analytics_source(self, source: str | None) -> str:
+        if source is not None:
+            return source
+        return str(self._settings.camera_index)
+
+    def get_analytics_config(self, source: str | None = None) -> dict:
+        source = self._analytics_source(source)
+        return {"source": source, **self._analytics.get_config(source)}
+
+    def set_analytics_config(self, config: dict, source: str | None = None) -> dict:
+        source = self._analytics_source(source)
+        try:
+            config = self._analytics.set_config(source, config)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        return {"status": "ok", "source": source, **config}
+
+    def get_analytics(self) -> dict:
+        return {**self._analytics.snapshot(), "events": self._events.stats()}
+
+    def event_generator(self):
+        """Yields Server-Sent Events for zone and line events."""
+        return self._events.stream()
+
+    # ------------------------------------------------------------------
+    # Offline analysis
+    # ------------------------------------------------------------------
+
+    def start_analysis(
+        self,
+        video_path: Path,
+        model_name: str | None = None,
+        confidence: float | None = None,
+        annotate: bool = False,
+        segment_seconds: float = 60.0,
+        workers: int | None = None,
+        source: str | None = None,
+        delete_input: bool = False,
+        use_cache: bool = True,
+        tracker: str | None = None,
+    ) -> dict:
+        """Analyse a video file in a background job across a process pool.
+
+        Uses the live model, confidence and tracker unless given.  Zones and lines
+        configured for *source* (if any) are applied to the clip.  With
+        *use_cache*, detections from earlier runs on the same file, model
+        and confidence are reused instead of running inference.
+        """
+        settings = self._settings
+        model_name = model_name or settings.model_name
+        conf = settings.confidence if confidence is None else max(0.1, min(0.95, float(confidence)))
+        tracker = tracker or settings.tracker
+        model_path = MODEL_DIR / model_name
+        if not model_path.is_file():
+            return {"status": "error", "message": f"Model '{model_name}' not found"}
+        if tracker not in TRACKERS:
+            return {"status": "error", "message": f"Unknown tracker '{tracker}'"}
+        analytics_config = self._analytics.get_config(source) if source is not None else None
+
+        job_id = self._jobs.create("analyze", total=0)
+        out_dir = self._analysis_dir / job_id
+        self._prune_analysis_dirs()
+
+        def _run() -> None:
+            self._jobs.start(job_id)
+            try:
+                report = analyze_video(
+                    video_path,
+                    out_dir,
+                    model_path,
+                    conf=conf,
+                    workers=workers,
+                    segment_seconds=max(5.0, float(segment_seconds)),
+                    annotate=annotate,
+                    analytics_config=analytics_config,
+                    cache=self._detection_cache if use_cache else None,
+                    tracker=tracker,
+                    on_plan=lambda steps: self._jobs.set_total(job_id, steps),
+                    on_progress=lambda: self._jobs.progress(job_id),
+                )
+                report.update({"source_file": video_path.name, "model_name": model_name, "confidence": conf,
+                               "tracker": tracker})
+                (out_dir / "report.json").write_text(json.dumps(report), encoding="utf-8")
+            except Exception as e:
+                self._jobs.finish(job_id, error=str(e))
+                return
+            finally:
+                if delete_input:
+                    video_path.unlink(missing_ok=True)
+            self._jobs.finish(job_id, result=report)
+
+        threading.Thread(target=_run, daemon=True, name=f"analyze-{job_id}").start()
+        return {"status": "ok", "job_id": job_id}
+
+    def detection_cache_stats(self) -> dict:
+        return self._detection_cache.stats()
+
+    def clear_detection_cache(self) -> dict:
+        self._detection_cache.clear()
+        return {"status": "ok"}
+
+    def list_analyses(self) -> list[dict]:
+        return [job for job in self._jobs.list() if job["kind"] == "analyze"]
+
+    def analysis_file(self, job_id: str, name: str) -> Path | None:
+        """Path of an output file (report.json or annotated_*.mp4) of a job."""
+        if Path(job_id).name != job_id or Path(name).name != name:
+            return None
+        path = self._analysis_dir / job_id / name
+        return path if path.is_file() and not name.startswith(".") else None
+
+    @property
+    def analysis_dir(self) -> Path:
+        return self._analysis_dir
+
+    def _prune_analysis_dirs(self) -> None:
+        if not self._analysis_dir.is_dir():
+            return
+        dirs = sorted(
+            (p for p in self._analysis_dir.iterdir() if p.is_dir() and p.name != "uploads"),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for old in dirs[:-_MAX_ANALYSIS_DIRS]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def start_recording(self) -> dict:
+        with self._lock:
+            if not self._running:
+                return {"status": "not_running"}
+        self._recorder.start("manual")
+        return {"status": "ok", **self._recorder.status()}
+
+    def stop_recording(self) -> dict:
+        self._recorder.stop()
+        return {"status": "ok", **self._recorder.status()}
+
+    def recording_status(self) -> dict:
+        return {**self._recorder.status(), "segments": self._recorder.list_segments()}
+
+    @property
+    def recorder(self) -> VideoRecorder:
+        return self._recorder
+
+    @property
+    def timings(self) -> StageTimings:
+        return self._timings
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
+    def set_frame_sink(self, sink) -> None:
+        """Also hand every encoded frame to ``sink(timestamp, jpeg, tracks)``.
+
+        Called on the detection thread, so it must be quick; *tracks* are
+        ``(track_id, x1, y1, x2, y2, confidence, name)`` tuples.
+        """
+        self._frame_sink = sink
+
+    def wait_until_stopped(self, timeout: float | None = None) -> bool:
+        """Block until the detection thread exits (e.g. at the end of a clip)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def set_metrics(self, data: dict) -> dict:
+        """Switch stage timing on/off (``enabled``) and/or clear it (``reset``)."""
+        if "enabled" in data:
+            self._timings.enabled = bool(data["enabled"])
+        if data.get("reset"):
+            self._timings.reset()
+        return {"status": "ok", "enabled": self._timings.enabled}
+
+    def _metric_values(self, overrides: dict | None = None) -> tuple[dict, dict]:
+        """Gauges and counters as ``{name: (help, value)}``; always collected.
+
+        *overrides* replaces gauge values measured elsewhere (by the API
+        process when the engine runs in its own process).
+        """
+        live = self._live
+        activity = self._activity
+        with self._face_lock:
+            face_jobs, tracks = len(self._face_in_flight), len(self._tracks)
+        gauges = {
+            "running": ("1 while detection is running.", self._running),
+            "paused": ("1 while detection is paused.", self._paused),
+            "watching": ("1 while detection runs at the watch rate (no viewers).", activity == "watching"),
+            "idle": ("1 while paused with the camera released.", activity == "idle"),
+            "fps": ("Smoothed detection loop frames per second.", live.fps),
+            "people": ("People in the current frame.", live.people_count),
+            "stream_clients": ("Connected MJPEG viewers.", self._stream_clients),
+            "face_jobs_in_flight": ("Face recognition jobs queued or running.", face_jobs),
+            "tracks": ("Tracks with face bookkeeping.", tracks),
+        }
+        events = self._events.stats()
+        gauges["event_subscribers"] = ("Connected event stream (SSE) clients.", events["subscribers"])
+        gauges["timing_enabled"] = ("1 while stage timing is collected.", self._timings.enabled)
+        counters = {
+            "events_dropped_total": ("Events dropped for slow event stream clients.", events["dropped"]),
+            "reid_hits_total": ("New tracks named by appearance re-ID instead of a face job.", self._reid_hits),
+            "face_jobs_total": ("Face recognition jobs submitted.", self._face_jobs),
+        }
+        for name, value in (overrides or {}).items():
+            if name in gauges:
+                gauges[name] = (gauges[name][0], value)
+        return gauges, counters
+
+    def get_metrics(self, overrides: dict | None = None) -> dict:
+        gauges, counters = self._metric_values(overrides)
+        return {
+            "enabled": self._timings.enabled,
+            "gauges": {name: value for name, (_, value) in gauges.items()},
+            "counters": {name: value for name, (_, value) in counters.items()},
+            "stages": self._timings.summary(),
+            "histograms": self._timings.histograms(),
+        }
+
+    def metrics_text(self, overrides: dict | None = None) -> str:
+        """All metrics in Prometheus text format."""
+        gauges, counters = self._metric_values(overrides)
+        return prometheus_text(self._timings.histograms(), gauges, counters)
+
+    # ------------------------------------------------------------------
+    # CPU budget
+    # ------------------------------------------------------------------
+
+    def get_resources(self) -> dict:
+        return self._resources.status()
+
+    def set_resources(self, data: dict) -> dict:
+        try:
+            self._resources.set(data)
+        except (TypeError, ValueError) as e:
+            return {"status": "error", "message": str(e)}
+        self._apply_resources()
+        return {"status": "ok", **self._resources.status()}
+
+    def _apply_resources(self) -> None:
+        """Apply the budget here and restart the face pools with it.
+
+        Jobs already running on the old pools finish there.
+        """
+        self._resources.apply()
+        budget = self._resources.budget
+        old_threads = self._face_thread_pool
+        self._face_thread_pool = ThreadPoolExecutor(max_workers=budget.face_workers + 1, thread_name_prefix="face")
+        old_threads.shutdown(wait=False)
+        old_procs, self._face_proc_pool = self._face_proc_pool, None
+        if old_procs is not None:
+            old_procs.shutdown(wait=False)
+
+    def start_autotune(self, frames: int = 30) -> dict:
+        """Benchmark thread counts with the active model as a background job.
+
+        Needs detection stopped, so the measurements aren't competing with it.
+        """
+        with self._lock:
+            if self._running:
+                return {"status": "error", "message": "Stop detection before tuning"}
+            if self._autotuning:
+                return {"status": "error", "message": "Tuning is already running"}
+            model = self._model
+            if model is None:
+                return {"status": "error", "message": "Model is still loading"}
+            self._autotuning = True
+        conf = self._settings.confidence
+        frames = max(5, min(300, int(frames)))
+        job_id = self._jobs.create("autotune", 0)
+
+        def infer(frame):
+            model.predict(frame, conf=conf, **_PREDICT_ARGS)
+
+        threading.Thread(target=self._run_autotune, args=(job_id, infer, frames), daemon=True).start()
+        return {"status": "ok", "job_id": job_id}
+
+    def _run_autotune(self, job_id: str, infer, frames: int) -> None:
+        self._jobs.start(job_id)
+        try:
+            def on_progress(done: int, total: int) -> None:
+                self._jobs.set_total(job_id, total)
+                self._jobs.progress(job_id)
+
+            with self._model_lock:       # no model load or warm-up meanwhile
+                result = self._resources.autotune(infer, frames, on_progress)
+            self._apply_resources()
+            self._jobs.finish(job_id, result)
+        except Exception as e:
+            self._jobs.finish(job_id, error=str(e))
+        finally:
+            with self._lock:
+                self._autotuning = False
+
+    # ------------------------------------------------------------------
+    # Profiling
+    # ------------------------------------------------------------------
+
+    def _profile_targets(self, all_threads: bool) -> dict[int, str]:
+        """Thread ident -> label: the detection thread and face threads, or everything."""
+        targets = {}
+        detection = self._thread
+        for t in threading.enumerate():
+            if t.ident is None:
+                continue
+            if t is detection:
+                targets[t.ident] = "detection"
+            elif all_threads or t.name.startswith("face"):
+                targets[t.ident] = t.name
+        return targets
+
+    def profile_cpu(self, duration: float, interval_ms: float, fmt: str, all_threads: bool) -> dict:
+        """Sample thread stacks for *duration* seconds (blocks meanwhile).
+
+        *fmt* is ``collapsed`` or ``speedscope``; the output is under
+        ``profile``.  Face jobs that run during the profile are sampled in
+        the worker process and reported as ``face-worker``.
+        """
+        if fmt not in ("collapsed", "speedscope"):
+            return {"status": "error", "message": f"Unknown format: {fmt}"}
+        result = self._profiler.run(lambda: self._profile_targets(all_threads), duration, interval_ms / 1000.0)
+        if result["status"] != "ok":
+            return result
+        stacks = result.pop("stacks")
+        name = f"person-detector {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        result["threads"] = {label: sum(c.values()) for label, c in stacks.items()}
+        result["format"] = fmt
+        result["profile"] = collapsed(stacks) if fmt == "collapsed" else speedscope(stacks, result["interval"], name)
+        return result
+
+    def memory_status(self) -> dict:
+        return self._memory.status()
+
+    def set_memory_tracing(self, enabled: bool, frames: int = 1) -> dict:
+        return self._memory.start(frames) if enabled else self._memory.stop()
+
+    def memory_snapshot(self, top: int, against: str) -> dict:
+        return self._memory.snapshot(top, against)
 
     # ------------------------------------------------------------------
     # Face recognition
     # ------------------------------------------------------------------
 
     def gpu_info(self) -> dict:
-        from backend.face_db import HAS_GPU
+        from backend.face_db import has_gpu
         import torch
         pytorch_cuda = torch.cuda.is_available()
+        dlib_cuda = has_gpu()
         return {
-            "has_gpu": HAS_GPU or pytorch_cuda,
+            "has_gpu": dlib_cuda or pytorch_cuda,
             "pytorch_cuda": pytorch_cuda,
-            "dlib_cuda": HAS_GPU,
+            "dlib_cuda": dlib_cuda,
         }
 
     def _invalidate_face_cache(self) -> None:
         """Clear all cached recognition results, forcing re-evaluation."""
-        with self._lock:
-            self._face_cache.clear()
+        with self._face_lock:
+            self._tracks.clear()
+            self._appearance.clear()
             self._face_in_flight.clear()
-            self._face_attempts.clear()
-            self._face_last_attempt.clear()
 
-    def enroll_face_from_image(self, name: str, bgr_image, cpu_only: bool = False) -> dict:
-        result = self._face_db.enroll_from_image(name, bgr_image, cpu_only=cpu_only)
-        if result.get("status") == "ok":
+    def enroll_face_from_image(self, name: str, bgr_image, cpu_only: bool = False,
+                               image_hash: str | None = None) -> dict:
+        result = self._face_db.enroll_from_image(name, bgr_image, cpu_only=cpu_only, image_hash=image_hash)
+        if result.get("status") == "ok" and not result.get("duplicate"):
             self._invalidate_face_cache()
         return result
 
@@ -311,26 +1051,120 @@ class DetectionEngine:
             self._invalidate_face_cache()
         return result
 
+    def start_bulk_enroll(self, items: list[tuple[str, str, bytes]], cpu_only: bool,
+                          errors: list[dict] | None = None) -> dict:
+        """Enroll many (name, filename, image bytes) items in a background job.
+
+        *errors* are files that failed before enrollment (unreadable
+        archives, size limit); they are counted and listed with the job's own.
+        """
+        errors = errors or []
+        if not items:
+            return {"status": "error", "message": "No images to enroll", "errors": errors}
+        job_id = self._jobs.create("bulk_enroll", total=len(items) + len(errors))
+        for error in errors:
+            self._jobs.progress(job_id, error=error)
+        threading.Thread(
+            target=self._run_bulk_enroll, args=(job_id, items, cpu_only), daemon=True
+        ).start()
+        return {"status": "ok", "job_id": job_id, "total": len(items) + len(errors)}
+
+    def _run_bulk_enroll(self, job_id: str, items: list[tuple[str, str, bytes]], cpu_only: bool) -> None:
+        """Encode images across a process pool, then write them in one batch.
+
+        Images whose content hash is already in the encoding cache skip the
+        pool entirely.
+        """
+        self._jobs.start(job_id)
+        samples = []
+        pending = []
+        for name, filename, data in items:
+            key = encoding_key(content_hash(data), cpu_only)
+            cached = self._face_db.cached_encoding(key)
+            if cached is not None:
+                samples.append((name, cached))
+                self._jobs.progress(job_id)
+            else:
+                pending.append((name, filename, data, key))
+        new_cache_entries = {}
+        try:
+            if pending:
+                workers = max(1, min(len(pending), (os.cpu_count() or 2) - 1, 8))
+                # one BLAS/OpenMP thread per worker process, or they oversubscribe
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_face_worker, initargs=(1, [])) as pool:
+                    futures = {
+                        pool.submit(_encode_worker, data, cpu_only): (name, filename, key)
+                        for name, filename, data, key in pending
+                    }
+                    for future in as_completed(futures):
+                        name, filename, key = futures[future]
+                        try:
+                            encoding, error, gpu_failed = future.result()
+                        except BrokenProcessPool:
+                            error, encoding = "face worker process crashed", None
+                        except Exception as e:
+                            error, encoding = str(e), None
+                        if encoding is not None:
+                            samples.append((name, encoding))
+                            if not gpu_failed:
+                                new_cache_entries[key] = encoding
+                            self._jobs.progress(job_id)
+                        else:
+                            self._jobs.progress(job_id, error={"filename": filename, "name": name, "message": error})
+            self._face_db.remember_encodings(new_cache_entries)
+            self._face_db.flush_encoding_cache()
+            result = self._face_db.enroll_batch(samples)
+            result["cached"] = len(items) - len(pending)
+        except Exception as e:
+            self._jobs.finish(job_id, error=str(e))
+            return
+        if samples:
+            self._invalidate_face_cache()
+        self._jobs.finish(job_id, result=result)
+
+    def get_job(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"status": "error", "message": f"Job '{job_id}' not found"}
+        return {"status": "ok", **job}
+
+    def compact_face_db(self, max_prototypes: int, dry_run: bool) -> dict:
+        result = self._face_db.compact(max_prototypes=max_prototypes, dry_run=dry_run)
+        if result.get("status") == "ok" and not dry_run:
+            self._invalidate_face_cache()
+        return result
+
     # ------------------------------------------------------------------
     # MJPEG streaming
     # ------------------------------------------------------------------
 
     def frame_generator(self):
         """Yields MJPEG multipart frames. Used by StreamingResponse."""
-        while True:
-            self._frame_event.wait(timeout=1.0)
-            self._frame_event.clear()
+        timings = self._timings
+        with self._lock:
+            self._stream_clients += 1
+        self._wake.set()        # back to full rate from the watch rate
+        try:
+            while True:
+                self._frame_event.wait(timeout=1.0)
+                self._frame_event.clear()
 
-            with self._lock:
                 if not self._running:
                     break
-                jpeg = self._jpeg_frame
-
-            if jpeg is not None:
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
-                )
+                jpeg = self._live.jpeg
+
+                if jpeg is not None:
+                    # time until the server asks for the next part, i.e. how
+                    # long this client took to take the frame
+                    t_write = time.perf_counter()
+                    yield (
+                        b"--frame\r\n"
+                        b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+                    )
+                    timings.observe("stream_write", time.perf_counter() - t_write)
+        finally:
+            with self._lock:
+                self._stream_clients -= 1
 
     # ------------------------------------------------------------------
     # Internal detection loop
@@ -338,90 +1172,177 @@ class DetectionEngine:
 
     def _detection_loop(self) -> None:
         prev_time = time.time()
+        timings = self._timings
+        perf = time.perf_counter
 
         while True:
             try:
-                with self._lock:
-                    if not self._running:
+                if not self._running:
+                    break
+                paused = self._paused
+                settings = self._settings    # one snapshot for the whole frame
+                if self._pending_model is not None:
+                    t_lock = perf()
+                    with self._lock:
+                        timings.observe("lock_wait", perf() - t_lock)
+                        self._swap_model()
+                tracker = self._tracker
+                if tracker is None or tracker.name != settings.tracker:
+                    tracker = self._tracker = make_tracker(settings.tracker, _TRACKER_FPS, self._next_track_id)
+                model = self._model
+                cap = self._cap
+                conf = settings.confidence
+                face_enabled = settings.face_recognition_enabled
+                face_tolerance = settings.face_recognition_tolerance
+                record_min_people = settings.record_min_people
+                watch_fps = settings.watch_fps
+
+                if paused:
+                    if not self._wait_while_paused():
                         break
-                    if self._paused:
-                        continue
-                    cap = self._cap
-                    conf = self._confidence
-                    show_labels = self._show_labels
-                    show_conf = self._show_confidence
-                    face_enabled = self._face_recognition_enabled
-                    face_tolerance = self._face_recognition_tolerance
-
+                    prev_time = time.time()     # the pause is not a slow frame
+                    continue
                 if cap is None:
                     break
 
+                t_frame = perf()
                 ret, frame = cap.read()
                 if not ret:
                     with self._lock:
                         self._running = False
                     break
+                t_capture = perf()
+                timings.observe("capture", t_capture - t_frame)
 
                 # Run YOLO detection (expensive — lock NOT held)
-                results = self._model.track(
-                    frame,
-                    persist=True,
-                    tracker="bytetrack.yaml",
-                    conf=conf,
-                    classes=[0],
-                    verbose=False,
+                boxes = model.predict(frame, conf=conf, **_PREDICT_ARGS)[0].boxes
+                dets = boxes.data[:, :5].cpu().numpy() if boxes is not None and len(boxes) else _NO_DETECTIONS
+                t_inference = perf()
+                timings.observe("inference", t_inference - t_capture)
+
+                tracks = tracker.update(dets, frame.shape)
+                t_tracking = perf()
+                timings.observe("tracking", t_tracking - t_inference)
+
+                detections: list[tuple[int, int, int, int, float, int]] = [
+                    (int(x1), int(y1), int(x2), int(y2), confidence, int(track_id))
+                    for x1, y1, x2, y2, track_id, confidence in tracks.tolist()
+                ]
+
+                seen_ids = {d[5] for d in detections if d[5] >= 0}
+                now_t = time.time()
+                t_lock = perf()
+                with self._face_lock:
+                    timings.observe("lock_wait", perf() - t_lock)
+                    track_states = self._update_tracks(seen_ids, now_t)
+                    # checked once per frame, not per unnamed box
+                    reid_open = face_enabled and self._appearance.has_candidates(seen_ids, now_t)
+                if seen_ids:
+                    self._next_track_id = max(self._next_track_id, max(seen_ids) + 1)
+                t_extract = perf()
+                timings.observe("extract", t_extract - t_tracking)
+
+                tracked = [d for d in detections if d[5] >= 0]
+                events = self._analytics.update(
+                    now_t,
+                    frame.shape[1],
+                    frame.shape[0],
+                    np.fromiter((d[5] for d in tracked), dtype=np.int64, count=len(tracked)),
+                    np.asarray([d[:4] for d in tracked], dtype=np.float64).reshape(-1, 4),
                 )
+                if events:
+                    self._events.publish(events)
+                    for zone in self._analytics.zones_to_record(events):
+                        self._recorder.trigger(f"zone:{zone}", self._record_hold, now_t)
+
+                if record_min_people and len(detections) >= record_min_people:
+                    self._recorder.trigger("people", self._record_hold, now_t)
+                recording = self._recorder.is_active(now_t)
+                raw_frame = frame.copy() if recording and settings.record_raw else None
+                t_analytics = perf()
+                timings.observe("analytics", t_analytics - t_extract)
 
                 people_count = 0
-                seen_ids: set[int] = set()
-
-                if results[0].boxes is not None and len(results[0].boxes):
-                    for box in results[0].boxes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                        confidence = float(box.conf[0])
-                        track_id = int(box.id[0]) if box.id is not None else -1
-
-                        if track_id >= 0:
-                            seen_ids.add(track_id)
-
-                        # Face recognition (async, cached per track_id)
-                        recognized_name = None
-                        if face_enabled and track_id >= 0:
-                            try:
-                                if self._face_cache.get(track_id):
-                                    recognized_name = self._face_cache[track_id]
-                                else:
-                                    now_t = time.time()
-                                    in_flight = track_id in self._face_in_flight
-                                    attempts = self._face_attempts.get(track_id, 0)
-                                    last_attempt = self._face_last_attempt.get(track_id, 0.0)
-                                    cooldown_ok = (now_t - last_attempt) >= self._face_retry_interval
-
-                                    if not in_flight and attempts < self._face_max_retries and cooldown_ok:
-                                        # Crop and submit to background thread
-                                        h, w = frame.shape[:2]
-                                        cx1 = max(0, x1)
-                                        cy1 = max(0, y1)
-                                        cx2 = min(w, x2)
-                                        cy2 = min(h, y2)
-                                        if cx2 > cx1 and cy2 > cy1:
-                                            crop = frame[cy1:cy2, cx1:cx2].copy()
-                                            self._face_in_flight.add(track_id)
-                                            self._face_attempts[track_id] = attempts + 1
-                                            self._face_last_attempt[track_id] = now_t
-                                            self._face_thread_pool.submit(
-                                                self._recognize_async, track_id, crop, face_tolerance
-                                            )
-                            except Exception as e:
-                                print(f"[face-rec] error submitting job for track {track_id}: {e}")
-
-                        people_count += 1
-                        color = _COLORS[track_id % len(_COLORS)]
-                        self._draw_detection(frame, x1, y1, x2, y2, color, track_id, confidence, show_labels, show_conf, recognized_name)
+                frame_tracks = []
+                face_time = 0.0
+                draw_time = 0.0
+                # face bookkeeping is collected per box and applied under
+                # one _face_lock acquisition after the loop
+                appearance_updates = []
+                face_submits = []
+                for x1, y1, x2, y2, confidence, track_id in detections:
+                    t_box = perf()
+                    # Face recognition (async, cached per track_id)
+                    recognized_name = None
+                    state = track_states.get(track_id)
+                    if face_enabled and state is not None:
+                        try:
+                            if not state.name and reid_open:
+                                self._try_reid(frame, x1, y1, x2, y2, state, seen_ids, now_t)
+                            if state.name:
+                                recognized_name = state.name
+                                if now_t - state.descriptor_at >= self._reid_refresh:
+                                    desc = appearance_descriptor(frame, x1, y1, x2, y2)
+                                    if desc is not None:
+                                        appearance_updates.append((track_id, state.name, desc))
+                                        state.descriptor_at = now_t
+                            else:
+                                in_flight = track_id in self._face_in_flight
+                                attempts = state.attempts
+                                cooldown_ok = (now_t - state.last_attempt) >= self._face_retry_interval
+
+                                if not in_flight and attempts < self._face_max_retries and cooldown_ok:
+                                    # Crop and submit to background thread
+                                    h, w = frame.shape[:2]
+                                    cx1 = max(0, x1)
+                                    cy1 = max(0, y1)
+                                    cx2 = min(w, x2)
+                                    cy2 = min(h, y2)
+                                    if cx2 > cx1 and cy2 > cy1:
+                                        face_submits.append((track_id, state, frame[cy1:cy2, cx1:cx2].copy()))
+                        except Exception as e:
+                            print(f"[face-rec] error preparing track {track_id}: {e}")
+
+                    people_count += 1
+                    frame_tracks.append((track_id, x1, y1, x2, y2, confidence, recognized_name))
+                    t_draw = perf()
+                    face_time += t_draw - t_box
+                    color = _COLORS[track_id % len(_COLORS)]
+                    self._draw_detection(frame, x1, y1, x2, y2, color, track_id, confidence,
+                                         settings.show_labels, settings.show_confidence, recognized_name)
+                    draw_time += perf() - t_draw
+                if appearance_updates or face_submits:
+                    t_submit = perf()
+                    with self._face_lock:
+                        for track_id, name, desc in appearance_updates:
+                            self._appearance.update(track_id, name, desc, now_t)
+                        for track_id, state, _ in face_submits:
+                            self._face_in_flight.add(track_id)
+                            state.attempts += 1
+                            state.last_attempt = now_t
+                    for track_id, _, crop in face_submits:
+                        try:
+                            self._face_thread_pool.submit(
+                                self._recognize_async, track_id, crop, face_tolerance, perf()
+                            )
+                            self._face_jobs += 1
+                        except Exception as e:
+                            with self._face_lock:
+                                self._face_in_flight.discard(track_id)
+                            print(f"[face-rec] error submitting job for track {track_id}: {e}")
+                    face_time += perf() - t_submit
+                    if face_submits:
+                        timings.observe("face_submit", perf() - t_submit)
+                if face_enabled:
+                    timings.observe("faces", face_time)
+                timings.observe("draw", draw_time)
 
                 # Encode frame to JPEG
+                t_encode = perf()
                 _, jpeg_buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
                 jpeg_bytes = jpeg_buf.tobytes()
+                t_publish = perf()
+                timings.observe("encode", t_publish - t_encode)
 
                 # Calculate FPS
                 now = time.time()
@@ -429,22 +1350,43 @@ class DetectionEngine:
                 prev_time = now
                 fps = (1.0 / dt) if dt > 0 else 0.0
 
-                # Write shared state under lock
-                with self._lock:
-                    self._people_count = people_count
-                    self._all_seen_ids.update(seen_ids)
-                    self._total_unique = len(self._all_seen_ids)
-                    self._fps = self._fps * 0.8 + fps * 0.2
-                    self._raw_frame = frame
-                    self._jpeg_frame = jpeg_bytes
+                # Publish this frame's stats and JPEG in one reference swap
+                self._unique_ids.update(seen_ids)
+                live = self._live
+                smoothed_fps = live.fps * 0.8 + fps * 0.2
+                self._live = LiveStats(
+                    people_count=people_count,
+                    total_unique=len(self._unique_ids),
+                    fps=smoothed_fps,
+                    frame_seq=live.frame_seq + 1,
+                    jpeg=jpeg_bytes,
+                )
+                self._frame_ring.append(now, jpeg_bytes)
+                self._history.record(now_t, frame_tracks)
+                sink = self._frame_sink
+                if sink is not None:
+                    sink(now, jpeg_bytes, frame_tracks)
+                if recording:
+                    self._recorder.submit(raw_frame if raw_frame is not None else frame, now_t, smoothed_fps)
 
                 # Signal waiting MJPEG generators
                 self._frame_event.set()
-
-                # small sleep when paused to avoid busy-loop
-                with self._lock:
-                    if self._paused:
-                        time.sleep(0.1)
+                t_done = perf()
+                timings.observe("publish", t_done - t_publish)
+                timings.observe("frame", t_done - t_frame)
+
+                # nobody watching: hold the next frame back to the watch rate,
+                # unless a consumer (or pause/stop/settings) wakes us first
+                self._wake.clear()
+                watching = (bool(watch_fps) and not recording and self._running and not self._paused
+                            and not self._has_consumers())
+                if watching:
+                    self._wake.wait(max(0.0, t_frame + 1.0 / watch_fps - perf()))
+                activity = "watching" if watching else "running"
+                if activity != self._activity:
+                    with self._lock:
+                        if self._running and not self._paused:
+                            self._activity = activity
 
             except Exception as e:
                 print(f"[detection-loop] error: {e}")
@@ -452,6 +1394,86 @@ class DetectionEngine:
                 traceback.print_exc()
                 time.sleep(0.1)
 
+    def _wait_while_paused(self) -> bool:
+        """Block the detection thread until resumed, without using CPU.
+
+        After idle_timeout seconds the camera is released (only one start()
+        opened itself) and reopened on resume.  Returns False when detection
+        stops meanwhile or the camera can't be reopened.
+        """
+        paused_at = time.monotonic()
+        while True:
+            self._wake.clear()
+            release = None
+            with self._lock:
+                if not self._running:
+                    return False
+                if not self._paused:
+                    break
+                if self._activity != "idle":
+                    self._activity = "paused"
+                timeout = self._settings.idle_timeout
+                wait = None
+                if self._activity == "paused" and timeout and self._owns_camera:
+                    wait = paused_at + timeout - time.monotonic()
+                    if wait <= 0:
+                        release, self._cap = self._cap, None
+                        self._activity = "idle"
+            if release is not None:
+                release.release()
+                print(f"[detection] paused for {timeout:.0f} s; camera released", flush=True)
+                continue
+            self._wake.wait(wait)
+
+        with self._lock:
+            reopen = self._cap is None and self._owns_camera
+            index = self._source_index
+        if reopen:
+            cap = self._open_camera(index)
+            if cap is None:
+                print(f"[detection] cannot reopen camera {index}; stopping", flush=True)
+                with self._lock:
+                    self._running = False
+                return False
+            with self._lock:
+                if not self._running:
+                    cap.release()
+                    return False
+                self._cap = cap
+        with self._lock:
+            if self._running:
+                self._activity = "running"
+        return True
+
+    def _update_tracks(self, seen_ids: set[int], now: float) -> dict:
+        """Touch the tracks seen this frame and evict lost ones.
+
+        Returns track ID -> TrackState for the IDs in *seen_ids*.  Must be
+        called with the face lock held.
+        """
+        states = {tid: self._tracks.touch(tid, now) for tid in seen_ids}
+        self._tracks.expire(now)
+        return states
+
+    def _try_reid(self, frame, x1, y1, x2, y2, state, seen_ids: set[int], now: float) -> None:
+        """Give an unnamed track the name of a matching, recently lost track.
+
+        Only the first few frames of a track are tried, and the caller only
+        calls this when some named track has actually disappeared (checked
+        once per frame), so steady scenes pay nothing.
+        """
+        if state.reid_attempts >= self._reid_max_attempts:
+            return
+        state.reid_attempts += 1
+        desc = appearance_descriptor(frame, x1, y1, x2, y2)
+        if desc is None:
+            return
+        with self._face_lock:
+            name = self._appearance.match(desc, seen_ids, now)
+        if name:
+            state.name = name
+            self._reid_hits += 1
+
     # ------------------------------------------------------------------
     # Async face recognition
     # ------------------------------------------------------------------
@@ -464,11 +1486,21 @@ class DetectionEngine:
         if self._face_proc_crashes >= 3:
             return None
         if self._face_proc_pool is None:
-            self._face_proc_pool = ProcessPoolExecutor(max_workers=1)
+            budget = self._resources.budget
+            self._face_proc_pool = ProcessPoolExecutor(
+                max_workers=budget.face_workers,
+                initializer=init_face_worker,
+                initargs=(budget.face_threads, budget.face_cores if budget.affinity else []),
+            )
         return self._face_proc_pool
 
-    def _recognize_async(self, track_id: int, crop, tolerance: float) -> None:
-        """Run face recognition in a separate process and update the cache."""
+    def _recognize_async(self, track_id: int, crop, tolerance: float, submitted: float) -> None:
+        """Run face recognition in a separate process and update the cache.
+
+        *submitted* is the perf_counter() time the job was queued.
+        """
+        timings = self._timings
+        timings.observe("face_queue", time.perf_counter() - submitted)
         try:
             pool = self._get_face_proc_pool()
             if pool is None:
@@ -478,11 +1510,20 @@ class DetectionEngine:
             if not encodings:
                 return
 
-            future = pool.submit(_recognize_worker, crop, tolerance, encodings)
-            name = future.result(timeout=30)
+            t_execute = time.perf_counter()
+            interval = self._profiler.interval
+            if interval:
+                # a CPU profile is running: sample the worker process too
+                future = pool.submit(profiled_call, _recognize_worker, interval, crop, tolerance, encodings)
+                name, stacks = future.result(timeout=30)
+                self._profiler.add("face-worker", stacks)
+            else:
+                future = pool.submit(_recognize_worker, crop, tolerance, encodings)
+                name = future.result(timeout=30)
+            timings.observe("face_execute", time.perf_counter() - t_execute)
             if name:
-                with self._lock:
-                    self._face_cache[track_id] = name
+                with self._face_lock:
+                    self._tracks.set_name(track_id, name)
             # Reset crash counter on success
             self._face_proc_crashes = 0
         except BrokenProcessPool:
@@ -495,7 +1536,7 @@ class DetectionEngine:
         except Exception as e:
             print(f"[face-rec] error for track {track_id}: {e}", flush=True)
         finally:
-            with self._lock:
+            with self._face_lock:
                 self._face_in_flight.discard(track_id)
 
     # ------------------------------------------------------------------
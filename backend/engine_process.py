@@ -0,0 +1,481 @@
+"""
+EngineProcess — the DetectionEngine in a process of its own.
+
+In the default setup the engine's threads (capture, inference, drawing,
+encoding) share the server process, and its GIL, with request handling.
+EngineProcess runs the engine in a child process instead and stands in for
+it towards the routes:
+
+  * control and settings calls are forwarded over a pipe and answered by a
+    small thread pool in the child;
+  * encoded frames and their detections are published through a FrameBus
+    (shared memory); the child only sends a tiny notification per frame, and
+    every MJPEG viewer reads the newest frame straight from shared memory;
+  * analytics events are forwarded in batches and fanned out to SSE clients
+    by an EventBus in the API process, which also reports how many viewers
+    it has so the engine knows when to drop to its watch rate;
+  * screenshots, recordings and analysis outputs are files, served by the
+    API process directly.
+
+If the child dies, calls fail with EngineUnavailable (HTTP 503) while it is
+restarted with backoff; settings changed since start-up are replayed, and
+detection resumes if it was running.
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from backend.detector import SCREENSHOT_DIR, DetectionEngine, _writable_dir
+from backend.events import EventBus
+from backend.frame_bus import FrameBus
+from backend.recorder import VideoRecorder
+from backend.screenshot_store import ScreenshotStore
+from backend.snapshots import SnapshotCache
+
+# DetectionEngine methods that simply run in the engine process
+_REMOTE_METHODS = frozenset({
+    "pause", "get_settings", "models", "take_screenshot", "capture_burst", "query_history",
+    "get_analytics_config", "set_analytics_config", "start_analysis", "detection_cache_stats",
+    "clear_detection_cache", "list_analyses", "analysis_file", "start_recording", "stop_recording",
+    "recording_status", "set_metrics", "get_resources", "set_resources", "start_autotune",
+    "profile_cpu", "memory_status", "set_memory_tracing", "memory_snapshot", "gpu_info",
+    "enroll_face_from_image", "list_faces", "delete_face", "export_face_db", "import_face_db",
+    "start_bulk_enroll", "get_job", "compact_face_db",
+})
+
+_CALL_TIMEOUT = 180.0        # longest call: a 120 s CPU profile, or start() waiting for the model
+_HEARTBEAT = 0.5             # seconds between engine state updates
+_RPC_THREADS = 16
+_MAX_BACKOFF = 30.0          # seconds between restarts of a crash-looping engine
+_STABLE_UPTIME = 60.0        # an engine that ran this long resets the backoff
+
+
+class EngineUnavailable(RuntimeError):
+    """The engine process is down or restarting."""
+
+
+# ----------------------------------------------------------------------
+# Child process
+# ----------------------------------------------------------------------
+
+def _serve(conn, bus_name: str, data_dir: Path | None) -> None:
+    """Engine process entry point: run a DetectionEngine and answer calls
+    from *conn* until the API process closes it."""
+    engine = DetectionEngine(data_dir)
+    # viewers connect to the API process, which reports them
+    engine.set_remote_consumers(0)
+    bus = FrameBus.attach(bus_name)
+    send_lock = threading.Lock()
+    closed = threading.Event()
+
+    def send(message) -> None:
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, ValueError):
+                closed.set()
+
+    def on_frame(timestamp: float, jpeg: bytes, tracks: list) -> None:
+        seq = bus.publish(timestamp, jpeg, {"tracks": tracks})
+        if seq:
+            send(("frame", seq))
+
+    def forward_events() -> None:
+        q = engine.events.subscribe()
+        while not closed.is_set():
+            try:
+                batch = [q.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < 256:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            send(("events", batch))
+
+    def heartbeat() -> None:
+        while not closed.wait(_HEARTBEAT):
+            stats = engine.get_stats()
+            send(("state", {"running": stats["running"], "paused": stats["paused"]}))
+
+    def handle(call_id: int, name: str, args: tuple, kwargs: dict) -> None:
+        try:
+            reply = (call_id, True, getattr(engine, name)(*args, **kwargs))
+        except Exception as e:
+            reply = (call_id, False, f"{type(e).__name__}: {e}")
+        send(("reply", reply))
+
+    engine.set_frame_sink(on_frame)
+    threading.Thread(target=forward_events, name="event-forward", daemon=True).start()
+    threading.Thread(target=heartbeat, name="heartbeat", daemon=True).start()
+    engine.warm_up()
+
+    pool = ThreadPoolExecutor(max_workers=_RPC_THREADS, thread_name_prefix="rpc")
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        pool.submit(handle, *message)
+    closed.set()
+    engine.shutdown()
+    engine.set_frame_sink(None)
+    bus.close()
+
+
+# ----------------------------------------------------------------------
+# API process
+# ----------------------------------------------------------------------
+
+class EngineProcess:
+    """Drop-in replacement for DetectionEngine that runs it in a child process."""
+
+    def __init__(self, data_dir: Path | None = None) -> None:
+        data = data_dir or _writable_dir()
+        self._data_dir = data_dir
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        self._calls: dict[int, Future] = {}
+        self._call_ids = itertools.count(1)
+        self._closing = False
+        self._monitor: threading.Thread | None = None
+
+        # restart bookkeeping
+        self._restarts = 0
+        self._crashes_in_row = 0
+        self._last_exit_code: int | None = None
+        self._started_at = 0.0
+        self._settings: dict = {}          # replayed into a restarted engine
+        self._remote_state = {"running": False, "paused": False}
+
+        # frames (shared memory) and events, fanned out here
+        self._bus = FrameBus.create()
+        self._frames = threading.Condition()
+        self._frame_seq = 0
+        self._frame_epoch = os.urandom(4).hex()
+        self._snapshots = SnapshotCache()
+        self._stream_clients = 0
+        self._events = EventBus(on_change=self._report_consumers)
+        self._consumer_reporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="consumers")
+
+        # file-backed stores, served without a round trip
+        self._screenshots = ScreenshotStore(data / "screenshots" if data_dir else SCREENSHOT_DIR)
+        self._recorder = VideoRecorder(data / "recordings")
+        self._analysis_dir = data / "analysis"
+
+    # ------------------------------------------------------------------
+    # Process lifecycle
+    # ------------------------------------------------------------------
+
+    def warm_up(self) -> None:
+        """Start the engine process (it loads the model in the background)."""
+        with self._lock:
+            if self._monitor is not None:
+                return
+            self._spawn()
+            self._monitor = threading.Thread(target=self._watch, name="engine-monitor", daemon=True)
+        self._monitor.start()
+
+    def _spawn(self) -> None:
+        """Start a child process and its reader thread; lock held."""
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_serve, args=(child, self._bus.name, self._data_dir), name="detection-engine",
+        )
+        process.start()
+        child.close()
+        self._process, self._conn = process, parent
+        self._started_at = time.time()
+        threading.Thread(target=self._read, args=(parent,), name="engine-reader", daemon=True).start()
+        print(f"[engine] detection engine process started (pid {process.pid})", flush=True)
+
+    def _watch(self) -> None:
+        """Restart the engine process whenever it dies unexpectedly."""
+        while True:
+            process = self._process
+            process.join()
+            if self._closing:
+                return
+            uptime = time.time() - self._started_at
+            with self._lock:
+                self._last_exit_code = process.exitcode
+                self._crashes_in_row = 1 if uptime >= _STABLE_UPTIME else self._crashes_in_row + 1
+                delay = min(_MAX_BACKOFF, 2.0 ** (self._crashes_in_row - 1))
+                resume = self._remote_state["running"]
+                self._remote_state = {"running": False, "paused": False}
+            self._fail_calls("Detection engine process exited; restarting")
+            with self._frames:
+                self._frames.notify_all()
+            print(f"[engine] process exited with code {process.exitcode}; restarting in {delay:.0f} s", flush=True)
+            time.sleep(delay)
+            if self._closing:
+                return
+            with self._lock:
+                self._restarts += 1
+                self._spawn()
+            threading.Thread(target=self._restore, args=(resume,), name="engine-restore", daemon=True).start()
+
+    def _restore(self, resume: bool) -> None:
+        """Bring a restarted engine back to where the old one was."""
+        try:
+            with self._lock:
+                settings = dict(self._settings)
+            if settings:
+                self._call("update_settings", settings)
+            self._call("set_remote_consumers", self._consumer_count())
+            if resume:
+                print(f"[engine] resuming detection: {self._call('start')}", flush=True)
+        except (EngineUnavailable, RuntimeError) as e:
+            print(f"[engine] could not restore state: {e}", flush=True)
+
+    def _read(self, conn) -> None:
+        """Dispatch messages from one engine process until its pipe closes."""
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                return
+            if kind == "reply":
+                call_id, ok, result = payload
+                with self._lock:
+                    future = self._calls.pop(call_id, None)
+                if future is not None:
+                    if ok:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(RuntimeError(result))
+            elif kind == "frame":
+                with self._frames:
+                    self._frame_seq = payload
+                    self._frames.notify_all()
+            elif kind == "events":
+                self._events.publish(payload)
+            elif kind == "state":
+                with self._lock:
+                    self._remote_state = payload
+
+    def _fail_calls(self, message: str) -> None:
+        with self._lock:
+            calls, self._calls = self._calls, {}
+        for future in calls.values():
+            future.set_exception(EngineUnavailable(message))
+
+    def _call(self, name: str, *args, timeout: float = _CALL_TIMEOUT, **kwargs):
+        with self._lock:
+            process, conn = self._process, self._conn
+            if process is None or not process.is_alive():
+                raise EngineUnavailable("Detection engine is not running; restarting")
+            call_id = next(self._call_ids)
+            future: Future = Future()
+            self._calls[call_id] = future
+        try:
+            with self._send_lock:
+                conn.send((call_id, name, args, kwargs))
+            return future.result(timeout)
+        except (OSError, ValueError) as e:
+            raise EngineUnavailable(f"Detection engine unreachable: {e}") from None
+        except TimeoutError:
+            raise EngineUnavailable(f"Detection engine did not answer {name}() in {timeout:.0f} s") from None
+        finally:
+            with self._lock:
+                self._calls.pop(call_id, None)
+
+    def __getattr__(self, name: str):
+        if name in _REMOTE_METHODS:
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def shutdown(self) -> None:
+        """Stop detection and the engine process, and free the frame bus."""
+        self._closing = True
+        with self._lock:
+            process, conn = self._process, self._conn
+        if process is not None:
+            try:
+                with self._send_lock:
+                    conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+        self._fail_calls("Detection engine is shutting down")
+        self._consumer_reporter.shutdown(wait=False)
+        self._bus.close()
+
+    # ------------------------------------------------------------------
+    # Calls with a local part
+    # ------------------------------------------------------------------
+
+    def start(self, capture=None) -> dict:
+        """Start detection; a *capture* must be picklable (synthetic sources
+        are, an opened cv2.VideoCapture isn't) and is moved to the engine."""
+        result = self._call("start", capture)
+        if result.get("status") in ("started", "already_running"):
+            with self._lock:
+                self._remote_state = {"running": True, "paused": False}
+        return result
+
+    def stop(self) -> dict:
+        result = self._call("stop")
+        with self._lock:
+            self._remote_state = {"running": False, "paused": False}
+        with self._frames:
+            self._frames.notify_all()
+        return result
+
+    def get_stats(self) -> dict:
+        return self._call("get_stats")
+
+    def update_settings(self, data: dict) -> dict:
+        result = self._call("update_settings", data)
+        with self._lock:
+            self._settings.update(data)
+        return result
+
+    def health(self) -> dict:
+        with self._lock:
+            process = self._process
+            info = {
+                "mode": "process",
+                "pid": process.pid if process is not None else None,
+                "alive": process is not None and process.is_alive(),
+                "restarts": self._restarts,
+                "last_exit_code": self._last_exit_code,
+                "frame_bus": self._bus.stats(),
+            }
+        try:
+            status = self._call("health", timeout=5.0)
+        except (EngineUnavailable, RuntimeError) as e:
+            status = {
+                "status": "starting", "ready": False, "stage": "engine", "progress": 0.0,
+                "error": str(e), "stages": {}, "uptime": None, "time_to_ready": None,
+            }
+        return {**status, "engine": info}
+
+    def get_analytics(self) -> dict:
+        result = self._call("get_analytics")
+        # the child's only subscriber is the forwarder; clients connect here
+        result["events"] = self._events.stats()
+        return result
+
+    def _consumer_count(self) -> int:
+        return self._stream_clients + self._events.subscriber_count()
+
+    def _report_consumers(self) -> None:
+        """Tell the engine how many viewers it has, off the caller's thread."""
+        if not self._closing:
+            self._consumer_reporter.submit(self._send_consumers)
+
+    def _send_consumers(self) -> None:
+        try:
+            self._call("set_remote_consumers", self._consumer_count())
+        except (EngineUnavailable, RuntimeError):
+            pass                # a restarted engine gets the count in _restore()
+
+    def _metric_overrides(self) -> dict:
+        return {
+            "stream_clients": self._stream_clients,
+            "event_subscribers": self._events.subscriber_count(),
+        }
+
+    def get_metrics(self) -> dict:
+        return self._call("get_metrics", self._metric_overrides())
+
+    def metrics_text(self) -> str:
+        return self._call("metrics_text", self._metric_overrides())
+
+    # ------------------------------------------------------------------
+    # Served from this process
+    # ------------------------------------------------------------------
+
+    def list_screenshots(self, limit: int = 60, cursor: str | None = None) -> dict:
+        return self._screenshots.page(limit=limit, cursor=cursor)
+
+    @property
+    def screenshots(self) -> ScreenshotStore:
+        return self._screenshots
+
+    @property
+    def recorder(self) -> VideoRecorder:
+        return self._recorder
+
+    @property
+    def analysis_dir(self) -> Path:
+        return self._analysis_dir
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
+    @property
+    def frame_bus(self) -> FrameBus:
+        return self._bus
+
+    def event_generator(self):
+        return self._events.stream()
+
+    def snapshot(self, width: int | None = None, quality: int | None = None,
+                 if_none_match: str | None = None) -> tuple[str, bytes | None] | None:
+        """Like DetectionEngine.snapshot(), from the frame bus; bus sequence
+        numbers keep counting across engine restarts."""
+        with self._lock:
+            running = self._remote_state["running"]
+        if not running:
+            return None
+        seq = self._bus.latest_seq()
+        etag = f'"{self._frame_epoch}-{seq}-{width or 0}-{quality or 0}"'
+        if seq and if_none_match == etag:
+            return etag, None
+        frame = self._bus.read()
+        if frame is None:
+            return None
+        seq, _, jpeg, _ = frame
+        etag = f'"{self._frame_epoch}-{seq}-{width or 0}-{quality or 0}"'
+        return etag, self._snapshots.get(seq, jpeg, width, quality)
+
+    def frame_generator(self):
+        """Yields MJPEG multipart frames read from the frame bus."""
+        with self._frames:
+            self._stream_clients += 1
+        self._report_consumers()
+        try:
+            last = 0
+            while not self._closing:
+                with self._frames:
+                    self._frames.wait_for(lambda: self._frame_seq != last, timeout=1.0)
+                    seq = self._frame_seq
+                if seq == last:
+                    with self._lock:
+                        running = self._remote_state["running"]
+                    if not running:
+                        break
+                    continue
+                frame = self._bus.read()
+                if frame is None:
+                    # nothing readable for this announcement: wait for the next
+                    # one instead of spinning on the same sequence number
+                    last = seq
+                    continue
+                last = frame[0]
+                yield (
+                    b"--frame\r\n"
+                    b"Content-Type: image/jpeg\r\n\r\n" + frame[2] + b"\r\n"
+                )
+        finally:
+            with self._frames:
+                self._stream_clients -= 1
+            self._report_consumers()
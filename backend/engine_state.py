@@ -0,0 +1,90 @@
+"""
+Immutable snapshots of the detection engine's settings and live stats.
+
+The detection loop, route handlers, stream generators and metrics all read
+the same settings and stats.  Instead of sharing one lock, the engine keeps
+each as a frozen object and publishes a new one by swapping a single
+attribute reference, which is atomic in Python:
+
+- ``EngineSettings`` is replaced by ``update_settings()`` (writers are
+  serialised by the engine's control lock).  The loop picks up the current
+  object once per frame, so one frame never mixes old and new settings.
+- ``LiveStats`` is replaced by the detection loop once per frame, together
+  with the frame's JPEG, so a reader's stats always describe the frame it
+  got.
+
+Readers take no lock at all and can never hold the detection loop up.
+"""
+
+from dataclasses import dataclass, replace
+
+from backend.trackers import DEFAULT_TRACKER, TRACKERS
+
+WATCH_FPS = 2.0          # default frame rate without consumers
+IDLE_TIMEOUT = 300.0     # default seconds paused before the camera is released
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    """Detection settings as seen by one frame."""
+
+    confidence: float = 0.45
+    camera_index: int = 0
+    model_name: str = "yolov8n.pt"
+    show_labels: bool = True
+    show_confidence: bool = True
+    face_recognition_enabled: bool = False
+    face_recognition_tolerance: float = 0.6
+    record_min_people: int = 0       # auto-record at this many people (0 = off)
+    record_raw: bool = False         # record frames without annotations
+    tracker: str = DEFAULT_TRACKER
+    watch_fps: float = WATCH_FPS         # frame rate without consumers (0 = full rate)
+    idle_timeout: float = IDLE_TIMEOUT   # seconds paused before the camera is released (0 = never)
+
+    def updated(self, data: dict) -> "EngineSettings":
+        """A copy with the known keys of *data* applied and clamped; unknown
+        keys and unknown trackers are ignored."""
+        changes = {}
+        if "confidence" in data:
+            changes["confidence"] = max(0.1, min(0.95, float(data["confidence"])))
+        if "camera_index" in data:
+            changes["camera_index"] = int(data["camera_index"])
+        if "show_labels" in data:
+            changes["show_labels"] = bool(data["show_labels"])
+        if "show_confidence" in data:
+            changes["show_confidence"] = bool(data["show_confidence"])
+        if "model_name" in data:
+            changes["model_name"] = str(data["model_name"])
+        if "face_recognition_enabled" in data:
+            changes["face_recognition_enabled"] = bool(data["face_recognition_enabled"])
+        if "face_recognition_tolerance" in data:
+            changes["face_recognition_tolerance"] = max(0.3, min(0.8, float(data["face_recognition_tolerance"])))
+        if "record_min_people" in data:
+            changes["record_min_people"] = max(0, int(data["record_min_people"]))
+        if "record_raw" in data:
+            changes["record_raw"] = bool(data["record_raw"])
+        if data.get("tracker") in TRACKERS:
+            changes["tracker"] = data["tracker"]
+        if "watch_fps" in data:
+            watch_fps = max(0.0, min(30.0, float(data["watch_fps"])))
+            changes["watch_fps"] = max(0.1, watch_fps) if watch_fps else 0.0
+        if "idle_timeout" in data:
+            changes["idle_timeout"] = max(0.0, float(data["idle_timeout"]))
+        return replace(self, **changes) if changes else self
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)       # flat fields: a shallow copy, unlike asdict()
+
+
+@dataclass(frozen=True)
+class LiveStats:
+    """What the detection loop published for its latest frame."""
+
+    people_count: int = 0
+    total_unique: int = 0
+    fps: float = 0.0
+    frame_seq: int = 0               # numbers published frames, for snapshot ETags
+    jpeg: bytes | None = None        # the frame as streamed; None before the first one
+
+
+NO_STATS = LiveStats()
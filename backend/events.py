@@ -0,0 +1,75 @@
+"""
+EventBus — fan-out of detection events to Server-Sent Events subscribers.
+
+The detection loop publishes without ever blocking: each subscriber has a
+bounded queue and events are dropped (and counted) for clients that stop
+reading.
+"""
+
+import json
+import queue
+import threading
+
+
+class EventBus:
+    """Thread-safe publish/subscribe with one bounded queue per subscriber.
+
+    *on_change* is called (without arguments, outside the lock) whenever a
+    subscriber joins or leaves.
+    """
+
+    def __init__(self, queue_size: int = 256, on_change=None) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: set[queue.Queue] = set()
+        self._queue_size = queue_size
+        self._dropped = 0
+        self._on_change = on_change
+
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        if self._on_change is not None:
+            self._on_change()
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+        if self._on_change is not None:
+            self._on_change()
+
+    def publish(self, events: list[dict]) -> None:
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            for event in events:
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    self._dropped += 1
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, keepalive: float = 15.0):
+        """Yield SSE-formatted events until the client disconnects."""
+        q = self.subscribe()
+        try:
+            yield b": connected\n\n"
+            while True:
+                try:
+                    event = q.get(timeout=keepalive)
+                except queue.Empty:
+                    # comment line keeps proxies open and detects dead clients
+                    yield b": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+        finally:
+            self.unsubscribe(q)
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscriber_count(), "dropped": self._dropped}
@@ -4,20 +4,46 @@ FaceDatabase — thread-safe face encoding storage with pickle persistence.
 Stores 128-d face encodings per person name, supports enrollment and recognition.
 """
 
+import hashlib
+import io
 import pickle
+import sys as _sys
+import os
 import threading
 from pathlib import Path
 
-# ---------------------------------------------------------------------------
-# Compatibility shim: face_recognition_models uses pkg_resources which was
-# removed in Python 3.14+.  Also handles PyInstaller frozen bundles where
-# the package data lives under sys._MEIPASS.
-# ---------------------------------------------------------------------------
-import sys as _sys
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+
+_MAX_ENROLL = 800
+_MAX_RECOGNIZE = 1500
 
-try:
-    import face_recognition_models  # noqa: F401
-except (ImportError, ModuleNotFoundError, RuntimeError):
+# Gallery compaction: a person with more than _AUTO_COMPACT_AT samples is
+# reduced to _MAX_PROTOTYPES medoids after enrollment / import.
+_MAX_PROTOTYPES = 16
+_AUTO_COMPACT_AT = 48
+
+# Encodings closer than this to an existing sample of the same person are
+# treated as duplicates (re-uploads of the same photo land at ~0.0).
+_DUPLICATE_DISTANCE = 0.06
+# Max entries in the persistent content-hash -> encoding cache
+_HASH_CACHE_MAX = 20000
+# New cache entries are written this many seconds after the first unsaved
+# one (bulk jobs and shutdown flush at once)
+_HASH_CACHE_FLUSH_DELAY = 5.0
+
+
+def _install_models_shim() -> None:
+    """Compatibility shim: face_recognition_models uses pkg_resources which
+    was removed in Python 3.14+.  Also handles PyInstaller frozen bundles
+    where the package data lives under sys._MEIPASS."""
+    try:
+        import face_recognition_models  # noqa: F401
+        return
+    except (ImportError, ModuleNotFoundError, RuntimeError):
+        pass
     import types
 
     _frm = types.ModuleType("face_recognition_models")
@@ -56,24 +82,88 @@ except (ImportError, ModuleNotFoundError, RuntimeError):
     _frm.cnn_face_detector_model_location = lambda: str(_models / "mmod_human_face_detector.dat")
 
     _sys.modules["face_recognition_models"] = _frm
-# ---------------------------------------------------------------------------
 
-import cv2
-import dlib
-import numpy as np
-import face_recognition
 
+# dlib and face_recognition take seconds to import (and load their model
+# files), so they are imported on first use rather than with this module.
+_import_lock = threading.Lock()
+_face_recognition = None
+_has_gpu: bool | None = None
 
-_MAX_ENROLL = 800
-_MAX_RECOGNIZE = 1500
 
-# Detect GPU availability once at import time
-HAS_GPU: bool = False
-try:
-    if dlib.DLIB_USE_CUDA and dlib.cuda.get_num_devices() > 0:
-        HAS_GPU = True
-except Exception:
-    pass
+def face_lib():
+    """The face_recognition module, imported on first call."""
+    global _face_recognition
+    if _face_recognition is None:
+        with _import_lock:
+            if _face_recognition is None:
+                _install_models_shim()
+                import face_recognition
+                _face_recognition = face_recognition
+    return _face_recognition
+
+
+def has_gpu() -> bool:
+    """Whether dlib was built with CUDA and sees a device (checked once)."""
+    global _has_gpu
+    if _has_gpu is None:
+        face_lib()
+        try:
+            import dlib
+            _has_gpu = bool(dlib.DLIB_USE_CUDA and dlib.cuda.get_num_devices() > 0)
+        except Exception:
+            _has_gpu = False
+    return _has_gpu
+
+
+def decode_image(data: bytes) -> np.ndarray | None:
+    """Decode image bytes to a BGR numpy array, applying EXIF orientation."""
+    try:
+        pil_img = Image.open(io.BytesIO(data))
+        pil_img = ImageOps.exif_transpose(pil_img)
+        pil_img = pil_img.convert("RGB")
+        rgb = np.asarray(pil_img)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    except Exception:
+        return None
+
+
+def content_hash(data: bytes) -> str:
+    """Stable hash of an image's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def encoding_key(image_hash: str, cpu_only: bool) -> str:
+    """Encoding cache key: the image plus the face detector that encoded it
+    (HOG and CNN can find different faces in one image)."""
+    return f"{'hog' if cpu_only else 'cnn'}:{image_hash}"
+
+
+def _append_unique(target: list[np.ndarray], encodings) -> int:
+    """Append encodings not within _DUPLICATE_DISTANCE of *target*; return skipped count."""
+    candidates = [np.asarray(enc) for enc in encodings]
+    if not candidates:
+        return 0
+    # existing samples stacked once; accepted candidates fill the rows after
+    # them.  Squared distances via |a|^2 + |b|^2 - 2ab: one matvec per check.
+    matrix = np.empty((len(target) + len(candidates), candidates[0].shape[-1]), dtype=np.float64)
+    sq = np.empty(len(matrix))
+    count = len(target)
+    if count:
+        matrix[:count] = np.stack(target)
+        sq[:count] = np.einsum("ij,ij->i", matrix[:count], matrix[:count])
+    limit = _DUPLICATE_DISTANCE ** 2
+    skipped = 0
+    for enc in candidates:
+        enc_sq = float(enc @ enc)
+        if count and float(np.min(sq[:count] - 2.0 * (matrix[:count] @ enc))) + enc_sq < limit:
+            skipped += 1
+            continue
+        target.append(enc)
+        matrix[count] = enc
+        sq[count] = enc_sq
+        count += 1
+    return skipped
 
 
 def _prepare_rgb(bgr_image: np.ndarray, max_dim: int = _MAX_RECOGNIZE) -> np.ndarray:
@@ -96,20 +186,20 @@ def _detect_and_encode(rgb: np.ndarray, model: str = "hog"):
 
     if model == "cnn":
         try:
-            locations = face_recognition.face_locations(rgb, model="cnn")
+            locations = face_lib().face_locations(rgb, model="cnn")
         except Exception:
-            gpu_failed = HAS_GPU  # only flag it when we actually expected GPU
+            gpu_failed = has_gpu()  # only flag it when we actually expected GPU
             locations = None
 
     # HOG fallback (or primary when model="hog")
     if not locations:
-        locations = face_recognition.face_locations(rgb, model="hog")
+        locations = face_lib().face_locations(rgb, model="hog")
     if not locations:
-        locations = face_recognition.face_locations(rgb, number_of_times_to_upsample=2, model="hog")
+        locations = face_lib().face_locations(rgb, number_of_times_to_upsample=2, model="hog")
     if not locations:
         return None, None, gpu_failed
 
-    encoding = face_recognition.face_encodings(rgb, known_face_locations=locations)[0]
+    encoding = face_lib().face_encodings(rgb, known_face_locations=locations)[0]
     return locations, encoding, gpu_failed
 
 
@@ -127,13 +217,86 @@ def _recognize_worker(crop, tolerance, encodings_snapshot):
         for enc in encs:
             all_names.append(person_name)
             all_encs.append(enc)
-    distances = face_recognition.face_distance(all_encs, encoding)
+    distances = face_lib().face_distance(all_encs, encoding)
     best_idx = int(np.argmin(distances))
     if distances[best_idx] <= tolerance:
         return all_names[best_idx]
     return None
 
 
+def _medoids(encodings: np.ndarray, k: int, max_iter: int = 10) -> np.ndarray:
+    """Return indices of *k* medoids of *encodings* (k-medoids, Voronoi iteration).
+
+    Seeded farthest-first from the overall medoid so outlying poses and
+    lighting conditions keep a representative.  Fewer than *k* come back
+    when the samples hold fewer distinct encodings.
+    """
+    n = len(encodings)
+    if n <= k:
+        return np.arange(n)
+    # Gram-matrix form: n x n memory instead of an n x n x 128 difference tensor
+    encodings = np.asarray(encodings, dtype=np.float64)
+    sq = np.einsum("ij,ij->i", encodings, encodings)
+    dist = sq[:, None] + sq[None, :] - 2.0 * (encodings @ encodings.T)
+    np.sqrt(np.clip(dist, 0.0, None, out=dist), out=dist)
+    np.fill_diagonal(dist, 0.0)
+    medoids = [int(np.argmin(dist.sum(axis=1)))]
+    nearest = dist[medoids[0]].copy()
+    while len(medoids) < k:
+        nxt = int(np.argmax(nearest))
+        if nearest[nxt] <= 1e-6:    # rounding can leave duplicates a hair above 0
+            break                    # every sample duplicates a medoid already
+        medoids.append(nxt)
+        nearest = np.minimum(nearest, dist[nxt])
+    medoids = np.array(medoids)
+
+    for _ in range(max_iter):
+        assign = np.argmin(dist[:, medoids], axis=1)
+        updated = medoids.copy()
+        for c in range(len(medoids)):
+            members = np.flatnonzero(assign == c)
+            if len(members):
+                within = dist[np.ix_(members, members)].sum(axis=1)
+                updated[c] = members[int(np.argmin(within))]
+        if np.array_equal(np.sort(updated), np.sort(medoids)):
+            break
+        medoids = updated
+    return medoids
+
+
+def _match_accuracy(gallery: dict[str, list[np.ndarray]], probes: list[tuple[str, np.ndarray]],
+                    tolerance: float) -> float | None:
+    """Fraction of *probes* whose nearest gallery encoding is their own name."""
+    if not probes:
+        return None
+    names = [n for n, encs in gallery.items() for _ in encs]
+    if not names:
+        return 0.0
+    matrix = np.stack([e for encs in gallery.values() for e in encs])
+    correct = 0
+    for name, enc in probes:
+        distances = np.linalg.norm(matrix - enc, axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] <= tolerance and names[best] == name:
+            correct += 1
+    return correct / len(probes)
+
+
+def _encode_worker(data: bytes, cpu_only: bool):
+    """Decode and encode one enrollment image in a worker process.
+
+    Returns (encoding, error_message, gpu_failed).
+    """
+    bgr = decode_image(data)
+    if bgr is None:
+        return None, "could not decode image", False
+    rgb = _prepare_rgb(bgr, max_dim=_MAX_ENROLL)
+    _, encoding, gpu_failed = _detect_and_encode(rgb, model="hog" if cpu_only else "cnn")
+    if encoding is None:
+        return None, "No face detected in image", gpu_failed
+    return encoding, None, gpu_failed
+
+
 class FaceDatabase:
     """Persistent face encoding database."""
 
@@ -141,9 +304,15 @@ class FaceDatabase:
         self._dir = db_dir
         self._dir.mkdir(parents=True, exist_ok=True)
         self._db_path = self._dir / "face_db.pkl"
+        self._hash_cache_path = self._dir / "encoding_cache.pkl"
         self._lock = threading.Lock()
         # name -> list of 128-d encoding arrays
         self._encodings: dict[str, list[np.ndarray]] = {}
+        # image content hash -> 128-d encoding (insertion ordered, oldest first)
+        self._hash_cache: dict[str, np.ndarray] = {}
+        self._hash_cache_dirty = False
+        self._flush_timer: threading.Timer | None = None
+        self._flush_lock = threading.Lock()      # serialises cache file writes
         self._load()
 
     # ------------------------------------------------------------------
@@ -154,6 +323,12 @@ class FaceDatabase:
         if self._db_path.exists():
             with open(self._db_path, "rb") as f:
                 self._encodings = pickle.load(f)
+        if self._hash_cache_path.exists():
+            try:
+                with open(self._hash_cache_path, "rb") as f:
+                    self._hash_cache = pickle.load(f)
+            except Exception:
+                self._hash_cache = {}
 
     def _save(self) -> None:
         if not self._encodings:
@@ -162,27 +337,111 @@ class FaceDatabase:
         with open(self._db_path, "wb") as f:
             pickle.dump(self._encodings, f)
 
+    def cached_encoding(self, key: str) -> np.ndarray | None:
+        """Return the encoding previously computed for an image hash, if any."""
+        with self._lock:
+            return self._hash_cache.get(key)
+
+    def remember_encodings(self, entries: dict[str, np.ndarray]) -> None:
+        """Add hash -> encoding entries to the persistent cache.
+
+        The cache file is rewritten by flush_encoding_cache(), on a timer
+        _HASH_CACHE_FLUSH_DELAY seconds after the first unsaved entry, so a
+        stream of single enrollments costs one write per interval.
+        """
+        if not entries:
+            return
+        with self._lock:
+            self._hash_cache.update(entries)
+            for stale in list(self._hash_cache)[:max(0, len(self._hash_cache) - _HASH_CACHE_MAX)]:
+                del self._hash_cache[stale]
+            self._hash_cache_dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(_HASH_CACHE_FLUSH_DELAY, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush_encoding_cache()
+        except OSError as e:
+            print(f"[face-db] could not save the encoding cache: {e}", flush=True)
+
+    def flush_encoding_cache(self) -> None:
+        """Write the encoding cache to disk if it changed since the last write."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._hash_cache_dirty:
+                    return
+                snapshot = dict(self._hash_cache)
+                self._hash_cache_dirty = False
+            # pickled outside _lock so enrollment and lookups are not held up
+            tmp = self._hash_cache_path.with_suffix(".tmp")
+            try:
+                with open(tmp, "wb") as f:
+                    pickle.dump(snapshot, f)
+                os.replace(tmp, self._hash_cache_path)
+            except OSError:
+                with self._lock:
+                    self._hash_cache_dirty = True
+                raise
+
     # ------------------------------------------------------------------
     # Enrollment
     # ------------------------------------------------------------------
 
-    def enroll_from_image(self, name: str, bgr_image: np.ndarray, cpu_only: bool = False) -> dict:
-        """Detect a face in a BGR image, encode it, and store under *name*."""
-        rgb = _prepare_rgb(bgr_image, max_dim=_MAX_ENROLL)
-        model = "hog" if cpu_only else "cnn"
-        _, encoding, gpu_failed = _detect_and_encode(rgb, model=model)
-        result: dict = {}
-        if gpu_failed:
-            result["gpu_failed"] = True
+    def enroll_from_image(self, name: str, bgr_image: np.ndarray, cpu_only: bool = False,
+                          image_hash: str | None = None) -> dict:
+        """Detect a face in a BGR image, encode it, and store under *name*.
+
+        Encodings are cached by *image_hash* (the upload's content hash, or a
+        hash of the pixels when not given) and detector, so re-uploading a
+        photo skips face detection entirely.  A sample that duplicates one already stored
+        for *name* is not added again.
+        """
+        key = encoding_key(image_hash or content_hash(bgr_image.tobytes()), cpu_only)
+        encoding = self.cached_encoding(key)
+        result: dict = {"cached": encoding is not None}
         if encoding is None:
-            return {**result, "status": "error", "message": "No face detected in image"}
+            rgb = _prepare_rgb(bgr_image, max_dim=_MAX_ENROLL)
+            model = "hog" if cpu_only else "cnn"
+            _, encoding, gpu_failed = _detect_and_encode(rgb, model=model)
+            if gpu_failed:
+                result["gpu_failed"] = True
+            if encoding is None:
+                return {**result, "status": "error", "message": "No face detected in image"}
+            if not gpu_failed:      # a HOG fallback result would be filed under CNN
+                self.remember_encodings({key: encoding})
 
         with self._lock:
-            self._encodings.setdefault(name, []).append(encoding)
+            duplicate = _append_unique(self._encodings.setdefault(name, []), [encoding]) > 0
+            if not duplicate:
+                self._auto_compact([name])
+                self._save()
             sample_count = len(self._encodings[name])
-            self._save()
 
-        return {**result, "status": "ok", "name": name, "sample_count": sample_count}
+        return {**result, "status": "ok", "name": name, "sample_count": sample_count, "duplicate": duplicate}
+
+    def enroll_batch(self, samples: list[tuple[str, np.ndarray]]) -> dict:
+        """Store many precomputed (name, encoding) samples with a single save."""
+        if not samples:
+            return {"status": "ok", "enrolled": 0, "people": {}}
+        duplicates = 0
+        with self._lock:
+            for name, encoding in samples:
+                duplicates += _append_unique(self._encodings.setdefault(name, []), [encoding])
+            names = sorted({name for name, _ in samples})
+            self._auto_compact(names)
+            self._save()
+            people = {name: len(self._encodings[name]) for name in names}
+        return {
+            "status": "ok",
+            "enrolled": len(samples) - duplicates,
+            "duplicates_skipped": duplicates,
+            "people": people,
+        }
 
     # ------------------------------------------------------------------
     # Recognition
@@ -205,7 +464,7 @@ class FaceDatabase:
                     all_names.append(person_name)
                     all_encs.append(enc)
 
-        distances = face_recognition.face_distance(all_encs, encoding)
+        distances = face_lib().face_distance(all_encs, encoding)
         best_idx = int(np.argmin(distances))
         if distances[best_idx] <= tolerance:
             return all_names[best_idx]
@@ -251,6 +510,7 @@ class FaceDatabase:
 
         If *merge* is True, new names are added and existing names get their
         sample lists extended.  If False, the database is replaced entirely.
+        Either way, samples that duplicate an existing one are skipped.
         """
         imported = pickle.loads(data)
         if not isinstance(imported, dict):
@@ -259,12 +519,13 @@ class FaceDatabase:
             if not isinstance(key, str) or not isinstance(val, list):
                 return {"status": "error", "message": "Invalid face database format"}
 
+        duplicates = 0
         with self._lock:
-            if merge:
-                for person_name, encodings in imported.items():
-                    self._encodings.setdefault(person_name, []).extend(encodings)
-            else:
-                self._encodings = imported
+            if not merge:
+                self._encodings = {}
+            for person_name, encodings in imported.items():
+                duplicates += _append_unique(self._encodings.setdefault(person_name, []), encodings)
+            self._auto_compact(imported.keys())
             self._save()
             imported_names = sorted(imported.keys())
             total_people = len(self._encodings)
@@ -273,4 +534,72 @@ class FaceDatabase:
             "status": "ok",
             "imported_names": imported_names,
             "total_people": total_people,
+            "duplicates_skipped": duplicates,
+        }
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _auto_compact(self, names) -> None:
+        """Reduce oversized galleries for *names* to medoids.  Lock must be held."""
+        for name in names:
+            encs = self._encodings.get(name)
+            if encs and len(encs) > _AUTO_COMPACT_AT:
+                idx = _medoids(np.stack(encs), _MAX_PROTOTYPES)
+                self._encodings[name] = [encs[i] for i in sorted(idx)]
+
+    def compact(self, max_prototypes: int = _MAX_PROTOTYPES, holdout: float = 0.2,
+                tolerance: float = 0.6, dry_run: bool = False) -> dict:
+        """Cluster each person's samples down to at most *max_prototypes* medoids.
+
+        Before compacting, every person's samples are split into a training
+        part and a held-out part (every n-th sample); the held-out samples are
+        matched against the full training gallery and against its compacted
+        version, so the report shows what compaction costs in accuracy.
+        With *dry_run* only the report is produced.
+        """
+        max_prototypes = max(1, int(max_prototypes))
+        step = max(2, round(1 / holdout)) if holdout > 0 else 0
+
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._encodings.items()}
+
+        train: dict[str, list[np.ndarray]] = {}
+        probes: list[tuple[str, np.ndarray]] = []
+        for name, encs in snapshot.items():
+            if step and len(encs) >= 2:
+                probes.extend((name, e) for i, e in enumerate(encs) if i % step == step - 1)
+                train[name] = [e for i, e in enumerate(encs) if i % step != step - 1]
+            else:
+                train[name] = encs
+        compacted_train = {
+            name: [encs[i] for i in sorted(_medoids(np.stack(encs), max_prototypes))]
+            for name, encs in train.items() if encs
+        }
+
+        compacted = {
+            name: [encs[i] for i in sorted(_medoids(np.stack(encs), max_prototypes))]
+            for name, encs in snapshot.items() if encs
+        }
+        samples_before = sum(len(v) for v in snapshot.values())
+        samples_after = sum(len(v) for v in compacted.values())
+
+        if not dry_run:
+            with self._lock:
+                # Only replace galleries that were not modified concurrently
+                for name, encs in compacted.items():
+                    if len(self._encodings.get(name, [])) == len(snapshot[name]):
+                        self._encodings[name] = encs
+                self._save()
+
+        return {
+            "status": "ok",
+            "dry_run": dry_run,
+            "people": len(snapshot),
+            "samples_before": samples_before,
+            "samples_after": samples_after,
+            "holdout_samples": len(probes),
+            "accuracy_before": _match_accuracy(train, probes, tolerance),
+            "accuracy_after": _match_accuracy(compacted_train, probes, tolerance),
         }
@@ -0,0 +1,133 @@
+"""
+FrameBus — a shared-memory ring of encoded frames between two processes.
+
+The detection process publishes each JPEG frame together with a small JSON
+blob (the frame's detections) into the next of a few fixed-size slots; the
+API process reads the newest one without any copying through a pipe or any
+lock shared with the writer.
+
+Every publish gets the next sequence number.  A slot carries it twice, at
+the start and at the end, and the writer updates the start before and the
+end after the payload: a reader that sees the same expected number in both
+places after copying got a consistent frame, otherwise the writer lapped it
+and it retries with the newest one.  There is exactly one writer.
+"""
+
+import json
+import struct
+from multiprocessing import shared_memory
+
+_MAGIC = b"FBUS"
+# magic, slot count, slot size, latest sequence number
+_HEADER = struct.Struct("<4sIIQ")
+# sequence (begin), timestamp, jpeg length, meta length; sequence (end) trails the payload
+_SLOT = struct.Struct("<QdII")
+_SEQ = struct.Struct("<Q")
+_LATEST_OFFSET = 12
+
+_SLOTS = 4
+_SLOT_BYTES = 4 * 1024 * 1024
+
+
+class FrameBus:
+    """A fixed-size ring of (sequence, timestamp, jpeg, meta) in shared memory.
+
+    Create it in one process with ``FrameBus.create()`` and pass ``name`` to
+    the other, which opens it with ``FrameBus.attach(name)``.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        magic, self._slots, self._slot_bytes, _ = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"shared memory {shm.name} is not a frame bus")
+        self._payload_bytes = self._slot_bytes - _SLOT.size - _SEQ.size
+        self._seq = self.latest_seq()
+        self.oversize = 0          # frames too large for a slot (writer side)
+
+    @classmethod
+    def create(cls, slots: int = _SLOTS, slot_bytes: int = _SLOT_BYTES) -> "FrameBus":
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER.size + slots * slot_bytes)
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, slots, slot_bytes, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameBus":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _slot_offset(self, seq: int) -> int:
+        return _HEADER.size + (seq % self._slots) * self._slot_bytes
+
+    def latest_seq(self) -> int:
+        """Sequence number of the newest frame (0 before the first)."""
+        return _SEQ.unpack_from(self._shm.buf, _LATEST_OFFSET)[0]
+
+    def publish(self, timestamp: float, jpeg: bytes, meta: dict | None = None) -> int:
+        """Write a frame into the next slot; returns its sequence number, or
+        0 if it didn't fit (counted in ``oversize``)."""
+        meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode()
+        size = len(jpeg) + len(meta_bytes)
+        if size > self._payload_bytes:
+            self.oversize += 1
+            return 0
+        buf = self._shm.buf
+        seq = self._seq + 1
+        offset = self._slot_offset(seq)
+        _SLOT.pack_into(buf, offset, seq, timestamp, len(jpeg), len(meta_bytes))
+        start = offset + _SLOT.size
+        buf[start:start + len(jpeg)] = jpeg
+        buf[start + len(jpeg):start + size] = meta_bytes
+        _SEQ.pack_into(buf, offset + self._slot_bytes - _SEQ.size, seq)
+        _SEQ.pack_into(buf, _LATEST_OFFSET, seq)
+        self._seq = seq
+        return seq
+
+    def read(self, seq: int | None = None) -> tuple[int, float, bytes, dict] | None:
+        """(seq, timestamp, jpeg, meta) of frame *seq* (default: the newest),
+        or None if there is none yet or it has been overwritten."""
+        buf = self._shm.buf
+        for _ in range(3):
+            want = self.latest_seq() if seq is None else seq
+            if want == 0:
+                return None
+            offset = self._slot_offset(want)
+            end = _SEQ.unpack_from(buf, offset + self._slot_bytes - _SEQ.size)[0]
+            if end != want:
+                if seq is not None:
+                    return None
+                continue           # being rewritten; the newest moved on
+            _, timestamp, jpeg_len, meta_len = _SLOT.unpack_from(buf, offset)
+            start = offset + _SLOT.size
+            if jpeg_len + meta_len > self._payload_bytes:
+                continue
+            jpeg = bytes(buf[start:start + jpeg_len])
+            meta = bytes(buf[start + jpeg_len:start + jpeg_len + meta_len])
+            if _SEQ.unpack_from(buf, offset)[0] != want:
+                if seq is not None:
+                    return None
+                continue           # overwritten while copying
+            return want, timestamp, jpeg, json.loads(meta) if meta else {}
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "slots": self._slots,
+            "slot_bytes": self._slot_bytes,
+            "latest_seq": self.latest_seq(),
+            "oversize": self.oversize,
+        }
+
+    def close(self) -> None:
+        """Detach; the creating process also removes the shared memory."""
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
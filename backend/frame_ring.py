@@ -0,0 +1,53 @@
+"""
+FrameRing — bounded in-memory history of recently encoded JPEG frames.
+
+The detection loop already JPEG-encodes every frame for the MJPEG stream;
+keeping those bytes for a few seconds lets screenshots and "save the last N
+seconds" captures go straight to disk without decoding or re-encoding.
+"""
+
+import threading
+from collections import deque
+
+
+class FrameRing:
+    """Thread-safe ring of (timestamp, jpeg bytes), bounded by age and total size."""
+
+    def __init__(self, max_seconds: float = 10.0, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._lock = threading.Lock()
+        self._frames: deque[tuple[float, bytes]] = deque()
+        self._bytes = 0
+        self._max_seconds = max_seconds
+        self._max_bytes = max_bytes
+
+    @property
+    def max_seconds(self) -> float:
+        return self._max_seconds
+
+    def append(self, timestamp: float, jpeg: bytes) -> None:
+        with self._lock:
+            self._frames.append((timestamp, jpeg))
+            self._bytes += len(jpeg)
+            cutoff = timestamp - self._max_seconds
+            while self._frames and (self._bytes > self._max_bytes or self._frames[0][0] < cutoff):
+                _, old = self._frames.popleft()
+                self._bytes -= len(old)
+
+    def latest(self) -> tuple[float, bytes] | None:
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def window(self, start: float, end: float) -> list[tuple[float, bytes]]:
+        """Frames with start <= timestamp <= end, oldest first."""
+        with self._lock:
+            return [f for f in self._frames if start <= f[0] <= end]
+
+    def stats(self) -> dict:
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if len(self._frames) > 1 else 0.0
+            return {"frames": len(self._frames), "bytes": self._bytes, "seconds": round(span, 2)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
@@ -0,0 +1,326 @@
+"""
+DetectionHistory — compact on-disk record of every frame's tracks.
+
+The detection loop calls record() once per frame, which only appends to
+in-memory column lists.  Full chunks are handed to a background writer
+thread that stores them as compressed columnar ``.npz`` files and keeps
+minute and hour rollups (occupancy and unique people) up to date, so
+questions like "how busy was it yesterday" are answered from a few
+kilobytes of JSON lines instead of replaying video.
+
+Layout::
+
+    history/20260210/chunk_<start ms>_<end ms>.npz   raw per-frame tracks
+    history/20260210/minutes.jsonl                   one row per minute
+    history/20260210/hours.jsonl                     one row per hour
+
+Rollup rows are append-only; when a period is written more than once (it
+was flushed early because detection stopped) the last row wins.
+"""
+
+import json
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+_CHUNK_FRAMES = 900          # ~1 minute at 15 FPS
+_CHUNK_SECONDS = 300         # max time one chunk spans (low frame rates, gaps)
+_QUEUE_SIZE = 16
+_RETENTION_DAYS = 30
+_MAX_RAW_ROWS = 100_000
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y%m%d")
+
+
+class _Rollup:
+    """Accumulator for one minute or hour bucket."""
+
+    __slots__ = ("start", "frames", "occupancy_sum", "occupancy_max", "ids")
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.frames = 0
+        self.occupancy_sum = 0
+        self.occupancy_max = 0
+        self.ids: set[int] = set()
+
+    def row(self, partial: bool = False) -> dict:
+        row = {
+            "t": self.start,
+            "frames": self.frames,
+            "occupancy_avg": round(self.occupancy_sum / self.frames, 3) if self.frames else 0.0,
+            "occupancy_max": self.occupancy_max,
+            "unique": len(self.ids),
+        }
+        if partial:
+            row["partial"] = True
+        return row
+
+
+class DetectionHistory:
+    """Append-only detection history with a background writer."""
+
+    def __init__(self, directory: Path, retention_days: int = _RETENTION_DAYS) -> None:
+        self._dir = directory
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._retention_days = retention_days
+        self._lock = threading.Lock()
+        self._session = 0
+        self._new_buffer()
+        self._queue: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._dropped_chunks = 0
+
+        # writer-thread state (guarded by _acc_lock for readers)
+        self._acc_lock = threading.Lock()
+        self._minute: _Rollup | None = None
+        self._hour: _Rollup | None = None
+        self._last_day: str | None = None
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True, name="history")
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Hot path (detection loop)
+    # ------------------------------------------------------------------
+
+    def _new_buffer(self) -> None:
+        self._frame_ts: list[float] = []
+        self._frame_count: list[int] = []
+        self._rows: list[tuple] = []    # (ts, track_id, x1, y1, x2, y2, conf, name)
+
+    def start_session(self, session_start: float) -> None:
+        """Begin a new detection session; track IDs are only unique within one."""
+        self.flush()
+        with self._lock:
+            self._session = int(session_start)
+
+    def record(self, ts: float, tracks: list[tuple]) -> None:
+        """Record one frame's (track_id, x1, y1, x2, y2, conf, name) tuples."""
+        with self._lock:
+            expired = bool(self._frame_ts) and ts - self._frame_ts[0] >= _CHUNK_SECONDS
+        if expired:
+            self.flush(partial_rollups=False)
+        with self._lock:
+            self._frame_ts.append(ts)
+            self._frame_count.append(len(tracks))
+            for t in tracks:
+                self._rows.append((ts, *t))
+            full = len(self._frame_ts) >= _CHUNK_FRAMES
+        if full:
+            self.flush(partial_rollups=False)
+
+    def flush(self, partial_rollups: bool = True) -> None:
+        """Hand buffered frames to the writer (and persist partial rollups)."""
+        with self._lock:
+            if not self._frame_ts and not partial_rollups:
+                return
+            chunk = {
+                "session": self._session,
+                "frame_ts": self._frame_ts,
+                "frame_count": self._frame_count,
+                "rows": self._rows,
+                "partial_rollups": partial_rollups,
+            }
+            self._new_buffer()
+        try:
+            self._queue.put_nowait(chunk)
+        except queue.Full:
+            self._dropped_chunks += 1
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _writer_loop(self) -> None:
+        while True:
+            chunk = self._queue.get()
+            try:
+                if chunk["frame_ts"]:
+                    arrays = self._to_arrays(chunk)
+                    self._write_chunk(arrays)
+                    self._accumulate(arrays, chunk["session"])
+                if chunk["partial_rollups"]:
+                    self._write_partial_rollups()
+            except Exception as e:
+                print(f"[history] error writing chunk: {e}", flush=True)
+
+    @staticmethod
+    def _to_arrays(chunk: dict) -> dict:
+        frame_ts = np.asarray(chunk["frame_ts"], dtype=np.float64)
+        t0 = float(frame_ts[0])
+        rows = chunk["rows"]
+        names = sorted({r[7] for r in rows if r[7]})
+        name_idx = {n: i for i, n in enumerate(names)}
+        if rows:
+            cols = list(zip(*rows))
+            ts = np.asarray(cols[0], dtype=np.float64)
+            track_id = np.asarray(cols[1], dtype=np.int32)
+            box = np.stack([np.asarray(c, dtype=np.int16) for c in cols[2:6]], axis=1)
+            conf = np.asarray(cols[6], dtype=np.float16)
+            name = np.asarray([name_idx.get(n, -1) if n else -1 for n in cols[7]], dtype=np.int16)
+        else:
+            ts = np.empty(0, np.float64)
+            track_id = np.empty(0, np.int32)
+            box = np.empty((0, 4), np.int16)
+            conf = np.empty(0, np.float16)
+            name = np.empty(0, np.int16)
+        return {
+            "t0": np.float64(t0),
+            "session": np.int64(chunk["session"]),
+            # millisecond offsets from t0 keep the time columns at 4 bytes/row
+            "frame_dt": np.round((frame_ts - t0) * 1000).astype(np.uint32),
+            "frame_count": np.asarray(chunk["frame_count"], dtype=np.uint16),
+            "dt": np.round((ts - t0) * 1000).astype(np.uint32),
+            "track_id": track_id,
+            "box": box,
+            "conf": conf,
+            "name": name,
+            "names": np.asarray(names, dtype=np.str_),
+        }
+
+    def _write_chunk(self, arrays: dict) -> None:
+        t0 = float(arrays["t0"])
+        t1 = t0 + float(arrays["frame_dt"][-1]) / 1000
+        day = _day(t0)
+        folder = self._dir / day
+        folder.mkdir(exist_ok=True)
+        path = folder / f"chunk_{int(t0 * 1000)}_{int(t1 * 1000)}.npz"
+        np.savez_compressed(path, **arrays)
+        if day != self._last_day:
+            self._last_day = day
+            self._enforce_retention()
+
+    def _accumulate(self, arrays: dict, session: int) -> None:
+        """Fold a chunk into the minute/hour rollups, vectorised per minute."""
+        t0 = float(arrays["t0"])
+        frame_min = ((t0 + arrays["frame_dt"] / 1000) // 60).astype(np.int64)
+        # untracked detections (track_id -1) are not people to count
+        tracked = arrays["track_id"] >= 0
+        row_min = ((t0 + arrays["dt"][tracked] / 1000) // 60).astype(np.int64)
+        keys = (np.int64(session) << 32) | arrays["track_id"][tracked].astype(np.int64)
+        for minute in np.unique(frame_min):
+            fmask = frame_min == minute
+            counts = arrays["frame_count"][fmask]
+            ids = set(np.unique(keys[row_min == minute]).tolist())
+            start = int(minute) * 60
+            self._add(start, 60, "_minute", "minutes.jsonl", counts, ids)
+            self._add(start - start % 3600, 3600, "_hour", "hours.jsonl", counts, ids)
+
+    def _add(self, start: int, span: int, attr: str, filename: str, counts: np.ndarray, ids: set[int]) -> None:
+        with self._acc_lock:
+            acc = getattr(self, attr)
+            if acc is not None and start >= acc.start + span:
+                self._append_row(filename, acc.start, acc.row())
+                acc = None
+            if acc is None:
+                acc = _Rollup(start)
+                setattr(self, attr, acc)
+            acc.frames += int(len(counts))
+            acc.occupancy_sum += int(counts.sum())
+            acc.occupancy_max = max(acc.occupancy_max, int(counts.max()) if len(counts) else 0)
+            acc.ids |= ids
+
+    def _write_partial_rollups(self) -> None:
+        with self._acc_lock:
+            for acc, filename in ((self._minute, "minutes.jsonl"), (self._hour, "hours.jsonl")):
+                if acc is not None and acc.frames:
+                    self._append_row(filename, acc.start, acc.row(partial=True))
+
+    def _append_row(self, filename: str, start: int, row: dict) -> None:
+        folder = self._dir / _day(start)
+        folder.mkdir(exist_ok=True)
+        with open(folder / filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+
+    def _enforce_retention(self) -> None:
+        cutoff = (datetime.now() - timedelta(days=self._retention_days)).strftime("%Y%m%d")
+        for folder in self._dir.iterdir():
+            if folder.is_dir() and folder.name.isdigit() and folder.name < cutoff:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _days(self, start: float, end: float) -> list[Path]:
+        # a chunk is filed under the day it starts, up to _CHUNK_SECONDS earlier
+        lo, hi = _day(start - _CHUNK_SECONDS), _day(end)
+        if not self._dir.is_dir():
+            return []
+        return sorted(p for p in self._dir.iterdir() if p.is_dir() and lo <= p.name <= hi)
+
+    def rollups(self, start: float, end: float, resolution: str = "minute") -> list[dict]:
+        """Minute or hour rollup rows with start <= t < end, oldest first.
+
+        The bucket currently being accumulated is included (marked partial).
+        """
+        filename = "hours.jsonl" if resolution == "hour" else "minutes.jsonl"
+        rows: dict[int, dict] = {}
+        for folder in self._days(start, end):
+            path = folder / filename
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    if start <= row["t"] < end:
+                        rows[row["t"]] = row
+        with self._acc_lock:
+            acc = self._hour if resolution == "hour" else self._minute
+            if acc is not None and acc.frames and start <= acc.start < end:
+                rows[acc.start] = acc.row(partial=True)
+        return [rows[t] for t in sorted(rows)]
+
+    def tracks(self, start: float, end: float, limit: int = _MAX_RAW_ROWS) -> dict:
+        """Raw per-track rows with start <= ts < end from flushed chunks."""
+        out: list[dict] = []
+        truncated = False
+        for folder in self._days(start, end):
+            for path in sorted(folder.glob("chunk_*.npz")):
+                _, c0, c1 = path.stem.split("_")
+                if int(c1) / 1000 < start or int(c0) / 1000 >= end:
+                    continue
+                with np.load(path) as z:
+                    cols = {k: z[k] for k in ("t0", "session", "dt", "track_id", "box", "conf", "name", "names")}
+                ts = float(cols["t0"]) + cols["dt"] / 1000
+                idx = np.flatnonzero((ts >= start) & (ts < end))
+                if len(out) + len(idx) > limit:
+                    idx = idx[:limit - len(out)]
+                    truncated = True
+                names = cols["names"].tolist()
+                session = int(cols["session"])
+                for i, track_id, box, conf, n in zip(
+                    idx.tolist(),
+                    cols["track_id"][idx].tolist(),
+                    cols["box"][idx].tolist(),
+                    cols["conf"][idx].astype(np.float32).tolist(),
+                    cols["name"][idx].tolist(),
+                ):
+                    out.append({
+                        "ts": round(float(ts[i]), 3),
+                        "session": session,
+                        "track_id": track_id,
+                        "box": box,
+                        "confidence": round(conf, 3),
+                        "name": names[n] if n >= 0 else None,
+                    })
+                if truncated:
+                    break
+            if truncated:
+                break
+        return {"rows": out, "truncated": truncated}
+
+    def status(self) -> dict:
+        with self._lock:
+            buffered = len(self._frame_ts)
+        return {"buffered_frames": buffered, "dropped_chunks": self._dropped_chunks,
+                "queue_depth": self._queue.qsize()}
@@ -0,0 +1,78 @@
+"""
+JobRegistry — thread-safe progress tracking for long-running background jobs.
+
+Route handlers start a job, hand back its ID immediately, and clients poll
+the job's status dict.  Only the most recent jobs are kept.
+"""
+
+import threading
+import time
+import uuid
+
+_MAX_JOBS = 50
+
+
+class JobRegistry:
+    """In-memory registry of background jobs and their progress."""
+
+    def __init__(self, max_jobs: int = _MAX_JOBS) -> None:
+        self._lock = threading.Lock()
+        self._jobs: dict[str, dict] = {}
+        self._max_jobs = max_jobs
+
+    def create(self, kind: str, total: int) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "state": "queued",
+                "total": total,
+                "done": 0,
+                "errors": [],
+                "result": None,
+                "created": time.time(),
+                "finished": None,
+            }
+            # dicts keep insertion order — drop the oldest finished jobs
+            while len(self._jobs) > self._max_jobs:
+                oldest = next((k for k, v in self._jobs.items() if v["finished"] is not None), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest]
+        return job_id
+
+    def set_total(self, job_id: str, total: int) -> None:
+        with self._lock:
+            self._jobs[job_id]["total"] = total
+
+    def start(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs[job_id]["state"] = "running"
+
+    def progress(self, job_id: str, done: int = 1, error: dict | None = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["done"] += done
+            if error is not None:
+                job["errors"].append(error)
+
+    def finish(self, job_id: str, result: dict | None = None, error: str | None = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["state"] = "error" if error else "done"
+            job["result"] = result
+            if error:
+                job["message"] = error
+            job["finished"] = time.time()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, "errors": list(job["errors"])}
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [{k: v for k, v in job.items() if k != "errors"} for job in reversed(self._jobs.values())]
@@ -0,0 +1,63 @@
+"""
+ModelCache — recently used YOLO models kept in memory, bounded by size.
+
+Switching back to a cached model is instant.  Models are evicted least
+recently used first once their combined weight size exceeds the budget;
+the most recently used model is always kept.
+"""
+
+import threading
+from collections import OrderedDict
+
+_MAX_BYTES = 512 * 1024 * 1024
+
+
+def model_bytes(model) -> int:
+    """Parameter and buffer bytes of an ultralytics model (0 if unknown)."""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+        return int(sum(t.numel() * t.element_size() for t in tensors))
+    except Exception:
+        return 0
+
+
+class ModelCache:
+    """Thread-safe LRU of loaded models keyed by model file name."""
+
+    def __init__(self, max_bytes: int = _MAX_BYTES) -> None:
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._models: OrderedDict[str, tuple[object, int]] = OrderedDict()
+
+    def get(self, name: str):
+        """The cached model, marked most recently used, or None."""
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None:
+                return None
+            self._models.move_to_end(name)
+            return entry[0]
+
+    def put(self, name: str, model) -> list[str]:
+        """Cache *model* as most recently used; returns the evicted names."""
+        size = model_bytes(model)
+        evicted = []
+        with self._lock:
+            self._models[name] = (model, size)
+            self._models.move_to_end(name)
+            total = sum(s for _, s in self._models.values())
+            while total > self._max_bytes and len(self._models) > 1:
+                old, (_, old_size) = self._models.popitem(last=False)
+                total -= old_size
+                evicted.append(old)
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [{"name": name, "bytes": size} for name, (_, size) in reversed(self._models.items())]
+        return {
+            "models": entries,
+            "bytes": sum(e["bytes"] for e in entries),
+            "max_bytes": self._max_bytes,
+        }
@@ -0,0 +1,441 @@
+"""
+Offline analysis of recorded video files.
+
+A clip is split into segments of frames that overlap by a couple of
+seconds.  Segments are detected and tracked in parallel in a process pool,
+each with its own tracker; raw detections go through the persistent
+detection cache, so re-runs of the same clip skip inference.  Tracker IDs
+are then stitched across segment boundaries by matching boxes in the
+overlapping frames, so a person who walks across a boundary keeps one ID.  The stitched tracks feed an
+aggregate report and, optionally, annotated output videos rendered by the
+same pool (one file per segment).
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.detection_cache import DetectionCache, file_hash
+from backend.trackers import DEFAULT_TRACKER, iou_matrix, make_tracker
+
+_SEGMENT_SECONDS = 60.0
+_OVERLAP_SECONDS = 2.0
+_STITCH_IOU = 0.5
+_MAX_REPORT_TRACKS = 1000
+
+# Row layout of detection arrays
+_FRAME, _ID, _X1, _Y1, _X2, _Y2, _CONF = range(7)
+
+# per-process model cache (worker processes only)
+_worker_models: dict[str, object] = {}
+
+
+def video_info(path: Path) -> dict:
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError(f"cannot open video {path.name}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        return {
+            "fps": fps if 0 < fps < 1000 else 30.0,
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def plan_segments(frame_count: int, segment_frames: int, overlap: int) -> list[tuple[int, int, int | None]]:
+    """Split *frame_count* frames into (start, own_start, end) segments.
+
+    Segment k reads [start, end) and owns [own_start, next own_start); the
+    first *overlap* frames of every segment but the first are owned by the
+    previous one and only used to warm up the tracker and stitch IDs.  The
+    last segment has end=None and reads to the end of the file, since frame
+    counts reported by containers are not always exact.
+    """
+    if frame_count <= 0:
+        return [(0, 0, None)]
+    n = max(1, math.ceil((frame_count - overlap) / segment_frames))
+    segments = []
+    for k in range(n):
+        start = k * segment_frames
+        own_start = 0 if k == 0 else start + overlap
+        end = None if k == n - 1 else (k + 1) * segment_frames + overlap
+        segments.append((start, own_start, end))
+    return segments
+
+
+# ----------------------------------------------------------------------
+# Worker-process functions
+# ----------------------------------------------------------------------
+
+def _init_worker(threads: int) -> None:
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _load_model(model_path: str):
+    from ultralytics import YOLO
+
+    model = _worker_models.get(model_path)
+    if model is None:
+        model = _worker_models[model_path] = YOLO(model_path)
+    return model
+
+
+def _detect_segment(video_path: str, start: int, end: int | None, model_path: str, conf: float,
+                    fps: float, shape: tuple[int, int], cache: DetectionCache | None, cache_key: str | None,
+                    tracker_name: str = DEFAULT_TRACKER):
+    """Detect and track people in frames [start, end) of a video.
+
+    Detection and tracking are separate steps so raw detections can come
+    from (and go to) the detection cache; frames that are cached are only
+    grabbed, not decoded, and never reach the model.
+
+    Returns (rows, frames_read, cache_hits) where rows is an (N, 7) float32
+    array of (frame, track_id, x1, y1, x2, y2, conf) with segment-local
+    track IDs.
+    """
+    cached = cache.frames(cache_key) if cache is not None else None
+    tracker = make_tracker(tracker_name, fps)
+    cap = None
+    blocks = []
+    idx = start
+    try:
+        while end is None or idx < end:
+            dets = cached.get(idx) if cached is not None else None
+            if dets is None:
+                if cap is None:
+                    cap = cv2.VideoCapture(video_path)
+                    if idx:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                boxes = _load_model(model_path).predict(frame, conf=conf, classes=[0], verbose=False)[0].boxes
+                dets = boxes.data[:, :5].cpu().numpy() if boxes is not None and len(boxes) else np.empty((0, 5))
+                if cached is not None:
+                    cached.put(idx, dets)
+            elif cap is not None:
+                cap.grab()      # keep the decoder in step without decoding
+            tracks = tracker.update(dets, shape)
+            if len(tracks):
+                block = np.empty((len(tracks), 7), dtype=np.float32)
+                block[:, _FRAME] = idx
+                block[:, _ID] = tracks[:, 4]
+                block[:, _X1:_Y2 + 1] = tracks[:, :4]
+                block[:, _CONF] = tracks[:, 5]
+                blocks.append(block)
+            idx += 1
+    finally:
+        if cap is not None:
+            cap.release()
+        if cached is not None:
+            cached.flush()
+    rows = np.concatenate(blocks) if blocks else np.empty((0, 7), dtype=np.float32)
+    return rows, idx - start, cached.hits if cached is not None else 0
+
+
+def _render_segment(video_path: str, start: int, end: int | None, rows: np.ndarray,
+                    out_path: str, fps: float) -> int:
+    """Draw stitched tracks on frames [start, end) and write them to *out_path*."""
+    from backend.detector import _COLORS, DetectionEngine
+
+    cap = cv2.VideoCapture(video_path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    frames = rows[:, _FRAME].astype(np.int64)
+    writer = None
+    idx = start
+    try:
+        while end is None or idx < end:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+            lo, hi = np.searchsorted(frames, [idx, idx + 1])
+            for row in rows[lo:hi]:
+                track_id = int(row[_ID])
+                x1, y1, x2, y2 = (int(v) for v in row[_X1:_Y2 + 1])
+                DetectionEngine._draw_detection(
+                    frame, x1, y1, x2, y2, _COLORS[track_id % len(_COLORS)], track_id, float(row[_CONF]), True, True
+                )
+            writer.write(frame)
+            idx += 1
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    return idx - start
+
+
+# ----------------------------------------------------------------------
+# Stitching
+# ----------------------------------------------------------------------
+
+def _match_tracks(a: np.ndarray, b: np.ndarray, threshold: float) -> list[tuple[int, int]]:
+    """Greedily pair track IDs of two segments over their shared frames.
+
+    A pair's score is its IoU summed over the shared frames, divided by the
+    number of frames either track appears in, so only tracks that overlap
+    consistently are joined.
+    """
+    if not len(a) or not len(b):
+        return []
+    ids_a, inv_a = np.unique(a[:, _ID], return_inverse=True)
+    ids_b, inv_b = np.unique(b[:, _ID], return_inverse=True)
+    frames_a = np.bincount(inv_a, minlength=len(ids_a))
+    frames_b = np.bincount(inv_b, minlength=len(ids_b))
+    total = np.zeros((len(ids_a), len(ids_b)))
+    for frame in np.intersect1d(a[:, _FRAME], b[:, _FRAME]):
+        ma = a[:, _FRAME] == frame
+        mb = b[:, _FRAME] == frame
+        iou = iou_matrix(a[ma, _X1:_Y2 + 1], b[mb, _X1:_Y2 + 1])
+        np.add.at(total, (inv_a[ma][:, None], inv_b[mb][None, :]), iou)
+    score = total / np.maximum(frames_a[:, None], frames_b[None, :])
+    pairs = []
+    used_a, used_b = set(), set()
+    for flat in np.argsort(score, axis=None)[::-1]:
+        i, j = divmod(int(flat), len(ids_b))
+        if score[i, j] < threshold:
+            break
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        pairs.append((int(ids_a[i]), int(ids_b[j])))
+    return pairs
+
+
+def stitch_segments(parts: list[np.ndarray], segments: list[tuple], threshold: float = _STITCH_IOU) -> np.ndarray:
+    """Merge per-segment rows into one array with video-wide track IDs.
+
+    Only each segment's owned frames are kept.  IDs are renumbered from 1.
+    """
+    next_id = 1
+    prev_map: dict[int, int] = {}
+    out = []
+    for k, (rows, (start, own_start, _)) in enumerate(zip(parts, segments)):
+        own_end = segments[k + 1][1] if k + 1 < len(segments) else np.inf
+        mapping: dict[int, int] = {}
+        if k > 0:
+            prev = parts[k - 1]
+            shared_a = prev[(prev[:, _FRAME] >= start) & (prev[:, _FRAME] < own_start)]
+            shared_b = rows[(rows[:, _FRAME] >= start) & (rows[:, _FRAME] < own_start)]
+            for la, lb in _match_tracks(shared_a, shared_b, threshold):
+                if la in prev_map:
+                    mapping[lb] = prev_map[la]
+        own = rows[(rows[:, _FRAME] >= own_start) & (rows[:, _FRAME] < own_end)].copy()
+        for local in np.unique(own[:, _ID]).tolist():
+            if int(local) not in mapping:
+                mapping[int(local)] = next_id
+                next_id += 1
+        if len(own):
+            lookup = np.vectorize(mapping.__getitem__, otypes=[np.float32])
+            own[:, _ID] = lookup(own[:, _ID].astype(np.int64))
+        out.append(own)
+        prev_map = mapping
+    if not out:
+        return np.empty((0, 7), dtype=np.float32)
+    rows = np.concatenate(out)
+    return rows[np.argsort(rows[:, _FRAME], kind="stable")]
+
+
+# ----------------------------------------------------------------------
+# Report
+# ----------------------------------------------------------------------
+
+def build_report(rows: np.ndarray, frames: int, fps: float) -> dict:
+    """Aggregate people statistics over stitched rows."""
+    counts = np.bincount(rows[:, _FRAME].astype(np.int64), minlength=frames)[:frames] if frames else np.zeros(0)
+    ids, inv = np.unique(rows[:, _ID].astype(np.int64), return_inverse=True)
+    first = np.full(len(ids), np.inf)
+    last = np.full(len(ids), -np.inf)
+    np.minimum.at(first, inv, rows[:, _FRAME])
+    np.maximum.at(last, inv, rows[:, _FRAME])
+    seen = np.bincount(inv, minlength=len(ids))
+    order = np.argsort(first)[:_MAX_REPORT_TRACKS]
+    tracks = [
+        {
+            "track_id": int(ids[i]),
+            "first_seen": round(float(first[i]) / fps, 2),
+            "last_seen": round(float(last[i]) / fps, 2),
+            "frames": int(seen[i]),
+        }
+        for i in order
+    ]
+    per_minute = []
+    minute_frames = max(1, int(round(fps * 60)))
+    for m0 in range(0, frames, minute_frames):
+        c = counts[m0:m0 + minute_frames]
+        in_minute = (rows[:, _FRAME] >= m0) & (rows[:, _FRAME] < m0 + minute_frames)
+        per_minute.append({
+            "t": round(m0 / fps, 2),
+            "occupancy_avg": round(float(c.mean()), 3) if len(c) else 0.0,
+            "occupancy_max": int(c.max()) if len(c) else 0,
+            "unique": int(len(np.unique(rows[in_minute, _ID]))),
+        })
+    return {
+        "frames": frames,
+        "fps": round(fps, 2),
+        "duration": round(frames / fps, 2),
+        "unique_people": int(len(ids)),
+        "occupancy_avg": round(float(counts.mean()), 3) if frames else 0.0,
+        "occupancy_max": int(counts.max()) if frames else 0,
+        "per_minute": per_minute,
+        "tracks": tracks,
+        "tracks_truncated": len(ids) > _MAX_REPORT_TRACKS,
+    }
+
+
+def run_analytics(rows: np.ndarray, frames: int, fps: float, width: int, height: int,
+                  config: dict, work_dir: Path) -> dict:
+    """Replay stitched rows through zone/line analytics in video time."""
+    from backend.analytics import AnalyticsEngine
+
+    analytics = AnalyticsEngine(work_dir / "analytics.json")
+    analytics.set_config("offline", config)
+    analytics.reset("offline")
+    frame_idx = rows[:, _FRAME].astype(np.int64)
+    bounds = np.searchsorted(frame_idx, np.arange(frames + 1))
+    event_counts: dict[str, int] = {}
+    for f in range(frames):
+        block = rows[bounds[f]:bounds[f + 1]]
+        events = analytics.update(
+            f / fps, width, height, block[:, _ID].astype(np.int64), block[:, _X1:_Y2 + 1].astype(np.float64)
+        )
+        for e in events:
+            event_counts[e["type"]] = event_counts.get(e["type"], 0) + 1
+    # close dwell of everyone still in a zone at the end of the clip
+    for e in analytics.flush():
+        event_counts[e["type"]] = event_counts.get(e["type"], 0) + 1
+    return {**analytics.snapshot(), "event_counts": event_counts}
+
+
+# ----------------------------------------------------------------------
+# Orchestration
+# ----------------------------------------------------------------------
+
+def analyze_video(
+    video_path: Path,
+    out_dir: Path,
+    model_path: Path,
+    conf: float = 0.45,
+    workers: int | None = None,
+    segment_seconds: float = _SEGMENT_SECONDS,
+    overlap_seconds: float = _OVERLAP_SECONDS,
+    annotate: bool = False,
+    analytics_config: dict | None = None,
+    cache: DetectionCache | None = None,
+    tracker: str = DEFAULT_TRACKER,
+    on_progress=None,
+    on_plan=None,
+) -> dict:
+    """Analyse *video_path* across a process pool and return the report.
+
+    With a *cache*, raw detections are looked up by the file's content
+    hash, model and confidence, and stored for the next run.  Tracking
+    always re-runs, with the *tracker* named (see backend/trackers.py).
+    *on_plan(steps)* is called once the number of progress steps is known
+    and *on_progress()* after each finished step.
+    """
+    t_start = time.time()
+    info = video_info(video_path)
+    fps = info["fps"]
+    shape = (info["height"], info["width"])
+    cache_key = None
+    known_frames = None
+    if cache is not None:
+        cache_key = DetectionCache.key(file_hash(video_path), model_path.name, conf)
+        known_frames = cache.known_frames(cache_key)
+    segment_frames = max(1, int(round(segment_seconds * fps)))
+    overlap = max(1, int(round(overlap_seconds * fps)))
+    segments = plan_segments(known_frames or info["frame_count"], segment_frames, overlap)
+    if known_frames:
+        # exact length known from an earlier pass: the last segment can be
+        # served from the cache without opening the file
+        start, own_start, _ = segments[-1]
+        segments[-1] = (start, own_start, known_frames)
+    if on_plan:
+        on_plan(len(segments) * (2 if annotate else 1))
+
+    cpus = os.cpu_count() or 2
+    workers = max(1, min(workers or cpus - 1, len(segments)))
+    threads = max(1, cpus // workers)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    parts: list[np.ndarray | None] = [None] * len(segments)
+    frames_read = [0] * len(segments)
+    cache_hits = 0
+    outputs: list[str] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = {
+            pool.submit(
+                _detect_segment, str(video_path), start, end, str(model_path), conf, fps, shape, cache, cache_key,
+                tracker,
+            ): k
+            for k, (start, _, end) in enumerate(segments)
+        }
+        for future in as_completed(futures):
+            k = futures[future]
+            parts[k], frames_read[k], hits = future.result()
+            cache_hits += hits
+            if on_progress:
+                on_progress()
+        t_detect = time.time()
+
+        start, _, _ = segments[-1]
+        total_frames = start + frames_read[-1]
+        if cache is not None:
+            if not known_frames:
+                cache.set_known_frames(cache_key, total_frames)
+            cache.enforce_limit()
+        rows = stitch_segments(parts, segments)
+
+        if annotate:
+            frame_col = rows[:, _FRAME]
+            render = {}
+            for k, (_, own_start, _) in enumerate(segments):
+                own_end = segments[k + 1][1] if k + 1 < len(segments) else None
+                mask = (frame_col >= own_start) & (frame_col < (own_end if own_end is not None else np.inf))
+                name = f"annotated_{k:03d}.mp4"
+                render[pool.submit(
+                    _render_segment, str(video_path), own_start, own_end, rows[mask], str(out_dir / name), fps
+                )] = name
+            for future in as_completed(render):
+                future.result()
+                outputs.append(render[future])
+                if on_progress:
+                    on_progress()
+
+    report = build_report(rows, total_frames, fps)
+    if analytics_config and (analytics_config.get("zones") or analytics_config.get("lines")):
+        report["analytics"] = run_analytics(
+            rows, total_frames, fps, info["width"], info["height"], analytics_config, out_dir
+        )
+    elapsed = time.time() - t_start
+    report.update({
+        "width": info["width"],
+        "height": info["height"],
+        "segments": len(segments),
+        "workers": workers,
+        "detect_seconds": round(t_detect - t_start, 2),
+        "cached_frames": cache_hits,
+        "processing_seconds": round(elapsed, 2),
+        "realtime_factor": round(report["duration"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "outputs": sorted(outputs),
+    })
+    return report
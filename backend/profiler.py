@@ -0,0 +1,274 @@
+"""
+On-demand CPU and memory profiling that works inside the frozen exe.
+
+SamplingProfiler walks the Python stacks of selected threads with
+sys._current_frames() from a short-lived sampler thread, so nothing is
+installed and nothing runs until a profile is requested.  Work that runs
+in a face worker process is sampled there by profiled_call(), and the
+stacks are merged back.  Results come out as collapsed stacks (one
+``frame;frame;frame count`` line per stack, for flamegraph.pl and
+speedscope) or as a speedscope JSON file.
+
+MemoryTracer wraps tracemalloc: tracing (and its overhead) only runs
+between start() and stop(); snapshots report the top allocating lines and
+the difference against an earlier snapshot.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+_MAX_DURATION = 120.0        # seconds
+_MIN_INTERVAL = 0.001        # seconds between samples
+_MAX_DEPTH = 128             # frames kept per stack (innermost dropped beyond)
+_MAX_SNAPSHOT_FRAMES = 25
+
+_SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def _frame_label(code, labels: dict) -> str:
+    label = labels.get(code)
+    if label is None:
+        label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _collapse(frame, labels: dict) -> str:
+    """Root-first ``;``-joined stack of *frame*."""
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        names.append(_frame_label(frame.f_code, labels))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def _sample_thread(ident: int, stacks: Counter, stop: threading.Event, interval: float) -> None:
+    labels: dict = {}
+    while not stop.is_set():
+        frame = sys._current_frames().get(ident)
+        if frame is not None:
+            stacks[_collapse(frame, labels)] += 1
+        del frame
+        time.sleep(interval)
+
+
+def profiled_call(fn, interval: float, *args):
+    """Call ``fn(*args)`` while sampling the calling thread.
+
+    Returns ``(result, stacks)``.  Meant to be submitted to a worker
+    process in place of *fn*, so the parent can merge the worker's stacks.
+    """
+    stacks: Counter = Counter()
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample_thread, args=(threading.get_ident(), stacks, stop, interval), daemon=True,
+    )
+    sampler.start()
+    try:
+        result = fn(*args)
+    finally:
+        stop.set()
+        sampler.join()
+    # drop the sampler's own bookkeeping frames at the root
+    prefix = _frame_label(profiled_call.__code__, {}) + ";"
+    return result, Counter({s.split(prefix, 1)[-1]: n for s, n in stacks.items()})
+
+
+class SamplingProfiler:
+    """One time-bounded CPU profile at a time, grouped by thread label."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active = False
+        self._interval = 0.0
+        self._stacks: dict[str, Counter] = {}
+
+    @property
+    def interval(self) -> float:
+        """Sampling interval of the running profile, 0.0 when idle."""
+        return self._interval if self._active else 0.0
+
+    def add(self, label: str, stacks: Counter) -> None:
+        """Merge stacks sampled elsewhere (a worker process) into the running profile."""
+        with self._lock:
+            if self._active:
+                self._stacks.setdefault(label, Counter()).update(stacks)
+
+    def run(self, targets, duration: float, interval: float) -> dict:
+        """Sample the threads returned by ``targets()`` (``{ident: label}``,
+        re-read every sample so threads may come and go) for *duration*
+        seconds.  Returns ``{"status": ...}``; on success also ``stacks``
+        (label -> Counter), ``samples`` and ``duration``.
+        """
+        duration = min(max(0.1, float(duration)), _MAX_DURATION)
+        interval = max(_MIN_INTERVAL, float(interval))
+        with self._lock:
+            if self._active:
+                return {"status": "error", "message": "A profile is already running"}
+            self._active = True
+            self._interval = interval
+            self._stacks = {}
+
+        labels: dict = {}
+        own = threading.get_ident()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        try:
+            while time.perf_counter() < deadline:
+                wanted = targets()
+                frames = sys._current_frames()
+                with self._lock:
+                    for ident, label in wanted.items():
+                        frame = frames.get(ident)
+                        if frame is None or ident == own:
+                            continue
+                        self._stacks.setdefault(label, Counter())[_collapse(frame, labels)] += 1
+                del frames
+                samples += 1
+                time.sleep(interval)
+        finally:
+            with self._lock:
+                self._active = False
+                stacks, self._stacks = self._stacks, {}
+        return {
+            "status": "ok",
+            "stacks": stacks,
+            "samples": samples,
+            "interval": interval,
+            "duration": time.perf_counter() - start,
+        }
+
+
+def collapsed(stacks: dict[str, Counter]) -> str:
+    """Brendan Gregg's collapsed format, thread label as the root frame."""
+    lines = []
+    for label, counter in sorted(stacks.items()):
+        for stack, count in counter.most_common():
+            lines.append(f"{label};{stack} {count}" if stack else f"{label} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(stacks: dict[str, Counter], interval: float, name: str) -> dict:
+    """A speedscope file with one sampled profile per thread label."""
+    frames: list[dict] = []
+    index: dict[str, int] = {}
+
+    def frame_id(label: str) -> int:
+        i = index.get(label)
+        if i is None:
+            i = index[label] = len(frames)
+            func, _, where = label.partition(" (")
+            file, _, line = where.rstrip(")").rpartition(":")
+            entry = {"name": func}
+            if file:
+                entry["file"] = file
+                entry["line"] = int(line) if line.isdigit() else 0
+            frames.append(entry)
+        return i
+
+    profiles = []
+    for label, counter in sorted(stacks.items()):
+        samples, weights = [], []
+        for stack, count in counter.most_common():
+            samples.append([frame_id(f) for f in stack.split(";")] if stack else [])
+            weights.append(round(count * interval, 6))
+        profiles.append({
+            "type": "sampled",
+            "name": label,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 6),
+            "samples": samples,
+            "weights": weights,
+        })
+    return {
+        "$schema": _SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "person-detector",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+class MemoryTracer:
+    """tracemalloc control with a first and a previous snapshot to diff against."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._first: tracemalloc.Snapshot | None = None
+        self._previous: tracemalloc.Snapshot | None = None
+
+    def status(self) -> dict:
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "has_snapshot": self._first is not None,
+        }
+
+    def start(self, frames: int = 1) -> dict:
+        frames = min(max(1, int(frames)), _MAX_SNAPSHOT_FRAMES)
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            tracemalloc.start(frames)
+            self._first = self._previous = None
+        return {"status": "ok", **self.status()}
+
+    def stop(self) -> dict:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._first = self._previous = None
+        return {"status": "ok", **self.status()}
+
+    def snapshot(self, top: int = 25, against: str = "previous") -> dict:
+        """Top allocating lines now and, if there is an earlier snapshot,
+        the biggest changes since the *against* (``previous``/``first``) one."""
+        if not tracemalloc.is_tracing():
+            return {"status": "error", "message": "Memory tracing is not running"}
+        top = min(max(1, int(top)), 200)
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        with self._lock:
+            base = self._first if against == "first" else self._previous
+            if self._first is None:
+                self._first = snap
+            self._previous = snap
+
+        group = "traceback" if tracemalloc.get_traceback_limit() > 1 else "lineno"
+        stats = snap.statistics(group)
+        result = {
+            "status": "ok",
+            "total_bytes": sum(s.size for s in stats),
+            "top": [_stat_dict(s) for s in stats[:top]],
+        }
+        if base is not None:
+            diff = snap.compare_to(base, group)
+            result["against"] = "first" if against == "first" else "previous"
+            result["diff"] = [_stat_dict(s) for s in diff[:top]]
+        return result
+
+
+def _stat_dict(stat) -> dict:
+    # tracebacks run oldest call first; the allocating line is the last
+    frames = [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+    out = {"where": frames[-1] if frames else "?", "size": stat.size, "count": stat.count}
+    if len(frames) > 1:
+        out["traceback"] = frames
+    if hasattr(stat, "size_diff"):
+        out["size_diff"] = stat.size_diff
+        out["count_diff"] = stat.count_diff
+    return out
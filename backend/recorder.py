@@ -0,0 +1,217 @@
+"""
+VideoRecorder — event-triggered, segmented video recording off the hot loop.
+
+The detection loop hands frames to submit(), which never blocks: frames go
+into a bounded queue drained by a dedicated writer thread, and are dropped
+(and counted) when the writer falls behind.  Segments are rotated by length
+and pruned oldest-first to keep disk usage bounded.
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+_FOURCC = "mp4v"
+_EXT = ".mp4"
+_CLOSE = object()      # queued by close(): the writer finishes up and exits
+
+
+class VideoRecorder:
+    """Writes frames to rotating video segments while a trigger is active."""
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_seconds: float = 300.0,
+        max_segments: int = 200,
+        max_bytes: int = 2 * 1024 ** 3,
+        queue_size: int = 64,
+    ) -> None:
+        self._dir = directory
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._segment_seconds = segment_seconds
+        self._max_segments = max_segments
+        self._max_bytes = max_bytes
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+
+        # trigger state (guarded by _lock)
+        self._manual = False
+        self._hold_until = 0.0
+        self._reason: str | None = None
+
+        # writer state (writer thread only, except counters)
+        self._writer: cv2.VideoWriter | None = None
+        self._segment_path: Path | None = None
+        self._segment_start = 0.0
+        self._segment_size: tuple[int, int] | None = None
+        self._frames_written = 0
+        self._frames_dropped = 0
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------
+    # Triggers
+    # ------------------------------------------------------------------
+
+    def start(self, reason: str = "manual") -> None:
+        """Record until stop() is called."""
+        with self._lock:
+            self._manual = True
+            self._reason = reason
+
+    def stop(self) -> None:
+        """End a manual recording (pending event holds also expire)."""
+        with self._lock:
+            self._manual = False
+            self._hold_until = 0.0
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out queued frames, finish the open segment and stop the
+        writer thread.  A later submit() starts a new writer."""
+        self.stop()
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            # behind every queued frame, so they are all written first
+            self._queue.put(_CLOSE, timeout=timeout)
+        except queue.Full:
+            print("[recorder] writer stuck, last segment may be incomplete", flush=True)
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            # keep it: a second writer would share the queue and the segment
+            print("[recorder] writer still busy after close, leaving it running", flush=True)
+            return
+        self._thread = None
+
+    def trigger(self, reason: str, hold: float, now: float | None = None) -> None:
+        """Record for at least *hold* more seconds because of an event."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now + hold > self._hold_until:
+                self._hold_until = now + hold
+            if not self._manual:
+                self._reason = reason
+
+    def is_active(self, now: float) -> bool:
+        with self._lock:
+            return self._manual or now < self._hold_until
+
+    # ------------------------------------------------------------------
+    # Frame intake (detection loop)
+    # ------------------------------------------------------------------
+
+    def submit(self, frame, timestamp: float, fps_hint: float) -> bool:
+        """Queue a BGR frame for writing.  Returns False if it was dropped."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_loop, daemon=True, name="recorder")
+            self._thread.start()
+        try:
+            self._queue.put_nowait((frame, timestamp, fps_hint))
+            return True
+        except queue.Full:
+            self._frames_dropped += 1
+            return False
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _writer_loop(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                # trigger ended (or stream stalled): finish the segment
+                self._close_segment()
+                continue
+            if item is _CLOSE:
+                self._close_segment()
+                return
+            frame, ts, fps_hint = item
+            try:
+                h, w = frame.shape[:2]
+                if (
+                    self._writer is None
+                    or self._segment_size != (w, h)
+                    or ts - self._segment_start >= self._segment_seconds
+                ):
+                    self._close_segment()
+                    self._open_segment(ts, w, h, fps_hint)
+                self._writer.write(frame)
+                self._frames_written += 1
+            except Exception as e:
+                print(f"[recorder] error: {e}", flush=True)
+                self._close_segment()
+
+    def _open_segment(self, ts: float, w: int, h: int, fps_hint: float) -> None:
+        stem = f"rec_{datetime.fromtimestamp(ts).strftime('%Y%m%d_%H%M%S')}"
+        path = self._dir / f"{stem}{_EXT}"
+        n = 1
+        while path.exists():
+            n += 1
+            path = self._dir / f"{stem}_{n}{_EXT}"
+        fps = max(1.0, min(60.0, round(fps_hint))) if fps_hint > 0 else 15.0
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*_FOURCC), fps, (w, h))
+        if not writer.isOpened():
+            raise RuntimeError(f"cannot open video writer for {path}")
+        self._writer = writer
+        self._segment_path = path
+        self._segment_start = ts
+        self._segment_size = (w, h)
+
+    def _close_segment(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.release()
+        self._writer = None
+        self._segment_path = None
+        self._enforce_retention()
+
+    def _enforce_retention(self) -> None:
+        segments = sorted(self._dir.glob(f"rec_*{_EXT}"))
+        sizes = [p.stat().st_size for p in segments]
+        total = sum(sizes)
+        while segments and (len(segments) > self._max_segments or total > self._max_bytes):
+            oldest = segments.pop(0)
+            total -= sizes.pop(0)
+            oldest.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            active = self._manual or now < self._hold_until
+            reason = self._reason if active else None
+            manual = self._manual
+        segment = self._segment_path
+        return {
+            "recording": active,
+            "manual": manual,
+            "reason": reason,
+            "current_segment": segment.name if segment else None,
+            "frames_written": self._frames_written,
+            "frames_dropped": self._frames_dropped,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def list_segments(self) -> list[dict]:
+        current = self._segment_path
+        return [
+            {"name": p.name, "size": p.stat().st_size, "in_progress": p == current}
+            for p in sorted(self._dir.glob(f"rec_*{_EXT}"), reverse=True)
+        ]
+
+    def segment_path(self, name: str) -> Path | None:
+        if Path(name).name != name or not name.startswith("rec_"):
+            return None
+        path = self._dir / name
+        return path if path.is_file() else None
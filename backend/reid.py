@@ -0,0 +1,114 @@
+"""
+Lightweight appearance re-identification for carrying names across track IDs.
+
+When ByteTrack loses a person and hands out a new ID, the face cache entry
+for the old ID is useless.  AppearanceCache remembers a cheap colour
+descriptor for every recently seen *named* track; a new track whose
+descriptor matches one that has just disappeared inherits its name without
+another round of dlib face recognition.
+"""
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+_DESC_SIZE = (32, 64)     # crop is resized to this (w, h) before histogramming
+_H_BINS = 8
+_S_BINS = 4
+
+
+def appearance_descriptor(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> np.ndarray | None:
+    """Return an L2-normalised HSV histogram descriptor for a person box.
+
+    Upper and lower body are histogrammed separately so shirt/trouser colour
+    combinations are distinguished.  Square-rooted (Hellinger) histograms
+    make the dot product of two descriptors their Bhattacharyya coefficient.
+    """
+    h, w = frame.shape[:2]
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(w, x2), min(h, y2)
+    if x2 - x1 < 8 or y2 - y1 < 16:
+        return None
+    crop = cv2.resize(frame[y1:y2, x1:x2], _DESC_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    half = _DESC_SIZE[1] // 2
+    parts = []
+    for region in (hsv[:half], hsv[half:]):
+        hist = cv2.calcHist([region], [0, 1], None, [_H_BINS, _S_BINS], [0, 180, 0, 256])
+        parts.append(hist.ravel())
+    desc = np.sqrt(np.concatenate(parts))
+    norm = float(np.linalg.norm(desc))
+    if norm == 0.0:
+        return None
+    return (desc / norm).astype(np.float32)
+
+
+class AppearanceCache:
+    """Descriptors of recently seen named tracks, bounded by size and age.
+
+    Not thread-safe by itself: the engine guards every call with its
+    ``_face_lock``.  The detection loop takes that lock once per frame for
+    the candidate check and all descriptor updates, and again only to match
+    a new track while a named one is missing.
+    """
+
+    def __init__(self, max_size: int = 256, max_age: float = 15.0, threshold: float = 0.85) -> None:
+        self._max_size = max_size
+        self._max_age = max_age
+        self._threshold = threshold
+        # track ID -> (name, descriptor, last update time)
+        self._entries: OrderedDict[int, tuple[str, np.ndarray, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, track_id: int, name: str, descriptor: np.ndarray, now: float) -> None:
+        """Store or blend the descriptor of a named, currently visible track."""
+        prev = self._entries.pop(track_id, None)
+        if prev is not None and prev[0] == name:
+            blended = 0.7 * prev[1] + 0.3 * descriptor
+            descriptor = blended / max(float(np.linalg.norm(blended)), 1e-6)
+        self._entries[track_id] = (name, descriptor, now)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def has_candidates(self, visible_ids: set[int], now: float) -> bool:
+        """Cheap check whether any named track has recently disappeared."""
+        cutoff = now - self._max_age
+        for track_id, (_, _, seen) in reversed(list(self._entries.items())):
+            if seen < cutoff:
+                return False
+            if track_id not in visible_ids:
+                return True
+        return False
+
+    def match(self, descriptor: np.ndarray, visible_ids: set[int], now: float) -> str | None:
+        """Return the name of the best-matching vanished track, consuming it.
+
+        Only tracks that are not visible in the current frame and were seen
+        within *max_age* seconds are considered.
+        """
+        self._expire(now)
+        candidates = [(tid, e) for tid, e in list(self._entries.items()) if tid not in visible_ids]
+        if not candidates:
+            return None
+        matrix = np.stack([e[1] for _, e in candidates])
+        scores = matrix @ descriptor
+        best = int(np.argmax(scores))
+        if scores[best] < self._threshold:
+            return None
+        track_id, (name, _, _) = candidates[best]
+        self._entries.pop(track_id, None)
+        return name
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self._max_age
+        while self._entries:
+            track_id, (_, _, seen) = next(iter(self._entries.items()))
+            if seen >= cutoff:
+                break
+            del self._entries[track_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
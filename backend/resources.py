@@ -0,0 +1,291 @@
+"""
+CPU budgeting — one plan for how many threads (and optionally which cores)
+each CPU consumer gets.
+
+The consumers are PyTorch inference, the face recognition worker process,
+OpenCV (resizing, drawing helpers, video encoding) and the server itself.
+Each of them defaults to "all cores" on its own, which oversubscribes small
+machines.  A CpuBudget splits the available cores between them, and
+ResourceManager persists it to resources.json and applies it.  autotune()
+measures inference + encoding throughput for several thread counts on this
+machine and keeps the fastest.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import psutil
+except ImportError:     # ultralytics depends on psutil, but stay usable without it
+    psutil = None
+
+# environment variables read by the BLAS/OpenMP runtimes dlib and numpy use
+_THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores() -> list[int]:
+    """CPU indices this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    if psutil is not None:
+        try:
+            return sorted(psutil.Process().cpu_affinity())
+        except (AttributeError, psutil.Error):
+            pass
+    return list(range(os.cpu_count() or 1))
+
+
+def set_affinity(cores: list[int]) -> bool:
+    """Pin the current process to *cores*; False where unsupported."""
+    if not cores:
+        return False
+    try:
+        if psutil is not None:
+            psutil.Process().cpu_affinity(cores)
+            return True
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+            return True
+    except Exception as e:     # OSError, ValueError, psutil.Error
+        print(f"[resources] could not set CPU affinity: {e}", flush=True)
+    return False
+
+
+@dataclass
+class CpuBudget:
+    """Thread counts per consumer, and optional core pinning.
+
+    With *affinity*, the server process (API, detection, encoding) is pinned
+    to *server_cores* and face worker processes to *face_cores*.
+    """
+
+    torch_threads: int = 1
+    torch_interop_threads: int = 1
+    opencv_threads: int = 1
+    face_workers: int = 1
+    face_threads: int = 1
+    affinity: bool = False
+    server_cores: list[int] = field(default_factory=list)
+    face_cores: list[int] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict, cores: list[int], base: "CpuBudget | None" = None) -> "CpuBudget":
+        """*base* (default: the defaults) updated from *data*; raises
+        ValueError on nonsense values."""
+        n = len(cores)
+        budget = cls(**asdict(base or default_budget(cores)))
+        for key in ("torch_threads", "torch_interop_threads", "opencv_threads", "face_workers", "face_threads"):
+            if key in data:
+                value = int(data[key])
+                lowest = 0 if key == "opencv_threads" else 1
+                if not lowest <= value <= max(1, n):
+                    raise ValueError(f"{key} must be between {lowest} and {max(1, n)}")
+                setattr(budget, key, value)
+        if "affinity" in data:
+            budget.affinity = bool(data["affinity"])
+        for key in ("server_cores", "face_cores"):
+            if key in data:
+                values = sorted({int(c) for c in data[key]})
+                unknown = [c for c in values if c not in cores]
+                if unknown:
+                    raise ValueError(f"{key}: cores {unknown} are not available (have {cores})")
+                setattr(budget, key, values)
+        explicit = "server_cores" in data or "face_cores" in data
+        resized = "face_workers" in data or "face_threads" in data
+        if not explicit and (resized or not budget.server_cores):
+            budget.server_cores, budget.face_cores = _split_cores(cores, budget.face_workers * budget.face_threads)
+        return budget
+
+
+def _split_cores(cores: list[int], face: int) -> tuple[list[int], list[int]]:
+    """Last *face* cores for face workers, the rest for the server; on very
+    small machines both share everything."""
+    if len(cores) < 3 or face <= 0:
+        return list(cores), list(cores)
+    face = min(face, len(cores) - 2)
+    return list(cores[:-face]), list(cores[-face:])
+
+
+def default_budget(cores: list[int] | None = None) -> CpuBudget:
+    """Heuristic split: one core for the server (API, encoding, drawing),
+    one for face recognition from 4 cores up, the rest for inference."""
+    cores = cores or available_cores()
+    n = len(cores)
+    face = 1 if n >= 4 else 0
+    server = 1 if n >= 2 else 0
+    server_cores, face_cores = _split_cores(cores, face)
+    return CpuBudget(
+        torch_threads=max(1, n - face - server),
+        torch_interop_threads=1,
+        opencv_threads=1 if n <= 4 else 2,
+        face_workers=1,
+        face_threads=1,
+        affinity=False,
+        server_cores=server_cores,
+        face_cores=face_cores,
+    )
+
+
+def apply_torch_threads(budget: CpuBudget) -> None:
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(budget.torch_threads)
+    try:
+        # only allowed before any inter-op parallel work has started
+        torch.set_num_interop_threads(budget.torch_interop_threads)
+    except RuntimeError:
+        pass
+
+
+def init_face_worker(threads: int, cores: list[int]) -> None:
+    """ProcessPoolExecutor initializer for face workers.
+
+    Runs before dlib is imported (face_db imports it lazily), so the
+    thread-count variables still take effect.
+    """
+    for var in _THREAD_ENV:
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(1)
+    if cores:
+        set_affinity(cores)
+
+
+class ResourceManager:
+    """The active CpuBudget, persisted to *path* ("mode" is "default",
+    "manual" or "tuned")."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._cores = available_cores()
+        self._mode = "default"
+        self._tuning: dict | None = None
+        self._budget = default_budget(self._cores)
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.is_file():
+            return
+        try:
+            data = json.loads(self._path.read_text())
+            self._budget = CpuBudget.from_dict(data.get("budget", {}), self._cores)
+            self._mode = data.get("mode", "manual")
+            self._tuning = data.get("tuning")
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[resources] ignoring {self._path.name}: {e}", flush=True)
+
+    def _save(self) -> None:
+        data = {"mode": self._mode, "budget": self._budget.to_dict(), "tuning": self._tuning}
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2))
+        os.replace(tmp, self._path)
+
+    @property
+    def budget(self) -> CpuBudget:
+        with self._lock:
+            return self._budget
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "cpu_count": os.cpu_count(),
+                "available_cores": self._cores,
+                "mode": self._mode,
+                "budget": self._budget.to_dict(),
+                "default": default_budget(self._cores).to_dict(),
+                "tuning": self._tuning,
+            }
+
+    def set(self, data: dict) -> CpuBudget:
+        """Update the budget (partial updates keep the other fields);
+        ``{"reset": true}`` goes back to the defaults.  Raises ValueError."""
+        with self._lock:
+            if data.get("reset"):
+                self._budget, self._mode, self._tuning = default_budget(self._cores), "default", None
+            else:
+                self._budget = CpuBudget.from_dict(data, self._cores, base=self._budget)
+                self._mode = "manual"
+            self._save()
+            return self._budget
+
+    def apply(self) -> None:
+        """Apply the budget to this (the server) process."""
+        budget = self.budget
+        cv2.setNumThreads(budget.opencv_threads)
+        apply_torch_threads(budget)
+        if budget.affinity:
+            set_affinity(budget.server_cores)
+
+    def autotune(self, infer, frames: int = 30, on_progress=None) -> dict:
+        """Benchmark ``infer(frame)`` + JPEG encoding for candidate thread
+        counts, then save and return the best budget.
+
+        Faster than 3% counts as better; otherwise fewer threads win, which
+        leaves headroom for the API and face recognition.
+        """
+        n = len(self._cores)
+        reserve = 1 if n >= 3 else 0
+        torch_options = sorted({t for t in (1, 2, n // 2, n - 1 - reserve, n - reserve) if 1 <= t <= n - reserve} or {1})
+        cv_options = [1, 2] if n >= 4 else [1]
+        candidates = [(t, c) for t in torch_options for c in cv_options]
+
+        rng = np.random.default_rng(0)
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (0, 0), 3)
+        base = default_budget(self._cores)
+        results = []
+        try:
+            for i, (torch_threads, cv_threads) in enumerate(candidates):
+                trial = CpuBudget(**{**base.to_dict(), "torch_threads": torch_threads, "opencv_threads": cv_threads})
+                cv2.setNumThreads(cv_threads)
+                apply_torch_threads(trial)
+                for _ in range(3):
+                    infer(frame)
+                t0 = time.perf_counter()
+                for _ in range(frames):
+                    infer(frame)
+                    cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                elapsed = time.perf_counter() - t0
+                results.append({
+                    "torch_threads": torch_threads,
+                    "opencv_threads": cv_threads,
+                    "fps": round(frames / elapsed, 2),
+                    "ms_per_frame": round(elapsed * 1000 / frames, 2),
+                })
+                if on_progress:
+                    on_progress(i + 1, len(candidates))
+        finally:
+            # the last trial's thread counts must not outlive a failed run
+            self.apply()
+
+        best_fps = max(r["fps"] for r in results)
+        good = [r for r in results if r["fps"] >= best_fps * 0.97]
+        best = min(good, key=lambda r: (r["torch_threads"], r["opencv_threads"]))
+        with self._lock:
+            budget = CpuBudget(**{**self._budget.to_dict(),
+                                  "torch_threads": best["torch_threads"],
+                                  "opencv_threads": best["opencv_threads"]})
+            self._budget = budget
+            self._mode = "tuned"
+            self._tuning = {
+                "timestamp": time.time(),
+                "frames": frames,
+                "platform": sys.platform,
+                "results": results,
+                "best": best,
+            }
+            self._save()
+        self.apply()
+        return {"budget": budget.to_dict(), **self._tuning}
@@ -0,0 +1,91 @@
+import asyncio
+import shutil
+import uuid
+from pathlib import Path, PurePosixPath
+
+from fastapi import APIRouter, UploadFile, File, Form
+from fastapi.responses import FileResponse
+
+from backend.detector import DetectionEngine
+
+_VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
+
+
+def _save_upload(upload: UploadFile, analysis_dir: Path) -> Path:
+    uploads = analysis_dir / "uploads"
+    uploads.mkdir(parents=True, exist_ok=True)
+    path = uploads / f"{uuid.uuid4().hex}{PurePosixPath(upload.filename or '').suffix.lower()}"
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+    return path
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/analysis")
+    async def start_analysis(
+        file: UploadFile | None = File(None),
+        recording: str = Form(""),
+        model_name: str = Form(""),
+        confidence: float | None = Form(None),
+        annotate: str = Form("false"),
+        segment_seconds: float = Form(60.0),
+        workers: int | None = Form(None),
+        source: str = Form(""),
+        use_cache: str = Form("true"),
+        tracker: str = Form(""),
+    ):
+        if file is not None:
+            if PurePosixPath(file.filename or "").suffix.lower() not in _VIDEO_EXTS:
+                return {"status": "error", "message": f"{file.filename}: unsupported video type"}
+            path = await asyncio.to_thread(_save_upload, file, engine.analysis_dir)
+            delete_input = True
+        elif recording:
+            path = engine.recorder.segment_path(recording)
+            if path is None:
+                return {"status": "error", "message": f"Recording '{recording}' not found"}
+            delete_input = False
+        else:
+            return {"status": "error", "message": "Upload a file or name a recording"}
+        result = await asyncio.to_thread(
+            engine.start_analysis,
+            path,
+            model_name=model_name or None,
+            confidence=confidence,
+            annotate=annotate.lower() in ("true", "1", "yes"),
+            segment_seconds=segment_seconds,
+            workers=workers,
+            source=source or None,
+            delete_input=delete_input,
+            use_cache=use_cache.lower() in ("true", "1", "yes"),
+            tracker=tracker or None,
+        )
+        if result.get("status") != "ok" and delete_input:
+            path.unlink(missing_ok=True)
+        return result
+
+    @router.get("/analysis")
+    def list_analyses():
+        return engine.list_analyses()
+
+    @router.get("/analysis/cache")
+    def detection_cache_stats():
+        return engine.detection_cache_stats()
+
+    @router.delete("/analysis/cache")
+    def clear_detection_cache():
+        return engine.clear_detection_cache()
+
+    @router.get("/analysis/{job_id}")
+    def get_analysis(job_id: str):
+        return engine.get_job(job_id)
+
+    @router.get("/analysis/{job_id}/files/{name}")
+    def get_analysis_file(job_id: str, name: str):
+        path = engine.analysis_file(job_id, name)
+        if path is None:
+            return {"status": "error", "message": "Not found"}
+        return FileResponse(path)
+
+    return router
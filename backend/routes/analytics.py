@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Body, Query
+from fastapi.responses import StreamingResponse
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/analytics")
+    def get_analytics():
+        return engine.get_analytics()
+
+    @router.get("/analytics/config")
+    def get_analytics_config(source: str | None = Query(None, description="Default: current camera")):
+        return engine.get_analytics_config(source)
+
+    @router.put("/analytics/config")
+    def set_analytics_config(
+        data: dict = Body(...),
+        source: str | None = Query(None, description="Default: current camera"),
+    ):
+        return engine.set_analytics_config(data, source)
+
+    @router.get("/events")
+    def event_stream():
+        return StreamingResponse(
+            engine.event_generator(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    return router
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Body, Request
+from fastapi.responses import Response
+
+from backend.cluster import Coordinator
+
+
+def create_router(coordinator: Coordinator) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/cluster")
+    def cluster_status():
+        return coordinator.status()
+
+    @router.post("/cluster/sources")
+    def add_source(data: dict = Body(...)):
+        return coordinator.add_source(data)
+
+    @router.delete("/cluster/sources/{source_id}")
+    def remove_source(source_id: str):
+        return coordinator.remove_source(source_id)
+
+    @router.get("/cluster/sources/{source_id}/thumb")
+    def source_thumbnail(source_id: str, request: Request):
+        found = coordinator.thumbnail(source_id)
+        if found is None:
+            return {"status": "error", "message": "No thumbnail yet"}
+        jpeg, version = found
+        etag = f'"{source_id}-{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(jpeg, media_type="image/jpeg", headers=headers)
+
+    return router
@@ -2,10 +2,10 @@ from fastapi import APIRouter
 
 from backend.detector import DetectionEngine
 
-router = APIRouter()
-
 
 def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
     @router.post("/start")
     def start():
         return engine.start()
@@ -1,30 +1,80 @@
 import asyncio
 import io
+import zipfile
+import zlib
+from pathlib import PurePosixPath
 
-import cv2
-import numpy as np
-from PIL import Image, ImageOps
 from fastapi import APIRouter, UploadFile, File, Form, Query
 from fastapi.responses import Response
 
 from backend.detector import DetectionEngine
+from backend.face_db import content_hash, decode_image
 
-router = APIRouter()
+_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
 
 
-def _decode_upload(data: bytes) -> np.ndarray | None:
-    """Decode uploaded image bytes to BGR numpy array, applying EXIF orientation."""
-    try:
-        pil_img = Image.open(io.BytesIO(data))
-        pil_img = ImageOps.exif_transpose(pil_img)
-        pil_img = pil_img.convert("RGB")
-        rgb = np.asarray(pil_img)
-        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
-    except Exception:
-        return None
+_MAX_BULK_BYTES = 512 * 1024 * 1024    # uncompressed image bytes per bulk upload
+_ZIP_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, RuntimeError, NotImplementedError,
+               EOFError, OSError, zlib.error)   # corrupt, encrypted or unsupported archives
+
+
+def _read_capped(zf: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    """An entry's bytes, refusing to inflate more than *limit* (the sizes in
+    the archive's directory can't be trusted)."""
+    if info.file_size > limit:
+        raise ValueError("upload exceeds the size limit")
+    with zf.open(info) as f:
+        data = f.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError("upload exceeds the size limit")
+    return data
+
+
+def _expand_bulk_uploads(uploads: list[tuple[str, bytes]], name: str,
+                         max_bytes: int = _MAX_BULK_BYTES) -> tuple[list[tuple[str, str, bytes]], list[dict]]:
+    """Turn uploaded files (images or zips) into (name, filename, bytes) items.
+
+    Without an explicit *name*, zip entries are named after their top-level
+    folder (``alice/1.jpg`` -> alice) and loose images after their file stem.
+    Unreadable archives and entries, and anything past *max_bytes* of
+    images in total, come back as per-file errors like the job's own.
+    Blocking; run it off the event loop.
+    """
+    items, errors = [], []
+    budget = max_bytes
+    for filename, data in uploads:
+        if not zipfile.is_zipfile(io.BytesIO(data)):
+            person = name or PurePosixPath(filename).stem
+            if len(data) > budget:
+                errors.append({"filename": filename, "name": person, "message": "upload exceeds the size limit"})
+                continue
+            budget -= len(data)
+            items.append((person, filename, data))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    path = PurePosixPath(info.filename)
+                    if info.is_dir() or path.suffix.lower() not in _IMAGE_EXTS or path.name.startswith("."):
+                        continue
+                    person = name or (path.parts[0] if len(path.parts) > 1 else path.stem)
+                    entry = f"{filename}:{info.filename}"
+                    try:
+                        content = _read_capped(zf, info, budget)
+                    except (ValueError, *_ZIP_ERRORS) as e:
+                        errors.append({"filename": entry, "name": person, "message": str(e) or type(e).__name__})
+                        continue
+                    budget -= len(content)
+                    items.append((person, info.filename, content))
+        except _ZIP_ERRORS as e:
+            errors.append({"filename": filename, "name": name or None,
+                           "message": f"unreadable zip archive: {e or type(e).__name__}"})
+    return items, errors
 
 
 def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
     @router.get("/faces")
     def list_faces():
         return engine.list_faces()
@@ -44,13 +94,30 @@ def create_router(engine: DetectionEngine) -> APIRouter:
             return {"status": "error", "message": "Name is required"}
         force_cpu = cpu_only.lower() in ("true", "1", "yes")
         data = await files[0].read()
-        bgr = _decode_upload(data)
+        bgr = decode_image(data)
         if bgr is None:
             return {"status": "error", "message": f"{files[0].filename}: could not decode image"}
-        result = await asyncio.to_thread(engine.enroll_face_from_image, name, bgr, force_cpu)
+        result = await asyncio.to_thread(engine.enroll_face_from_image, name, bgr, force_cpu, content_hash(data))
         result.setdefault("filename", files[0].filename)
         return result
 
+    @router.post("/faces/bulk")
+    async def bulk_enroll(
+        files: list[UploadFile] = File(...),
+        name: str = Form(""),
+        cpu_only: str = Form("false"),
+    ):
+        force_cpu = cpu_only.lower() in ("true", "1", "yes")
+        uploads = [(f.filename or "upload", await f.read()) for f in files]
+        # decompression is CPU-bound: keep it off the event loop
+        items, errors = await asyncio.to_thread(_expand_bulk_uploads, uploads, name.strip())
+        # with an engine process this pickles every image through the pipe
+        return await asyncio.to_thread(engine.start_bulk_enroll, items, force_cpu, errors)
+
+    @router.get("/faces/bulk/{job_id}")
+    def bulk_enroll_status(job_id: str):
+        return engine.get_job(job_id)
+
     @router.delete("/faces/{name}")
     def delete_face(name: str):
         return engine.delete_face(name)
@@ -71,6 +138,14 @@ def create_router(engine: DetectionEngine) -> APIRouter:
     ):
         data = await file.read()
         do_merge = merge.lower() in ("true", "1", "yes")
-        return engine.import_face_db(data, do_merge)
+        return await asyncio.to_thread(engine.import_face_db, data, do_merge)
+
+    @router.post("/faces/compact")
+    async def compact_face_db(
+        max_prototypes: int = Form(16),
+        dry_run: str = Form("false"),
+    ):
+        do_dry_run = dry_run.lower() in ("true", "1", "yes")
+        return await asyncio.to_thread(engine.compact_face_db, max_prototypes, do_dry_run)
 
     return router
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/health")
+    def health(strict: bool = Query(False, description="Respond 503 until ready")):
+        status = engine.health()
+        if strict and not status["ready"]:
+            return JSONResponse(status, status_code=503)
+        return status
+
+    return router
@@ -0,0 +1,22 @@
+import time
+
+from fastapi import APIRouter, Query
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/history")
+    def query_history(
+        start: float | None = Query(None, description="Unix seconds (default: 24h before end)"),
+        end: float | None = Query(None, description="Unix seconds (default: now)"),
+        resolution: str = Query("minute", pattern="^(raw|minute|hour)$"),
+        limit: int = Query(10000, ge=1, le=100000),
+    ):
+        end = time.time() if end is None else end
+        start = end - 86400 if start is None else start
+        return engine.query_history(start, end, resolution, limit)
+
+    return router
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Body
+from fastapi.responses import PlainTextResponse
+
+from backend.detector import DetectionEngine
+
+_PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/metrics")
+    def get_metrics_text():
+        return PlainTextResponse(engine.metrics_text(), media_type=_PROMETHEUS_TYPE)
+
+    @router.get("/metrics/json")
+    def get_metrics():
+        return engine.get_metrics()
+
+    @router.put("/metrics")
+    def set_metrics(data: dict = Body(...)):
+        return engine.set_metrics(data)
+
+    return router
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Body, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/profile/cpu")
+    def profile_cpu(
+        duration: float = Query(10.0, gt=0, le=120, description="Seconds to sample"),
+        interval_ms: float = Query(10.0, ge=1, le=1000),
+        fmt: str = Query("speedscope", alias="format", description="speedscope or collapsed"),
+        all_threads: bool = Query(False, description="Sample every thread, not just detection and face"),
+    ):
+        result = engine.profile_cpu(duration, interval_ms, fmt, all_threads)
+        if result["status"] != "ok":
+            return result
+        if fmt == "collapsed":
+            return PlainTextResponse(
+                result["profile"],
+                headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'},
+            )
+        return JSONResponse(
+            result["profile"],
+            headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'},
+        )
+
+    @router.get("/profile/memory")
+    def memory_status():
+        return engine.memory_status()
+
+    @router.put("/profile/memory")
+    def set_memory_tracing(data: dict = Body(...)):
+        return engine.set_memory_tracing(bool(data.get("enabled")), int(data.get("frames", 1)))
+
+    @router.post("/profile/memory/snapshot")
+    def memory_snapshot(
+        top: int = Query(25, ge=1, le=200),
+        against: str = Query("previous", description="previous or first snapshot"),
+    ):
+        return engine.memory_snapshot(top, against)
+
+    return router
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import FileResponse
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/recording")
+    def recording_status():
+        return engine.recording_status()
+
+    @router.post("/recording/start")
+    def start_recording():
+        return engine.start_recording()
+
+    @router.post("/recording/stop")
+    def stop_recording():
+        return engine.stop_recording()
+
+    @router.get("/recordings/{name}")
+    def get_recording(name: str):
+        path = engine.recorder.segment_path(name)
+        if path is None:
+            return {"status": "error", "message": "Not found"}
+        return FileResponse(path, media_type="video/mp4")
+
+    return router
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Body, Query
+
+from backend.detector import DetectionEngine
+
+
+def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/resources")
+    def get_resources():
+        return engine.get_resources()
+
+    @router.put("/resources")
+    def set_resources(data: dict = Body(...)):
+        return engine.set_resources(data)
+
+    @router.post("/resources/autotune")
+    def start_autotune(frames: int = Query(30, ge=5, le=300, description="Measured frames per configuration")):
+        return engine.start_autotune(frames)
+
+    @router.get("/resources/autotune/{job_id}")
+    def autotune_status(job_id: str):
+        return engine.get_job(job_id)
+
+    return router
@@ -1,33 +1,84 @@
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
+from pathlib import Path
 
-from backend.detector import DetectionEngine, SCREENSHOT_DIR
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
-router = APIRouter()
+from backend.detector import DetectionEngine
+
+# Screenshot names are unique per capture, so clients may cache aggressively;
+# the ETag covers the rare delete-and-recreate case.
+_CACHE_CONTROL = "private, max-age=86400"
+
+
+def _serve_cached(request: Request, path: Path, etag: str):
+    headers = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
 
 
 def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
+    store = engine.screenshots
+
     @router.post("/screenshot")
     def take_screenshot():
         return engine.take_screenshot()
 
+    @router.post("/screenshot/burst")
+    def capture_burst(
+        seconds: float = Query(5.0, ge=0),
+        after: float = Query(0.0, ge=0),
+    ):
+        return engine.capture_burst(seconds=seconds, after=after)
+
     @router.get("/screenshots")
-    def list_screenshots():
-        return engine.list_screenshots()
+    def list_screenshots(
+        limit: int = Query(60, ge=1, le=500),
+        cursor: str | None = Query(None),
+    ):
+        return engine.list_screenshots(limit=limit, cursor=cursor)
 
     @router.get("/screenshots/{name}")
-    def get_screenshot(name: str):
-        path = SCREENSHOT_DIR / name
-        if not path.exists() or not path.is_file():
+    def get_screenshot(name: str, request: Request):
+        path = store.path(name)
+        if path is None:
+            return {"status": "error", "message": "Not found"}
+        return _serve_cached(request, path, store.etag(path))
+
+    @router.get("/screenshots/{name}/thumb")
+    def get_thumbnail(name: str, request: Request):
+        path = store.thumbnail(name)
+        if path is None:
             return {"status": "error", "message": "Not found"}
-        return FileResponse(path, media_type="image/jpeg")
+        return _serve_cached(request, path, store.etag(path))
 
     @router.delete("/screenshots/{name}")
     def delete_screenshot(name: str):
-        path = SCREENSHOT_DIR / name
-        if not path.exists() or not path.is_file():
+        if not store.delete(name):
+            return {"status": "error", "message": "Not found"}
+        return {"status": "ok"}
+
+    @router.get("/bursts")
+    def list_bursts():
+        return {"bursts": store.list_bursts()}
+
+    @router.get("/bursts/{name}")
+    def download_burst(name: str):
+        chunks = store.burst_zip(name)
+        if chunks is None:
+            return {"status": "error", "message": "Not found"}
+        return StreamingResponse(
+            chunks,
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{name}.zip"'},
+        )
+
+    @router.delete("/bursts/{name}")
+    def delete_burst(name: str):
+        if not store.delete_burst(name):
             return {"status": "error", "message": "Not found"}
-        path.unlink()
         return {"status": "ok"}
 
     return router
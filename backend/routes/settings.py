@@ -2,10 +2,10 @@ from fastapi import APIRouter, Body
 
 from backend.detector import DetectionEngine
 
-router = APIRouter()
-
 
 def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
     @router.get("/settings")
     def get_settings():
         return engine.get_settings()
@@ -14,4 +14,8 @@ def create_router(engine: DetectionEngine) -> APIRouter:
     def update_settings(data: dict = Body(...)):
         return engine.update_settings(data)
 
+    @router.get("/models")
+    def get_models():
+        return engine.models()
+
     return router
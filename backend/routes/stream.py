@@ -1,12 +1,12 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
 from backend.detector import DetectionEngine
 
-router = APIRouter()
-
 
 def create_router(engine: DetectionEngine) -> APIRouter:
+    router = APIRouter()
+
     @router.get("/stream")
     def video_stream():
         return StreamingResponse(
@@ -14,4 +14,19 @@ def create_router(engine: DetectionEngine) -> APIRouter:
             media_type="multipart/x-mixed-replace; boundary=frame",
         )
 
+    @router.get("/frame.jpg")
+    def frame_snapshot(
+        request: Request,
+        w: int | None = Query(None, ge=16, le=4096, description="Scale down to this width"),
+        q: int | None = Query(None, ge=10, le=95, description="JPEG quality (default: as streamed)"),
+    ):
+        found = engine.snapshot(w, q, request.headers.get("if-none-match"))
+        if found is None:
+            return {"status": "error", "message": "No frame available"}
+        etag, jpeg = found
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if jpeg is None:
+            return Response(status_code=304, headers=headers)
+        return Response(jpeg, media_type="image/jpeg", headers=headers)
+
     return router
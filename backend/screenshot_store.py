@@ -0,0 +1,330 @@
+"""
+ScreenshotStore — indexed screenshot folder with background writes and thumbnails.
+
+Keeps an in-memory, name-sorted index of the screenshot directory so listing
+is a bisect + slice instead of a glob, sort and stat of every file.  Writes
+happen on a single background thread, and thumbnails are generated once and
+cached under ``.thumbs/``.  Burst captures go to ``bursts/<name>/`` and are
+pruned oldest-first to keep disk usage bounded.
+"""
+
+import bisect
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+_THUMB_WIDTH = 320
+_THUMB_QUALITY = 70
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write *data* to *path* through a temp file of its own, so concurrent
+    writers of the same path never share (and truncate) one temp file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file that collects what zipfile writes, for streaming."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ScreenshotStore:
+    """Thread-safe index over a folder of ``*.jpg`` screenshots."""
+
+    def __init__(self, directory: Path, max_bursts: int = 50, max_burst_bytes: int = 1024 ** 3) -> None:
+        self._dir = directory
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._thumb_dir = self._dir / ".thumbs"
+        self._thumb_dir.mkdir(exist_ok=True)
+        self._burst_dir = self._dir / "bursts"
+        self._max_bursts = max_bursts
+        self._max_burst_bytes = max_burst_bytes
+        self._lock = threading.Lock()
+        self._names: list[str] = []           # ascending
+        self._sizes: dict[str, int] = {}
+        self._reserved: set[str] = set()      # names handed out but not yet written
+        self._dir_mtime = -1
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+        self._rescan()
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _rescan(self) -> None:
+        """Rebuild the index from disk.  Lock must NOT be held."""
+        mtime = os.stat(self._dir).st_mtime_ns
+        sizes = {}
+        with os.scandir(self._dir) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg") and entry.is_file():
+                    sizes[entry.name] = entry.stat().st_size
+        with self._lock:
+            self._sizes = sizes
+            self._names = sorted(sizes)
+            self._dir_mtime = mtime
+
+    def _refresh_if_changed(self) -> None:
+        """Pick up files added or removed outside the store (e.g. by hand)."""
+        try:
+            mtime = os.stat(self._dir).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._dir_mtime:
+            self._rescan()
+
+    def _index_add(self, name: str, size: int) -> None:
+        with self._lock:
+            if name not in self._sizes:
+                bisect.insort(self._names, name)
+            self._sizes[name] = size
+            self._reserved.discard(name)
+            self._dir_mtime = os.stat(self._dir).st_mtime_ns
+
+    def _index_remove(self, name: str) -> None:
+        with self._lock:
+            if self._sizes.pop(name, None) is not None:
+                idx = bisect.bisect_left(self._names, name)
+                if idx < len(self._names) and self._names[idx] == name:
+                    del self._names[idx]
+            self._dir_mtime = os.stat(self._dir).st_mtime_ns
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._names)
+
+    def page(self, limit: int = 60, cursor: str | None = None) -> dict:
+        """Return one page of screenshots, newest first.
+
+        *cursor* is the ``next_cursor`` of the previous page (the last name
+        it contained); ``next_cursor`` is None on the final page.
+        """
+        self._refresh_if_changed()
+        limit = max(1, min(int(limit), 500))
+        with self._lock:
+            end = bisect.bisect_left(self._names, cursor) if cursor else len(self._names)
+            start = max(0, end - limit)
+            page = self._names[start:end][::-1]
+            items = [{"name": n, "size": self._sizes[n]} for n in page]
+            total = len(self._names)
+        return {
+            "items": items,
+            "next_cursor": page[-1] if page and start > 0 else None,
+            "total": total,
+        }
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _valid_name(name: str) -> bool:
+        return name.endswith(".jpg") and Path(name).name == name and not name.startswith(".")
+
+    def path(self, name: str) -> Path | None:
+        if not self._valid_name(name):
+            return None
+        path = self._dir / name
+        return path if path.is_file() else None
+
+    def thumbnail(self, name: str) -> Path | None:
+        """Return the cached thumbnail for *name*, generating it on first use."""
+        src = self.path(name)
+        if src is None:
+            return None
+        thumb = self._thumb_dir / name
+        if thumb.is_file():
+            return thumb
+        frame = cv2.imread(str(src))
+        if frame is None:
+            return None
+        self._write_thumbnail(thumb, frame)
+        return thumb
+
+    @staticmethod
+    def _write_thumbnail(thumb: Path, frame) -> None:
+        h, w = frame.shape[:2]
+        if w > _THUMB_WIDTH:
+            frame = cv2.resize(frame, (_THUMB_WIDTH, int(h * _THUMB_WIDTH / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, _THUMB_QUALITY])
+        if ok:
+            _write_atomic(thumb, buf.tobytes())
+
+    @staticmethod
+    def _thumbnail_from_jpeg(thumb: Path, jpeg: bytes) -> None:
+        # Decoding at 1/4 scale is several times cheaper than a full decode
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_COLOR_4)
+        if frame is not None:
+            ScreenshotStore._write_thumbnail(thumb, frame)
+
+    def reserve_name(self, prefix: str = "detection") -> str:
+        """Return a fresh timestamped filename that no pending write uses."""
+        stem = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        with self._lock:
+            name = f"{stem}.jpg"
+            n = 1
+            while name in self._sizes or name in self._reserved:
+                n += 1
+                name = f"{stem}_{n}.jpg"
+            self._reserved.add(name)
+        return name
+
+    def save_jpeg_async(self, name: str, jpeg: bytes) -> Future:
+        """Write already-encoded JPEG bytes as-is on the writer thread.
+
+        The returned future resolves to True once the file is indexed.
+        """
+        return self._writer.submit(self._write_jpeg, name, jpeg)
+
+    def _write_jpeg(self, name: str, jpeg: bytes) -> bool:
+        try:
+            _write_atomic(self._dir / name, jpeg)
+            self._thumbnail_from_jpeg(self._thumb_dir / name, jpeg)
+            self._index_add(name, len(jpeg))
+            return True
+        except Exception as e:
+            with self._lock:
+                self._reserved.discard(name)
+            print(f"[screenshots] failed to write {name}: {e}", flush=True)
+            return False
+
+    def save_burst_async(self, name: str, frames: list[tuple[float, bytes]]) -> Future:
+        """Write a sequence of (timestamp, jpeg) frames to ``bursts/<name>/``.
+
+        Files are named by their offset from the first frame in milliseconds.
+        The returned future resolves to the number of frames written.
+        """
+        return self._writer.submit(self._write_burst, name, frames)
+
+    def _write_burst(self, name: str, frames: list[tuple[float, bytes]]) -> int:
+        folder = self._burst_dir / name
+        folder.mkdir(parents=True, exist_ok=True)
+        t0 = frames[0][0] if frames else 0.0
+        written = 0
+        for ts, jpeg in frames:
+            try:
+                (folder / f"frame_{round((ts - t0) * 1000):07d}.jpg").write_bytes(jpeg)
+                written += 1
+            except OSError as e:
+                print(f"[screenshots] burst {name}: {e}", flush=True)
+                break
+        self._enforce_burst_retention()
+        return written
+
+    def _enforce_burst_retention(self) -> None:
+        bursts = self.list_bursts()[::-1]      # oldest first
+        total = sum(b["size"] for b in bursts)
+        while bursts and (len(bursts) > self._max_bursts or total > self._max_burst_bytes):
+            oldest = bursts.pop(0)
+            total -= oldest["size"]
+            shutil.rmtree(self._burst_dir / oldest["name"], ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Bursts
+    # ------------------------------------------------------------------
+
+    def _burst_folder(self, name: str) -> Path | None:
+        if Path(name).name != name or not name.startswith("burst_"):
+            return None
+        folder = self._burst_dir / name
+        return folder if folder.is_dir() else None
+
+    @staticmethod
+    def _burst_frames(folder: Path) -> list[os.DirEntry]:
+        with os.scandir(folder) as it:
+            frames = [e for e in it if e.name.endswith(".jpg") and e.is_file()]
+        return sorted(frames, key=lambda e: e.name)
+
+    def list_bursts(self) -> list[dict]:
+        """Saved bursts, newest first, with their frame count and total size."""
+        if not self._burst_dir.is_dir():
+            return []
+        bursts = []
+        with os.scandir(self._burst_dir) as it:
+            for entry in it:
+                if not entry.name.startswith("burst_") or not entry.is_dir():
+                    continue
+                try:
+                    frames = self._burst_frames(Path(entry.path))
+                    size = sum(e.stat().st_size for e in frames)
+                except FileNotFoundError:      # pruned or deleted meanwhile
+                    continue
+                bursts.append({"name": entry.name, "frames": len(frames), "size": size})
+        return sorted(bursts, key=lambda b: b["name"], reverse=True)
+
+    def burst_zip(self, name: str) -> Iterator[bytes] | None:
+        """Stream a burst's frames as an uncompressed ZIP, or None if unknown.
+
+        JPEGs don't compress further, so entries are stored; the archive is
+        produced frame by frame and never held in memory as a whole.
+        """
+        folder = self._burst_folder(name)
+        if folder is None:
+            return None
+        frames = self._burst_frames(folder)
+
+        def chunks() -> Iterator[bytes]:
+            sink = _ChunkSink()
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+                for entry in frames:
+                    try:
+                        zf.write(entry.path, f"{name}/{entry.name}")
+                    except FileNotFoundError:  # burst deleted mid-download
+                        break
+                    yield sink.take()
+            yield sink.take()
+
+        return chunks()
+
+    def delete_burst(self, name: str) -> bool:
+        folder = self._burst_folder(name)
+        if folder is None:
+            return False
+        shutil.rmtree(folder, ignore_errors=True)
+        return True
+
+    def delete(self, name: str) -> bool:
+        path = self.path(name)
+        if path is None:
+            return False
+        path.unlink(missing_ok=True)
+        (self._thumb_dir / name).unlink(missing_ok=True)
+        self._index_remove(name)
+        return True
+
+    @staticmethod
+    def etag(path: Path) -> str:
+        st = path.stat()
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
@@ -0,0 +1,119 @@
+"""
+Single-frame snapshots of the live feed for dashboards and thumbnails.
+
+``GET /api/frame.jpg`` serves the frame the detection loop already
+encoded for the MJPEG stream.  Requests for a smaller width or another
+JPEG quality get a variant made from those bytes once per frame: the first
+request builds it, concurrent ones for the same variant wait for that
+result, and every later poll of the same frame reuses it.  A new frame
+drops the old variants.
+"""
+
+import threading
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+_DEFAULT_QUALITY = 80            # the stream's own quality
+_MAX_VARIANTS = 16               # (width, quality) pairs kept per frame
+
+# start-of-frame markers that carry the image size (not DHT/JPG/DAC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(jpeg: bytes) -> tuple[int, int] | None:
+    """(width, height) from a JPEG's frame header, without decoding it."""
+    i = 2
+    n = len(jpeg)
+    while i + 9 <= n:
+        if jpeg[i] != 0xFF:
+            return None
+        marker = jpeg[i + 1]
+        if marker == 0xFF:           # fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            return int.from_bytes(jpeg[i + 7:i + 9], "big"), int.from_bytes(jpeg[i + 5:i + 7], "big")
+        i += 2 + int.from_bytes(jpeg[i + 2:i + 4], "big")
+    return None
+
+
+def resize_jpeg(jpeg: bytes, width: int | None = None, quality: int | None = None) -> bytes:
+    """*jpeg* scaled down to *width* (never up) and re-encoded at *quality*.
+
+    Decodes at 1/2, 1/4 or 1/8 scale when that is still at least *width*
+    wide, which is several times cheaper than a full decode.  Returns the
+    input unchanged when there is nothing to do.
+    """
+    size = jpeg_size(jpeg)
+    full_w = size[0] if size else None
+    if width is not None and full_w is not None and width >= full_w:
+        width = None
+    if width is None and quality is None:
+        return jpeg
+    flag = cv2.IMREAD_COLOR
+    if width is not None and full_w is not None:
+        for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if full_w // factor >= width:
+                flag = reduced
+                break
+    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), flag)
+    if frame is None:
+        raise ValueError("frame is not a valid JPEG")
+    h, w = frame.shape[:2]
+    if width is not None and w > width:
+        frame = cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality or _DEFAULT_QUALITY])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+class SnapshotCache:
+    """Resized/re-encoded variants of the newest frame, keyed by sequence."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._seq = -1
+        self._variants: dict[tuple, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, seq: int, jpeg: bytes, width: int | None, quality: int | None) -> bytes:
+        """Variant (*width*, *quality*) of frame *seq*, whose bytes are *jpeg*."""
+        if width is None and quality is None:
+            return jpeg
+        key = (width, quality)
+        owner = None
+        with self._lock:
+            if seq > self._seq:
+                self._seq = seq
+                self._variants = {}
+            future = self._variants.get(key) if seq == self._seq else None
+            if future is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                # an older frame (a poll racing a new one) is built, not kept
+                if seq == self._seq and len(self._variants) < _MAX_VARIANTS:
+                    owner = self._variants[key] = Future()
+        if future is not None:
+            return future.result()       # built, or being built by another request
+        try:
+            result = resize_jpeg(jpeg, width, quality)
+        except Exception as e:
+            if owner is not None:
+                owner.set_exception(e)
+                with self._lock:
+                    if self._variants.get(key) is owner:
+                        del self._variants[key]
+            raise
+        if owner is not None:
+            owner.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"seq": self._seq, "variants": len(self._variants), "hits": self.hits, "misses": self.misses}
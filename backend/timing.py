@@ -0,0 +1,134 @@
+"""
+StageTimings — per-stage latency samples and histograms from the detection
+loop, the face workers and the MJPEG stream.
+
+Disabled by default and switchable at runtime; while disabled, observe() is
+a single attribute check.  When enabled, each observation goes into a
+fixed-bucket histogram (exported in Prometheus text format) and into a
+bounded deque of recent samples (summarised as percentiles on demand).
+"""
+
+import threading
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+_MAX_SAMPLES = 20000
+
+# Histogram upper bounds in seconds; covers sub-millisecond stages (lock
+# waits, drawing) up to multi-second face recognition calls.
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+
+class StageTimings:
+    """Thread-safe bounded sample store and histograms keyed by stage name."""
+
+    def __init__(self, max_samples: int = _MAX_SAMPLES) -> None:
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._samples: dict[str, deque[float]] = {}
+        self._histograms: dict[str, _Histogram] = {}
+        self.enabled = False
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        slot = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self._max_samples)
+                self._histograms[stage] = _Histogram()
+            samples.append(seconds)
+            hist = self._histograms[stage]
+            hist.counts[slot] += 1
+            hist.total += seconds
+            hist.count += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._histograms.clear()
+
+    def samples(self, stage: str) -> list[float]:
+        with self._lock:
+            return list(self._samples.get(stage, ()))
+
+    def summary(self) -> dict:
+        """Per-stage count, mean and p50/p90/p99/max in milliseconds."""
+        with self._lock:
+            stages = {name: np.fromiter(s, dtype=np.float64) for name, s in self._samples.items()}
+        out = {}
+        for name, values in stages.items():
+            if not len(values):
+                continue
+            ms = values * 1000.0
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            out[name] = {
+                "count": int(len(ms)),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p90_ms": round(float(p90), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return out
+
+    def histograms(self) -> dict:
+        """Per-stage cumulative bucket counts, sum and count since reset().
+
+        Buckets are ``[upper_bound_seconds, cumulative_count]`` pairs, the
+        last one with bound ``"+Inf"``.
+        """
+        with self._lock:
+            snapshot = {name: (list(h.counts), h.total, h.count) for name, h in self._histograms.items()}
+        out = {}
+        for name, (counts, total, count) in snapshot.items():
+            cumulative = np.cumsum(counts).tolist()
+            out[name] = {
+                "buckets": [[le, c] for le, c in zip(BUCKETS + ("+Inf",), cumulative)],
+                "sum": total,
+                "count": count,
+            }
+        return out
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(histograms: dict, gauges: dict, counters: dict | None = None,
+                    prefix: str = "detector") -> str:
+    """Render StageTimings.histograms() plus ``{name: (help, value)}`` gauges
+    and counters in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    if histograms:
+        name = f"{prefix}_stage_seconds"
+        lines.append(f"# HELP {name} Latency of detection pipeline stages.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, hist in sorted(histograms.items()):
+            stage = _label(stage)
+            for le, count in hist["buckets"]:
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {hist["sum"]:.9g}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {hist["count"]}')
+    for kind, metrics in (("gauge", gauges), ("counter", counters or {})):
+        for metric, (help_text, value) in metrics.items():
+            name = f"{prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {float(value):.9g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,158 @@
+"""
+Bounded per-track bookkeeping for long-running detection sessions.
+
+TrackCache keeps face-recognition state per tracking ID with LRU + TTL
+eviction driven by lost tracks, and UniqueCounter counts distinct tracking
+IDs in constant memory.  Neither class is thread-safe: the engine guards
+TrackCache with its face lock, and UniqueCounter is only used by the
+detection thread.
+"""
+
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(value: int) -> int:
+    """splitmix64 finalizer — cheap, well-mixed 64-bit hash for integer IDs."""
+    z = (value + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+@dataclass
+class TrackState:
+    """Face-recognition bookkeeping for a single tracking ID."""
+
+    name: str | None = None
+    attempts: int = 0
+    last_attempt: float = 0.0
+    last_seen: float = 0.0
+    reid_attempts: int = 0      # appearance matches tried against lost tracks
+    descriptor_at: float = 0.0  # when the appearance descriptor was last stored
+
+
+class TrackCache:
+    """LRU + TTL map of tracking ID -> TrackState.
+
+    Every frame the detection loop touches the IDs it saw.  A track that has
+    not been seen for *ttl* seconds is treated as lost and evicted, and the
+    least recently seen track is dropped once *max_size* is exceeded, so
+    memory stays bounded no matter how many people walk past the camera.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 10.0) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[int, TrackState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, track_id: int) -> bool:
+        return track_id in self._entries
+
+    def get(self, track_id: int) -> TrackState | None:
+        return self._entries.get(track_id)
+
+    def touch(self, track_id: int, now: float) -> TrackState:
+        """Mark *track_id* as seen at *now*, creating its state if needed."""
+        state = self._entries.get(track_id)
+        if state is None:
+            state = TrackState()
+            self._entries[track_id] = state
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(track_id)
+        state.last_seen = now
+        return state
+
+    def expire(self, now: float) -> list[int]:
+        """Evict tracks not seen within the TTL and return their IDs.
+
+        Entries are ordered by last touch, so only the expired prefix is
+        visited.
+        """
+        lost: list[int] = []
+        cutoff = now - self._ttl
+        while self._entries:
+            track_id, state = next(iter(self._entries.items()))
+            if state.last_seen >= cutoff:
+                break
+            del self._entries[track_id]
+            lost.append(track_id)
+        return lost
+
+    def set_name(self, track_id: int, name: str) -> bool:
+        """Record a recognized name.  Ignored if the track was already evicted."""
+        state = self._entries.get(track_id)
+        if state is None:
+            return False
+        state.name = name
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class UniqueCounter:
+    """Distinct-ID counter with constant memory.
+
+    IDs are counted exactly until *exact_limit* distinct values have been
+    seen; after that the exact set is dropped and a HyperLogLog sketch with
+    2**precision one-byte registers (~1.6% error at the default precision)
+    takes over.  The registers are always maintained, so the switch-over is
+    seamless.
+    """
+
+    def __init__(self, exact_limit: int = 4096, precision: int = 12) -> None:
+        self._exact_limit = exact_limit
+        self._p = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+        self._exact: set[int] | None = set()
+        self._alpha = 0.7213 / (1 + 1.079 / self._m)
+        self._estimate: int | None = None
+
+    def add(self, item: int) -> None:
+        h = _hash64(item)
+        idx = h >> (64 - self._p)
+        rest = h & ((1 << (64 - self._p)) - 1)
+        rank = (64 - self._p) - rest.bit_length() + 1
+        if rank > self._registers[idx]:
+            self._registers[idx] = rank
+            self._estimate = None
+        if self._exact is not None:
+            self._exact.add(item)
+            if len(self._exact) > self._exact_limit:
+                self._exact = None
+
+    def update(self, items) -> None:
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        if self._exact is not None:
+            return len(self._exact)
+        if self._estimate is None:
+            self._estimate = self._hll_estimate()
+        return self._estimate
+
+    def _hll_estimate(self) -> int:
+        inv_sum = math.fsum(2.0 ** -r for r in self._registers)
+        estimate = self._alpha * self._m * self._m / inv_sum
+        if estimate <= 2.5 * self._m:
+            zeros = self._registers.count(0)
+            if zeros:
+                estimate = self._m * math.log(self._m / zeros)
+        # Never report fewer than we had already counted exactly
+        return max(int(round(estimate)), self._exact_limit + 1)
+
+    def clear(self) -> None:
+        self._registers = bytearray(self._m)
+        self._exact = set()
+        self._estimate = None
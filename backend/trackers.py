@@ -0,0 +1,258 @@
+"""
+Multi-object trackers that turn per-frame person detections into tracks.
+
+A tracker owns all of its state, so each source (the live camera, a cluster
+worker's source, an offline segment) gets its own instance and the model
+only ever runs plain ``predict()``.  Every tracker has the same interface:
+
+    tracker = make_tracker("sort", fps=30)
+    tracks = tracker.update(dets, frame.shape)   # dets: (N, 5) x1, y1, x2, y2, conf
+    # tracks: (M, 6) float32 x1, y1, x2, y2, track_id, conf
+
+Two are available:
+
+- ``bytetrack`` — ultralytics' ByteTrack, configured like
+  ``model.track(tracker="bytetrack.yaml")``.  Best at keeping IDs through
+  crowds and low-confidence frames.  ultralytics draws track IDs from one
+  class-level counter that every new BYTETracker zeroes, so each instance
+  swaps its own counter in around ultralytics calls (under a module lock).
+- ``sort`` — SORT: a constant-velocity Kalman filter per track and greedy
+  IoU matching, in plain NumPy with every track's filter updated in one
+  batched step.  No ultralytics import, cheaper per frame, for low-power
+  machines with simple scenes.
+
+``python -m benchmarks.trackers`` compares them on ID switches and cost.
+"""
+
+import threading
+
+import numpy as np
+
+TRACKERS = ("bytetrack", "sort")
+DEFAULT_TRACKER = "bytetrack"
+
+_EMPTY = np.empty((0, 6), dtype=np.float32)
+_BYTETRACK_IDS = threading.Lock()    # guards ultralytics' shared BaseTrack._count
+
+
+def make_tracker(name: str, fps: float = 30.0, first_id: int = 1):
+    """A new tracker called *name* (one of TRACKERS) for a source at *fps*.
+
+    Track IDs start at *first_id*, so a tracker replacing another mid-session
+    can continue after the IDs already handed out.
+    """
+    if name == "bytetrack":
+        return ByteTrackTracker(fps, first_id)
+    if name == "sort":
+        return SortTracker(fps, first_id)
+    raise ValueError(f"unknown tracker '{name}' (expected one of {', '.join(TRACKERS)})")
+
+
+def _detections(dets) -> np.ndarray:
+    """(N, 5) float array of x1, y1, x2, y2, conf."""
+    dets = np.asarray(dets, dtype=np.float32)
+    return dets.reshape(-1, 5) if dets.size else np.empty((0, 5), dtype=np.float32)
+
+
+class ByteTrackTracker:
+    """ultralytics' BYTETracker behind the common interface."""
+
+    name = "bytetrack"
+
+    def __init__(self, fps: float = 30.0, first_id: int = 1) -> None:
+        self._fps = fps
+        self._offset = first_id - 1
+        self._last_id = 0            # this instance's value of BaseTrack._count
+        self._tracker = self._create()
+
+    def _own_ids(self, call):
+        """Run *call* with BaseTrack's ID counter set to this tracker's own,
+        restoring the shared value afterwards."""
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        with _BYTETRACK_IDS:
+            shared = BaseTrack._count
+            BaseTrack._count = self._last_id
+            try:
+                return call()
+            finally:
+                self._last_id = BaseTrack._count
+                BaseTrack._count = shared
+
+    def _create(self):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml("bytetrack.yaml")))
+        self._last_id = 0
+        # BYTETracker.__init__ zeroes the counter: only this instance's copy
+        return self._own_ids(lambda: BYTETracker(args=cfg, frame_rate=max(1, int(round(self._fps)))))
+
+    def update(self, dets, shape: tuple) -> np.ndarray:
+        from ultralytics.engine.results import Boxes
+
+        dets = _detections(dets)
+        data = np.zeros((len(dets), 6), dtype=np.float32)   # class column stays 0 (person)
+        data[:, :5] = dets
+        boxes = Boxes(data, shape[:2])
+        tracks = self._own_ids(lambda: self._tracker.update(boxes, None))
+        if not len(tracks):
+            return _EMPTY
+        out = np.asarray(tracks[:, :6], dtype=np.float32)
+        out[:, 4] += self._offset
+        return out
+
+    def reset(self) -> None:
+        self._tracker = self._create()
+
+
+# SORT state per track: centre x, centre y, area, aspect ratio and the
+# velocities of the first three; only the first four are observed
+_F = np.eye(7, dtype=np.float64)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(4, 7, dtype=np.float64)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 1e-2, 1e-2, 1e-4])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+_I7 = np.eye(7)
+
+
+def _to_state(boxes: np.ndarray) -> np.ndarray:
+    """(N, 4) xyxy -> (N, 4) cx, cy, area, aspect."""
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)], axis=1)
+
+
+def _to_boxes(state: np.ndarray) -> np.ndarray:
+    """(N, >=4) cx, cy, area, aspect -> (N, 4) xyxy."""
+    area = np.maximum(state[:, 2], 0.0)
+    w = np.sqrt(area * np.maximum(state[:, 3], 0.0))
+    h = area / np.maximum(w, 1e-6)
+    return np.stack([state[:, 0] - w / 2, state[:, 1] - h / 2, state[:, 0] + w / 2, state[:, 1] + h / 2], axis=1)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU between (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _greedy_match(iou: np.ndarray, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs (rows, cols) of the highest IoUs first, each row and column at
+    most once, none below *threshold*."""
+    rows, cols = np.nonzero(iou >= threshold)
+    if not len(rows):
+        return rows, cols
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_r = np.zeros(iou.shape[0], dtype=bool)
+    used_c = np.zeros(iou.shape[1], dtype=bool)
+    keep = []
+    for k in order.tolist():
+        r, c = rows[k], cols[k]
+        if not used_r[r] and not used_c[c]:
+            used_r[r] = used_c[c] = True
+            keep.append(k)
+    return rows[keep], cols[keep]
+
+
+class SortTracker:
+    """SORT in NumPy: all tracks live in (T, 7) state and (T, 7, 7) covariance
+    arrays, so predicting and correcting cost one batched step per frame.
+
+    A track is reported once it has been matched *min_hits* frames in a row
+    (immediately during the first frames) and dropped after *max_age*
+    seconds without a match; it coasts on its velocity meanwhile, which
+    carries IDs through short occlusions.  Reported boxes are the matched
+    detections, not the filtered estimate.
+    """
+
+    name = "sort"
+
+    def __init__(self, fps: float = 30.0, first_id: int = 1, iou_threshold: float = 0.3,
+                 max_age: float = 1.0, min_hits: int = 2) -> None:
+        self._first_id = first_id
+        self._iou_threshold = iou_threshold
+        self._max_age = max(1, int(round(max_age * max(1.0, fps))))
+        self._min_hits = min_hits
+        self.reset()
+
+    def reset(self) -> None:
+        self._x = np.empty((0, 7))
+        self._p = np.empty((0, 7, 7))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._streak = np.empty(0, dtype=np.int64)     # consecutive matched frames
+        self._missed = np.empty(0, dtype=np.int64)     # frames since the last match
+        self._next_id = self._first_id
+        self._frame = 0
+
+    def _predict(self) -> None:
+        x, p = self._x, self._p
+        x[x[:, 2] + x[:, 6] <= 0, 6] = 0.0         # keep the area positive
+        self._x = x @ _F.T
+        self._p = _F @ p @ _F.T + _Q
+        self._missed += 1
+
+    def _correct(self, idx: np.ndarray, z: np.ndarray) -> None:
+        x, p = self._x[idx], self._p[idx]
+        y = z - x[:, :4]
+        s = p[:, :4, :4] + _R                      # H P H^T + R
+        k = np.linalg.solve(s, p[:, :4, :]).transpose(0, 2, 1)   # P H^T S^-1 (S symmetric)
+        self._x[idx] = x + np.einsum("tij,tj->ti", k, y)
+        self._p[idx] = (_I7 - k @ _H) @ p
+
+    def update(self, dets, shape: tuple | None = None) -> np.ndarray:
+        dets = _detections(dets)
+        self._frame += 1
+        if len(self._x):
+            self._predict()
+        det_state = _to_state(dets[:, :4].astype(np.float64))
+
+        matched_t = matched_d = np.empty(0, dtype=np.int64)
+        if len(self._x) and len(dets):
+            iou = iou_matrix(_to_boxes(self._x), dets[:, :4])
+            matched_t, matched_d = _greedy_match(iou, self._iou_threshold)
+            if len(matched_t):
+                self._correct(matched_t, det_state[matched_d])
+                self._missed[matched_t] = 0
+                self._streak[matched_t] += 1
+        unmatched_t = np.ones(len(self._x), dtype=bool)
+        unmatched_t[matched_t] = False
+        self._streak[unmatched_t] = 0
+
+        # unmatched detections start new tracks
+        new = np.ones(len(dets), dtype=bool)
+        new[matched_d] = False
+        n_new = int(new.sum())
+        if n_new:
+            x0 = np.zeros((n_new, 7))
+            x0[:, :4] = det_state[new]
+            ids = np.arange(self._next_id, self._next_id + n_new)
+            self._next_id += n_new
+            self._x = np.concatenate([self._x, x0])
+            self._p = np.concatenate([self._p, np.broadcast_to(_P0, (n_new, 7, 7))])
+            self._ids = np.concatenate([self._ids, ids])
+            self._streak = np.concatenate([self._streak, np.ones(n_new, dtype=np.int64)])
+            self._missed = np.concatenate([self._missed, np.zeros(n_new, dtype=np.int64)])
+            matched_t = np.concatenate([matched_t, np.arange(len(self._x) - n_new, len(self._x))])
+            matched_d = np.concatenate([matched_d, np.flatnonzero(new)])
+
+        # report this frame's confirmed tracks
+        confirmed = (self._streak[matched_t] >= self._min_hits) | (self._frame <= self._min_hits)
+        out = np.empty((int(confirmed.sum()), 6), dtype=np.float32)
+        out[:, :4] = dets[matched_d[confirmed], :4]
+        out[:, 4] = self._ids[matched_t[confirmed]]
+        out[:, 5] = dets[matched_d[confirmed], 4]
+
+        alive = self._missed <= self._max_age
+        if not alive.all():
+            self._x, self._p = self._x[alive], self._p[alive]
+            self._ids, self._streak, self._missed = self._ids[alive], self._streak[alive], self._missed[alive]
+        return out
@@ -0,0 +1,246 @@
+"""
+Detection worker for cluster mode.
+
+Connects to a coordinator (a server started with DETECTOR_COORDINATOR set,
+see backend/cluster.py), runs person detection on the sources it gets
+assigned and streams back, per frame, the people count and track boxes,
+plus a small annotated JPEG thumbnail a couple of times a second.
+
+Usage:
+    python -m backend.worker --coordinator 192.168.1.10:8765 [--name box-2]
+        [--capacity 2] [--threads 4] [--token SECRET]
+
+*capacity* is how many sources this machine runs at once.  Sources are
+opened here: camera indices refer to this machine's cameras, and file paths
+must exist on it.  When the connection drops, all sources stop and the
+worker reconnects with backoff; the coordinator moves them elsewhere
+meanwhile.
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+from backend.cluster import DEFAULT_PORT, hang_up, parse_address, recv_message, send_message
+from backend.detector import MODEL_DIR, _PREDICT_ARGS, _TRACKER_FPS
+from backend.trackers import DEFAULT_TRACKER, make_tracker
+
+_THUMB_WIDTH = 320
+_THUMB_INTERVAL = 0.5        # seconds between thumbnails per source
+_THUMB_QUALITY = 70
+_MAX_BACKOFF = 30.0
+
+
+def _open_capture(source: str) -> cv2.VideoCapture:
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise RuntimeError(f"cannot open {source}")
+    return cap
+
+
+def _thumbnail(frame, tracks: list) -> bytes:
+    """Downscaled frame with the track boxes drawn, JPEG-encoded."""
+    scale = _THUMB_WIDTH / frame.shape[1]
+    small = cv2.resize(frame, (_THUMB_WIDTH, max(1, round(frame.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    for _, x1, y1, x2, y2, _ in tracks:
+        cv2.rectangle(small, (int(x1 * scale), int(y1 * scale)), (int(x2 * scale), int(y2 * scale)), (0, 255, 100), 1)
+    return cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, _THUMB_QUALITY])[1].tobytes()
+
+
+class _SourceRunner(threading.Thread):
+    """Detection loop for one assigned source."""
+
+    def __init__(self, source_id: str, spec: dict, send) -> None:
+        super().__init__(daemon=True, name=f"source-{source_id}")
+        self.source_id = source_id
+        self._spec = spec
+        self._send = send
+        self._halt = threading.Event()
+        self.failed = False          # set before "failed" is sent: the coordinator may re-assign at once
+        self.fps = 0.0
+        self.source_fps: float | None = None
+        self.frames = 0
+
+    def stop(self) -> None:
+        self._halt.set()
+
+    def _fail(self, error: str) -> None:
+        self.failed = True
+        self._send("failed", {"source_id": self.source_id, "error": error})
+
+    def run(self) -> None:
+        spec = self._spec
+        try:
+            from ultralytics import YOLO
+            # one model per source: a YOLO object isn't safe to share between threads
+            model = YOLO(str(MODEL_DIR / spec["model_name"]))
+            cap = _open_capture(spec["source"])
+        except Exception as e:
+            self._fail(str(e))
+            return
+        is_file = Path(spec["source"]).is_file()
+        self.source_fps = spec.get("fps") or cap.get(cv2.CAP_PROP_FPS) or None
+        tracker = make_tracker(spec.get("tracker", DEFAULT_TRACKER), self.source_fps or _TRACKER_FPS)
+        # files are read at their frame rate, like a camera; cameras pace themselves
+        period = 1.0 / self.source_fps if is_file and self.source_fps else 0.0
+        next_frame = time.perf_counter()
+        prev = None
+        last_thumb = 0.0
+        try:
+            while not self._halt.is_set():
+                if period:
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        self._halt.wait(delay)
+                    # a worker that can't keep up drops behind instead of bursting
+                    next_frame = max(next_frame + period, time.perf_counter())
+                ok, frame = cap.read()
+                if not ok and is_file and spec.get("loop"):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ok, frame = cap.read()
+                if not ok:
+                    self._fail("end of stream")
+                    return
+                boxes = model.predict(frame, conf=spec["confidence"], **_PREDICT_ARGS)[0].boxes
+                dets = boxes.data[:, :5].cpu().numpy() if boxes is not None and len(boxes) else []
+                tracks = [
+                    [int(tid), int(x1), int(y1), int(x2), int(y2), round(conf, 3)]
+                    for x1, y1, x2, y2, tid, conf in tracker.update(dets, frame.shape).tolist()
+                ]
+
+                now = time.perf_counter()
+                if prev is not None and now > prev:
+                    self.fps = self.fps * 0.8 + 0.2 / (now - prev) if self.fps else 1.0 / (now - prev)
+                prev = now
+                self.frames += 1
+                payload = b""
+                if now - last_thumb >= _THUMB_INTERVAL:
+                    payload = _thumbnail(frame, tracks)
+                    last_thumb = now
+                self._send("result", {
+                    "source_id": self.source_id,
+                    "seq": self.frames,
+                    "timestamp": time.time(),
+                    "fps": round(self.fps, 2),
+                    "source_fps": self.source_fps,
+                    "people": len(tracks),
+                    "tracks": tracks,
+                }, payload)
+        finally:
+            cap.release()
+
+
+class Worker:
+    """Connection to the coordinator plus the runners of assigned sources."""
+
+    def __init__(self, host: str, port: int, name: str, capacity: int, token: str | None = None) -> None:
+        self._address = (host, port)
+        self._name = name
+        self._capacity = capacity
+        self._token = token
+        self._sock: socket.socket | None = None
+        self._send_lock = threading.Lock()
+        self._runners: dict[str, _SourceRunner] = {}
+
+    def _send(self, kind: str, data: dict, payload: bytes = b"") -> None:
+        sock = self._sock
+        if sock is None:
+            return
+        try:
+            with self._send_lock:
+                send_message(sock, kind, data, payload)
+        except OSError:
+            hang_up(sock)       # the reader notices and reconnects
+
+    def _heartbeat(self, sock: socket.socket, interval: float) -> None:
+        while self._sock is sock:
+            self._send("heartbeat", {
+                "load": round(os.getloadavg()[0], 2) if hasattr(os, "getloadavg") else None,
+                "sources": {
+                    sid: {"fps": round(r.fps, 2), "frames": r.frames}
+                    for sid, r in list(self._runners.items()) if not r.failed
+                },
+            })
+            time.sleep(interval)
+
+    def _stop_runners(self) -> None:
+        for runner in self._runners.values():
+            runner.stop()
+        self._runners.clear()
+
+    def serve(self, sock: socket.socket) -> None:
+        """Handle one coordinator connection until it drops."""
+        send_message(sock, "hello", {
+            "name": self._name,
+            "capacity": self._capacity,
+            "cores": os.cpu_count(),
+            "token": self._token,
+        })
+        welcome, _ = recv_message(sock)
+        if welcome.get("type") != "welcome":
+            raise ConnectionError(f"rejected: {welcome.get('message')}")
+        sock.settimeout(None)
+        self._sock = sock
+        print(f"[worker] {self._name} connected to {self._address[0]}:{self._address[1]}", flush=True)
+        threading.Thread(
+            target=self._heartbeat, args=(sock, welcome.get("heartbeat_interval", 1.0)),
+            name="heartbeat", daemon=True,
+        ).start()
+        try:
+            while True:
+                message, _ = recv_message(sock)
+                source_id = message.get("source_id")
+                runner = self._runners.get(source_id)
+                if runner is not None and runner.failed:
+                    # it stopped on its own and reported it; a re-assign starts afresh
+                    del self._runners[source_id]
+                if message["type"] == "assign" and source_id not in self._runners:
+                    print(f"[worker] running {source_id}: {message['spec']['source']}", flush=True)
+                    runner = _SourceRunner(source_id, message["spec"], self._send)
+                    self._runners[source_id] = runner
+                    runner.start()
+                elif message["type"] == "unassign" and source_id in self._runners:
+                    print(f"[worker] stopping {source_id}", flush=True)
+                    self._runners.pop(source_id).stop()
+        finally:
+            self._sock = None
+            self._stop_runners()
+
+    def run_forever(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                sock = socket.create_connection(self._address, timeout=10)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                backoff = 1.0
+                self.serve(sock)
+            except (OSError, ConnectionError, ValueError) as e:
+                print(f"[worker] {e}; reconnecting in {backoff:.0f} s", flush=True)
+            time.sleep(backoff)
+            backoff = min(_MAX_BACKOFF, backoff * 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Person detection worker for cluster mode")
+    parser.add_argument("--coordinator", required=True, help=f"host[:port] (default port {DEFAULT_PORT})")
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--capacity", type=int, default=1, help="sources to run at once")
+    parser.add_argument("--threads", type=int, help="PyTorch threads (default: all cores)")
+    parser.add_argument("--token", default=os.environ.get("DETECTOR_CLUSTER_TOKEN"),
+                        help="shared secret (default: $DETECTOR_CLUSTER_TOKEN)")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    host, port = parse_address(args.coordinator)
+    Worker(host, port, args.name, max(1, args.capacity), args.token).run_forever()
+
+
+if __name__ == "__main__":
+    main()
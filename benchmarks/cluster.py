@@ -0,0 +1,180 @@
+"""
+Cluster benchmark — local detection workers behind a coordinator.
+
+Writes a synthetic crowd clip, starts a coordinator and --workers worker
+processes on this machine (``python -m backend.worker``), adds --sources
+looping copies of the clip and measures per-source and total FPS.  With
+--kill, one busy worker is then killed and the time until every source
+delivers frames again from another worker is reported.
+
+Usage:
+    python -m benchmarks.cluster [--workers 2] [--capacity 2] [--sources 3]
+        [--threads 1] [--duration 20] [--resolution 1280x720] [--crowd 10]
+        [--source-fps 15] [--model yolov8n.pt] [--kill] [--output cluster.json]
+
+Keep workers x threads at or below the core count, or the workers just
+take CPU from each other.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from backend.cluster import Coordinator
+from benchmarks.pipeline import _environment, _sprite_model
+from benchmarks.sources import SyntheticCapture, person_sprites
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_clip(path: Path, width: int, height: int, crowd: int, fps: float, model_name: str,
+               seconds: float = 10.0) -> None:
+    sprites = person_sprites(_sprite_model(model_name))
+    capture = SyntheticCapture(width, height, crowd, sprites, frames=int(fps * seconds))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        writer.write(frame)
+    writer.release()
+
+
+def _wait(predicate, timeout: float) -> float | None:
+    """Seconds until predicate() held, or None on timeout."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if predicate():
+            return time.perf_counter() - t0
+        time.sleep(0.05)
+    return None
+
+
+def _all_fresh(coordinator: Coordinator, exclude: str | None = None) -> bool:
+    """Every source running and delivered a frame in the last half second."""
+    sources = coordinator.status()["sources"]
+    return bool(sources) and all(
+        s["state"] == "running" and s["worker"] != exclude and s["age"] is not None and s["age"] < 0.5
+        for s in sources
+    )
+
+
+def measure(coordinator: Coordinator, seconds: float) -> dict:
+    """Frames each source delivered over *seconds*."""
+    before = {s["source_id"]: s["seq"] for s in coordinator.status()["sources"]}
+    time.sleep(seconds)
+    status = coordinator.status()
+    per_source = {
+        s["name"]: {
+            "worker": s["worker"],
+            "fps": round(max(0, s["seq"] - before.get(s["source_id"], 0)) / seconds, 2),
+            "source_fps": s["source_fps"],
+        }
+        for s in status["sources"]
+    }
+    return {
+        "total_fps": round(sum(v["fps"] for v in per_source.values()), 2),
+        "sources": per_source,
+        "workers": {w["name"]: w["load"] for w in status["workers"]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--capacity", type=int, default=2, help="sources per worker")
+    parser.add_argument("--sources", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch threads per worker (0 = all cores)")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--crowd", type=int, default=10)
+    parser.add_argument("--source-fps", type=float, default=15.0)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--kill", action="store_true", help="kill a worker and time the recovery")
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    args = parser.parse_args()
+    if args.workers * args.capacity < args.sources:
+        parser.error("not enough capacity: workers x capacity < sources")
+    if args.kill and (args.workers - 1) * args.capacity < args.sources:
+        parser.error("--kill needs room for every source on the remaining workers")
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    procs: dict[str, subprocess.Popen] = {}
+    with tempfile.TemporaryDirectory(prefix="cluster_") as scratch:
+        clip = Path(scratch) / "crowd.avi"
+        print("[cluster] writing synthetic clip", file=sys.stderr, flush=True)
+        write_clip(clip, width, height, args.crowd, args.source_fps, args.model)
+
+        coordinator = Coordinator(Path(scratch) / "cluster.json", "127.0.0.1", 0)
+        coordinator.start()
+        try:
+            for i in range(args.workers):
+                name = f"local-{i}"
+                procs[name] = subprocess.Popen(
+                    [sys.executable, "-m", "backend.worker", "--coordinator", f"127.0.0.1:{coordinator.port}",
+                     "--name", name, "--capacity", str(args.capacity), "--threads", str(args.threads)],
+                    cwd=ROOT,
+                )
+            for i in range(args.sources):
+                coordinator.add_source({"source": str(clip), "name": f"clip-{i}", "loop": True,
+                                        "model_name": args.model})
+
+            def started() -> bool:
+                exited = [name for name, proc in procs.items() if proc.poll() is not None]
+                if exited:
+                    raise RuntimeError(f"worker {', '.join(exited)} exited")
+                return _all_fresh(coordinator)
+
+            startup = _wait(started, timeout=300)
+            if startup is None:
+                raise RuntimeError(f"sources did not start: {coordinator.status()['sources']}")
+            print(f"[cluster] all sources running after {startup:.1f} s; measuring", file=sys.stderr, flush=True)
+            steady = measure(coordinator, args.duration)
+
+            recovery = None
+            if args.kill:
+                victim = max(coordinator.status()["workers"], key=lambda w: len(w["sources"]))["name"]
+                print(f"[cluster] killing {victim}", file=sys.stderr, flush=True)
+                procs[victim].kill()
+                seconds = _wait(lambda: _all_fresh(coordinator, exclude=victim), timeout=300)
+                recovery = {
+                    "killed": victim,
+                    "seconds": round(seconds, 2) if seconds is not None else None,
+                    "after": measure(coordinator, args.duration) if seconds is not None else None,
+                }
+        finally:
+            coordinator.shutdown()
+            for proc in procs.values():
+                proc.kill()
+                proc.wait()
+
+    report = {
+        "environment": _environment(),
+        "config": {
+            "workers": args.workers,
+            "capacity": args.capacity,
+            "sources": args.sources,
+            "threads": args.threads,
+            "resolution": [width, height],
+            "crowd": args.crowd,
+            "source_fps": args.source_fps,
+            "model": args.model,
+        },
+        "startup_seconds": round(startup, 2),
+        "steady": steady,
+        "recovery": recovery,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
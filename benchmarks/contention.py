@@ -0,0 +1,206 @@
+"""
+Lock contention benchmark — how readers of engine state affect the loop.
+
+Runs DetectionEngine on a synthetic crowd and, phase by phase, adds reader
+threads that call the engine directly (no HTTP, so server overhead doesn't
+hide the locking): per reader one thread for each of --kinds (get_stats(),
+get_settings(), snapshot() and, when listed, get_metrics()), each polling
+every --interval seconds, plus --writers settings writers and --viewers
+MJPEG frame_generator() consumers.
+
+Each phase reports the detection loop's FPS and frame percentiles, how often
+and how long it waited for locks (the ``lock_wait`` stage), and per-call latency
+and throughput for every kind of reader, next to a baseline without
+readers.  Run it on two commits to compare locking schemes.
+
+Usage:
+    python -m benchmarks.contention [--readers 1,4,16] [--kinds stats,settings,snapshot]
+        [--writers 1] [--viewers 2] [--interval 0.001] [--duration 10]
+        [--resolution 1280x720] [--crowd 10] [--model yolov8n.pt]
+        [--tracker bytetrack] [--output contention.json]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from backend.detector import DetectionEngine
+from backend.trackers import DEFAULT_TRACKER, TRACKERS
+from benchmarks.pipeline import _csv, _environment, _percentiles, _sprite_model
+from benchmarks.sources import SyntheticCapture, person_sprites
+
+_KINDS = ("stats", "settings", "snapshot", "metrics")
+# metrics summarise every stage's samples: CPU-bound, so polling them as hard
+# as the others measures the GIL rather than locking (opt in with --kinds)
+_DEFAULT_KINDS = ("stats", "settings", "snapshot")
+
+
+class _Caller(threading.Thread):
+    """Calls one engine method every *interval* seconds, timing each call."""
+
+    def __init__(self, call, interval: float, stop: threading.Event) -> None:
+        super().__init__(daemon=True)
+        self._call = call
+        self._interval = interval
+        self._done = stop
+        self.latencies: list[float] = []
+
+    def run(self) -> None:
+        perf = time.perf_counter
+        calls = 0
+        while not self._done.is_set():
+            t0 = perf()
+            self._call(calls)
+            self.latencies.append(perf() - t0)
+            calls += 1
+            if self._interval:
+                self._done.wait(self._interval)
+
+
+class _Viewer(threading.Thread):
+    """Consumes the MJPEG generator in-process, like a connected stream client."""
+
+    def __init__(self, engine: DetectionEngine, stop: threading.Event) -> None:
+        super().__init__(daemon=True)
+        self._engine = engine
+        self._done = stop
+        self.frames = 0
+
+    def run(self) -> None:
+        frames = self._engine.frame_generator()
+        try:
+            for _ in frames:
+                self.frames += 1
+                if self._done.is_set():
+                    break
+        finally:
+            frames.close()
+
+
+def _readers(engine: DetectionEngine, base_conf: float) -> dict:
+    """Reader kind -> function of the call number."""
+    return {
+        "stats": lambda i: engine.get_stats(),
+        "settings": lambda i: engine.get_settings(),
+        "snapshot": lambda i: engine.snapshot(),
+        "metrics": lambda i: engine.get_metrics(),
+        "writer": lambda i: engine.update_settings({"confidence": round(base_conf + (0.01 if i % 2 else 0.0), 2)}),
+    }
+
+
+def _loop_stats(engine: DetectionEngine, seconds: float) -> dict:
+    engine.set_metrics({"reset": True})
+    time.sleep(seconds)
+    stages = engine.get_metrics()["stages"]
+    frame = stages.get("frame", {})
+    lock_wait = stages.get("lock_wait", {})
+    return {
+        "loop_fps": round(frame.get("count", 0) / seconds, 2),
+        "frame": frame,
+        "lock_wait": lock_wait,
+        # lock acquisitions by the detection thread per frame it finished
+        "locks_per_frame": round(lock_wait.get("count", 0) / max(1, frame.get("count", 0)), 2),
+    }
+
+
+def run_phase(engine: DetectionEngine, readers: int, kinds: list[str], writers: int, viewers: int,
+              interval: float, duration: float) -> dict:
+    stop = threading.Event()
+    base_conf = engine.get_settings()["confidence"]
+    calls = _readers(engine, base_conf)
+    callers = {kind: [_Caller(calls[kind], interval, stop) for _ in range(readers)] for kind in kinds}
+    callers["writer"] = [_Caller(calls["writer"], max(interval, 0.01), stop) for _ in range(writers)]
+    streams = [_Viewer(engine, stop) for _ in range(viewers)]
+    threads = [t for group in callers.values() for t in group] + streams
+    for t in threads:
+        t.start()
+    measured = _loop_stats(engine, duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=5)
+    engine.update_settings({"confidence": base_conf})
+
+    result = {"readers": readers, "writers": writers, "viewers": viewers, **measured, "calls": {}}
+    for kind, group in callers.items():
+        latencies = [x for c in group for x in c.latencies]
+        if latencies:
+            result["calls"][kind] = {"per_second": round(len(latencies) / duration, 1), **_percentiles(latencies)}
+    if streams:
+        result["viewer_fps"] = round(sum(v.frames for v in streams) / len(streams) / duration, 2)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", default="1,4,16", help="reader threads per kind, one phase each")
+    parser.add_argument("--kinds", default=",".join(_DEFAULT_KINDS), help=f"reader kinds ({', '.join(_KINDS)})")
+    parser.add_argument("--writers", type=int, default=1, help="settings writers (every 10 ms at most)")
+    parser.add_argument("--viewers", type=int, default=2, help="in-process MJPEG consumers")
+    parser.add_argument("--interval", type=float, default=0.001, help="seconds between a reader's calls (0 = busy)")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per phase")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--crowd", type=int, default=10)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--tracker", choices=TRACKERS, default=DEFAULT_TRACKER)
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    reader_steps = [int(v) for v in _csv(args.readers)]
+    kinds = _csv(args.kinds)
+    unknown = [k for k in kinds if k not in _KINDS]
+    if unknown:
+        parser.error(f"unknown reader kind(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="contention_") as scratch:
+        engine = DetectionEngine(data_dir=Path(scratch))
+        # full rate throughout: the phases without viewers must not drop to the watch rate
+        engine.update_settings({"model_name": args.model, "tracker": args.tracker, "watch_fps": 0})
+        sprites = person_sprites(_sprite_model(args.model))
+        result = engine.start(capture=SyntheticCapture(width, height, args.crowd, sprites))
+        if result.get("status") != "started":
+            raise RuntimeError(f"engine did not start: {result}")
+        engine.set_metrics({"enabled": True})
+
+        phases = []
+        try:
+            print("[contention] baseline without readers", file=sys.stderr, flush=True)
+            baseline = {"readers": 0, "writers": 0, "viewers": 0, **_loop_stats(engine, args.duration)}
+            for readers in reader_steps:
+                print(f"[contention] {readers} readers per kind, {args.writers} writers, {args.viewers} viewers",
+                      file=sys.stderr, flush=True)
+                phases.append(run_phase(engine, readers, kinds, args.writers, args.viewers, args.interval, args.duration))
+        finally:
+            engine.stop()
+            engine.set_metrics({"enabled": False})
+
+    idle_fps = baseline["loop_fps"] or 1e-9
+    for phase in phases:
+        phase["loop_fps_vs_idle"] = round(phase["loop_fps"] / idle_fps, 3)
+
+    report = {
+        "environment": _environment(),
+        "config": {
+            "resolution": [width, height],
+            "crowd": args.crowd,
+            "model": args.model,
+            "tracker": args.tracker,
+            "kinds": kinds,
+            "interval": args.interval,
+            "duration": args.duration,
+        },
+        "baseline": baseline,
+        "phases": phases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+HTTP load test — many clients against the real API, no camera needed.
+
+Starts the FastAPI app in-process on a free port around its own
+DetectionEngine fed by a synthetic crowd (in a thread, or with
+--engine process in its own process), then ramps up simulated clients:
+
+  * MJPEG viewers reading /api/stream (delivered FPS, time to first frame)
+  * stats pollers hitting /api/stats every --poll-interval seconds
+  * settings writers PUTting /api/settings every --write-interval seconds
+
+Each phase reports per-viewer FPS, request latency percentiles and the
+detection loop FPS measured inside the engine, next to an idle baseline
+with no clients, so the cost of serving clients is visible.
+
+Usage:
+    python -m benchmarks.loadtest [--viewers 0,1,5,20] [--pollers 2]
+        [--writers 1] [--duration 15] [--resolution 1280x720] [--crowd 10]
+        [--source-fps 30] [--model yolov8n.pt] [--engine thread|process]
+        [--output results.json]
+
+Note: every MJPEG viewer holds one worker thread of the server's sync
+threadpool (40 by default in Starlette/anyio) for as long as it is
+connected; viewers beyond that starve all other sync endpoints.
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import uvicorn
+
+from backend.app import create_app
+from backend.detector import DetectionEngine
+from backend.engine_process import EngineProcess
+from benchmarks.pipeline import _environment, _percentiles, _sprite_model
+from benchmarks.sources import SyntheticCapture, person_sprites
+
+_BOUNDARY = b"--frame\r\n"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Viewer(threading.Thread):
+    """Reads the MJPEG stream and counts delivered frames."""
+
+    def __init__(self, port: int, stop: threading.Event) -> None:
+        super().__init__(daemon=True)
+        self._port = port
+        self._done = stop
+        self.frames = 0
+        self.bytes = 0
+        self.first_frame: float | None = None
+        self.error: str | None = None
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection("127.0.0.1", self._port, timeout=10)
+        try:
+            conn.request("GET", "/api/stream")
+            resp = conn.getresponse()
+            tail = b""
+            while not self._done.is_set():
+                chunk = resp.read1(65536)
+                if not chunk:
+                    break
+                self.bytes += len(chunk)
+                data = tail + chunk
+                found = data.count(_BOUNDARY)
+                if found and self.first_frame is None:
+                    self.first_frame = time.perf_counter() - start
+                self.frames += found
+                tail = data[-(len(_BOUNDARY) - 1):]
+        except OSError as e:
+            if not self._done.is_set():
+                self.error = str(e)
+        finally:
+            conn.close()
+
+
+class _Requester(threading.Thread):
+    """Issues one request every *interval* seconds, recording latency."""
+
+    def __init__(self, port: int, stop: threading.Event, method: str, path: str,
+                 interval: float, body_fn=None) -> None:
+        super().__init__(daemon=True)
+        self._port = port
+        self._done = stop
+        self._method = method
+        self._path = path
+        self._interval = interval
+        self._body_fn = body_fn
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def run(self) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", self._port, timeout=10)
+        i = 0
+        while not self._done.is_set():
+            body, headers = None, {}
+            if self._body_fn is not None:
+                body = json.dumps(self._body_fn(i)).encode()
+                headers = {"Content-Type": "application/json"}
+            t0 = time.perf_counter()
+            try:
+                conn.request(self._method, self._path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status == 200:
+                    self.latencies.append(time.perf_counter() - t0)
+                else:
+                    self.errors += 1
+            except OSError:
+                self.errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self._port, timeout=10)
+            i += 1
+            self._done.wait(max(0.0, self._interval - (time.perf_counter() - t0)))
+        conn.close()
+
+
+def _loop_fps(engine: DetectionEngine | EngineProcess, seconds: float) -> dict:
+    """Detection loop FPS from the frames the engine finished in a window."""
+    engine.set_metrics({"reset": True})
+    time.sleep(seconds)
+    frame = engine.get_metrics()["stages"].get("frame", {})
+    return {
+        "loop_fps": round(frame.get("count", 0) / seconds, 2),
+        "frame": frame,
+    }
+
+
+def run_phase(engine: DetectionEngine | EngineProcess, port: int, viewers: int, pollers: int, writers: int,
+              duration: float, poll_interval: float, write_interval: float) -> dict:
+    stop = threading.Event()
+    base_conf = engine.get_settings()["confidence"]
+    clients = [_Viewer(port, stop) for _ in range(viewers)]
+    stats = [_Requester(port, stop, "GET", "/api/stats", poll_interval) for _ in range(pollers)]
+    settings = [
+        _Requester(port, stop, "PUT", "/api/settings", write_interval,
+                   lambda i: {"confidence": round(base_conf + (0.01 if i % 2 else 0.0), 2)})
+        for _ in range(writers)
+    ]
+    for t in clients + stats + settings:
+        t.start()
+    # let viewers connect before measuring the loop
+    time.sleep(min(2.0, duration / 4))
+    measured = _loop_fps(engine, duration)
+    stop.set()
+    for t in stats + settings:
+        t.join()
+    for v in clients:
+        v.join(timeout=5)
+    engine.update_settings({"confidence": base_conf})
+
+    elapsed = duration + min(2.0, duration / 4)
+    fps = [v.frames / elapsed for v in clients]
+    return {
+        "viewers": viewers,
+        "pollers": pollers,
+        "writers": writers,
+        **measured,
+        "viewer_fps": {
+            "min": round(min(fps), 2),
+            "mean": round(float(np.mean(fps)), 2),
+            "max": round(max(fps), 2),
+        } if fps else {},
+        "viewer_first_frame": _percentiles([v.first_frame for v in clients if v.first_frame is not None]),
+        "viewer_errors": [v.error for v in clients if v.error],
+        "viewer_mbps": round(sum(v.bytes for v in clients) * 8 / elapsed / 1e6, 2),
+        "stats_latency": _percentiles([x for r in stats for x in r.latencies]),
+        "stats_errors": sum(r.errors for r in stats),
+        "settings_latency": _percentiles([x for r in settings for x in r.latencies]),
+        "settings_errors": sum(r.errors for r in settings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--viewers", default="0,1,5,20", help="MJPEG viewer counts, one phase each")
+    parser.add_argument("--pollers", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--write-interval", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per phase")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--crowd", type=int, default=10)
+    parser.add_argument("--source-fps", type=float, default=30.0, help="0 = as fast as possible")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--engine", choices=("thread", "process"), default="thread",
+                        help="run detection in the server process or in its own (DETECTOR_ENGINE)")
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    viewer_steps = [int(v) for v in args.viewers.split(",") if v.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="loadtest_") as scratch:
+        if args.engine == "process":
+            engine = EngineProcess(data_dir=Path(scratch))
+        else:
+            engine = DetectionEngine(data_dir=Path(scratch))
+        port = _free_port()
+        config = uvicorn.Config(create_app(engine, serve_frontend=False), host="127.0.0.1",
+                                port=port, log_level="warning")
+        server = uvicorn.Server(config)
+        server_thread = threading.Thread(target=server.run, daemon=True)
+        server_thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        # full rate in every phase, including the one without viewers
+        engine.update_settings({"model_name": args.model, "watch_fps": 0})
+
+        sprites = person_sprites(_sprite_model(args.model))
+        capture = SyntheticCapture(width, height, args.crowd, sprites, fps=args.source_fps or None)
+        result = engine.start(capture=capture)
+        if result.get("status") != "started":
+            raise RuntimeError(f"engine did not start: {result}")
+        engine.set_metrics({"enabled": True})
+
+        phases = []
+        try:
+            print("[load] idle baseline", file=sys.stderr, flush=True)
+            baseline = {"viewers": 0, "pollers": 0, "writers": 0, **_loop_fps(engine, args.duration)}
+            for viewers in viewer_steps:
+                print(f"[load] {viewers} viewers, {args.pollers} pollers, {args.writers} writers",
+                      file=sys.stderr, flush=True)
+                phases.append(run_phase(engine, port, viewers, args.pollers, args.writers,
+                                        args.duration, args.poll_interval, args.write_interval))
+        finally:
+            engine.stop()
+            engine.set_metrics({"enabled": False})
+            server.should_exit = True
+            server_thread.join(timeout=10)
+
+    idle_fps = baseline["loop_fps"] or 1e-9
+    for phase in phases:
+        phase["loop_fps_vs_idle"] = round(phase["loop_fps"] / idle_fps, 3)
+
+    report = {
+        "environment": _environment(),
+        "config": {
+            "resolution": [width, height],
+            "crowd": args.crowd,
+            "source_fps": args.source_fps,
+            "model": args.model,
+            "engine": args.engine,
+            "duration": args.duration,
+            "poll_interval": args.poll_interval,
+            "write_interval": args.write_interval,
+        },
+        "idle": baseline,
+        "phases": phases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
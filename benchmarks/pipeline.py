@@ -0,0 +1,290 @@
+"""
+End-to-end detection pipeline benchmark — no camera needed.
+
+Drives DetectionEngine through its real detection loop (capture, inference
+and tracking, face recognition, drawing, JPEG encoding, publishing) from
+deterministic synthetic crowds and/or recorded clips.  It runs across a
+matrix of models, resolutions, crowd sizes and face recognition on/off, and
+reports per-stage latency percentiles, sustained FPS, CPU time and peak RSS
+as JSON.
+
+Usage:
+    python -m benchmarks.pipeline [--models yolov8n.pt,yolov8s.pt]
+        [--resolutions 640x360,1280x720] [--crowds 0,5,20] [--faces off,on]
+        [--clips a.mp4,b.mp4] [--frames 300] [--warmup 30]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.15]
+
+Synthetic crowds are people cropped from the ultralytics sample images,
+composited on a textured background.  Clips are decoded and resized up
+front, then looped.  Exits non-zero if any run regressed against
+--baseline by more than --threshold (relative).
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.detector import MODEL_DIR, DetectionEngine
+from benchmarks.sources import ClipCapture, SyntheticCapture, person_sprites
+
+try:
+    import psutil
+except ImportError:     # ultralytics depends on psutil, but stay usable without it
+    psutil = None
+
+# metric -> +1 if higher is better, -1 if lower is better
+_COMPARED = {
+    "sustained_fps": +1,
+    "frame_p50_ms": -1,
+    "frame_p99_ms": -1,
+    "cpu_ms_per_frame": -1,
+    "peak_rss_mb": -1,
+}
+
+
+class _Sampler(threading.Thread):
+    """Samples RSS (process + children) and the live people count."""
+
+    def __init__(self, engine: DetectionEngine, interval: float = 0.05) -> None:
+        super().__init__(daemon=True)
+        self._engine = engine
+        self._interval = interval
+        self._halt = threading.Event()
+        self.peak_rss = 0
+        self.people: list[int] = []
+
+    def run(self) -> None:
+        proc = psutil.Process() if psutil else None
+        while not self._halt.is_set():
+            if proc is not None:
+                try:
+                    rss = proc.memory_info().rss
+                    rss += sum(c.memory_info().rss for c in proc.children(recursive=True))
+                    self.peak_rss = max(self.peak_rss, rss)
+                except psutil.Error:
+                    pass
+            self.people.append(self._engine.get_stats()["people_count"])
+            self._halt.wait(self._interval)
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+
+def _cpu_seconds() -> float:
+    """User + system CPU of this process and its children (face workers)."""
+    if psutil is None:
+        return time.process_time()
+    proc = psutil.Process()
+    total = sum(proc.cpu_times()[:2])
+    for child in proc.children(recursive=True):
+        try:
+            total += sum(child.cpu_times()[:2])
+        except psutil.Error:
+            pass
+    return total
+
+
+def _peak_rss_fallback() -> int:
+    try:
+        import resource
+        # ru_maxrss is a lifetime peak: KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ms = np.asarray(values) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": len(values),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def case_key(case: dict) -> str:
+    crowd = f"crowd{case['crowd']}" if case["source"] == "synthetic" else Path(case["source"]).name
+    faces = "faces-on" if case["faces"] else "faces-off"
+    return f"{case['model']}|{case['width']}x{case['height']}|{crowd}|{faces}"
+
+
+def run_case(engine: DetectionEngine, case: dict, sprites: list, frames: int, warmup: int) -> dict:
+    # watch_fps 0: nobody views the stream here, the loop must still run flat out
+    engine.update_settings({"model_name": case["model"], "face_recognition_enabled": case["faces"], "watch_fps": 0})
+    total = frames + warmup
+    if case["source"] == "synthetic":
+        capture = SyntheticCapture(case["width"], case["height"], case["crowd"], sprites, frames=total)
+    else:
+        capture = ClipCapture(Path(case["source"]), case["width"], case["height"], frames=total)
+
+    timings = engine.timings
+    timings.reset()
+    timings.enabled = True
+    sampler = _Sampler(engine)
+    cpu_start = _cpu_seconds()
+    t_start = time.perf_counter()
+    sampler.start()
+    result = engine.start(capture=capture)
+    if result.get("status") != "started":
+        sampler.stop()
+        raise RuntimeError(f"engine did not start: {result}")
+    engine.wait_until_stopped()
+    wall = time.perf_counter() - t_start
+    sampler.stop()
+    cpu = _cpu_seconds() - cpu_start
+    engine.stop()
+    timings.enabled = False
+
+    frame_samples = timings.samples("frame")
+    processed = len(frame_samples)
+    measured = max(0, processed - warmup)
+    warmup_time = sum(frame_samples[:warmup])
+    steady_wall = max(1e-9, wall - warmup_time)
+    stages = {}
+    for stage in ("capture", "inference", "tracking", "extract", "analytics", "faces", "draw", "encode", "publish", "frame"):
+        samples = timings.samples(stage)[warmup:]
+        if samples:
+            stages[stage] = _percentiles(samples)
+
+    peak_rss = sampler.peak_rss or _peak_rss_fallback()
+    people = sampler.people[len(sampler.people) // 10:] or [0]
+    return {
+        "key": case_key(case),
+        **case,
+        "frames": measured,
+        "warmup_frames": min(warmup, processed),
+        "wall_seconds": round(wall, 3),
+        "sustained_fps": round(measured / steady_wall, 2),
+        "frame_p50_ms": stages.get("frame", {}).get("p50_ms", 0.0),
+        "frame_p99_ms": stages.get("frame", {}).get("p99_ms", 0.0),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_ms_per_frame": round(cpu * 1000 / max(1, processed), 3),
+        "peak_rss_mb": round(peak_rss / 1024 ** 2, 1),
+        "people_avg": round(float(np.mean(people)), 2),
+        "stages": stages,
+    }
+
+
+def compare(runs: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    """Metrics that got worse than the baseline run with the same key by > threshold."""
+    previous = {r["key"]: r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in runs:
+        base = previous.get(run["key"])
+        if base is None:
+            continue
+        for metric, direction in _COMPARED.items():
+            old, new = base.get(metric), run.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if -direction * change > threshold:
+                regressions.append({
+                    "key": run["key"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 3),
+                })
+    return regressions
+
+
+def _environment() -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": psutil.cpu_count() if psutil else None,
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.time(),
+    }
+    try:
+        import torch
+        import ultralytics
+        env.update(torch=torch.__version__, ultralytics=ultralytics.__version__,
+                   cuda=torch.cuda.is_available())
+    except ImportError:
+        pass
+    return env
+
+
+def _sprite_model(model_name: str):
+    """A YOLO model for cutting person sprites (separate from the engine's)."""
+    from ultralytics import YOLO
+    return YOLO(str(MODEL_DIR / model_name))
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def build_cases(args) -> list[dict]:
+    resolutions = [tuple(int(v) for v in r.lower().split("x")) for r in _csv(args.resolutions)]
+    faces = [f.lower() in ("on", "true", "1") for f in _csv(args.faces)]
+    sources = []
+    if not args.no_synthetic:
+        sources += [("synthetic", int(c)) for c in _csv(args.crowds)]
+    sources += [(clip, None) for clip in _csv(args.clips)]
+    return [
+        {"source": source, "crowd": crowd, "model": model, "width": w, "height": h, "faces": face}
+        for model in _csv(args.models)
+        for w, h in resolutions
+        for source, crowd in sources
+        for face in faces
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", default="yolov8n.pt")
+    parser.add_argument("--resolutions", default="640x360,1280x720")
+    parser.add_argument("--crowds", default="0,5,20", help="synthetic people per frame")
+    parser.add_argument("--faces", default="off,on")
+    parser.add_argument("--clips", default="", help="comma-separated recorded clips to replay")
+    parser.add_argument("--no-synthetic", action="store_true")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per run")
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    parser.add_argument("--baseline", type=Path, help="earlier --output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    cases = build_cases(args)
+    with tempfile.TemporaryDirectory(prefix="bench_") as scratch:
+        engine = DetectionEngine(data_dir=Path(scratch))
+        sprites = person_sprites(_sprite_model(_csv(args.models)[0]))
+        runs = []
+        for i, case in enumerate(cases, 1):
+            print(f"[bench] {i}/{len(cases)} {case_key(case)}", file=sys.stderr, flush=True)
+            runs.append(run_case(engine, case, sprites, args.frames, args.warmup))
+
+    report = {"environment": _environment(), "runs": runs}
+    if args.baseline:
+        report["baseline"] = str(args.baseline)
+        report["threshold"] = args.threshold
+        report["regressions"] = compare(runs, json.loads(args.baseline.read_text()), args.threshold)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Soak test for per-track bookkeeping — no camera or model needed.
+
+Replays hours of synthetic tracker output (people arriving, lingering and
+leaving, with fresh tracking IDs all the time) through the same
+TrackCache / UniqueCounter calls the detection loop makes, and samples
+traced memory along the way.
+
+Usage:
+    python -m benchmarks.soak_tracks [--hours 4] [--fps 15] [--arrivals 1.0]
+
+Exits non-zero if memory after warm-up grows by more than --tolerance bytes.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+
+from backend.track_cache import TrackCache, UniqueCounter
+
+
+def run(hours: float, fps: float, arrivals_per_sec: float, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    tracks = TrackCache()
+    unique = UniqueCounter()
+
+    total_frames = int(hours * 3600 * fps)
+    sample_every = max(1, total_frames // 24)
+    next_id = 1
+    active: dict[int, int] = {}   # track ID -> frame index it leaves at
+    samples: list[dict] = []
+
+    tracemalloc.start()
+    for frame_idx in range(total_frames):
+        now = frame_idx / fps
+
+        # arrivals (Poisson) and departures
+        arrivals = 0
+        p = arrivals_per_sec / fps
+        while rng.random() < p and arrivals < 10:
+            arrivals += 1
+        for _ in range(arrivals):
+            active[next_id] = frame_idx + int(rng.uniform(3, 90) * fps)
+            next_id += 1
+        for tid in [t for t, leave in active.items() if leave <= frame_idx]:
+            del active[tid]
+
+        seen = set(active)
+        for tid in seen:
+            state = tracks.touch(tid, now)
+            if state.name is None and rng.random() < 0.01:
+                tracks.set_name(tid, f"person-{tid % 50}")
+        tracks.expire(now)
+        unique.update(seen)
+        len(unique)
+
+        if frame_idx % sample_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append({
+                "hours": round(now / 3600, 2),
+                "traced_bytes": current,
+                "tracks_cached": len(tracks),
+                "unique_estimate": len(unique),
+                "unique_actual": next_id - 1,
+            })
+    tracemalloc.stop()
+
+    return {"frames": total_frames, "samples": samples}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--arrivals", type=float, default=1.0, help="new people per second")
+    parser.add_argument("--tolerance", type=int, default=64 * 1024, help="allowed growth in bytes")
+    args = parser.parse_args()
+
+    report = run(args.hours, args.fps, args.arrivals)
+    samples = report["samples"]
+    # ignore the first third while caches fill up and the unique counter
+    # switches from its exact set to the HyperLogLog sketch
+    steady = [s["traced_bytes"] for s in samples[len(samples) // 3:]]
+    growth = max(steady) - min(steady)
+    report["steady_state_growth_bytes"] = growth
+    report["passed"] = growth <= args.tolerance
+
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Camera-free frame sources for benchmarks and load tests.
+
+Both classes mimic the parts of cv2.VideoCapture that DetectionEngine uses
+(read, release, isOpened, get, set), so they can be passed to
+``DetectionEngine.start(capture=...)``.
+"""
+
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+def person_sprites(model=None, max_sprites: int = 8) -> list[np.ndarray]:
+    """Crop real people out of the sample images shipped with ultralytics.
+
+    With a *model* the crops come from its own detections; without one (or
+    if the assets are missing) simple drawn silhouettes are returned, which
+    the model will mostly not detect.
+    """
+    sprites: list[np.ndarray] = []
+    if model is not None:
+        try:
+            from ultralytics.utils import ASSETS
+
+            for image_path in sorted(Path(ASSETS).glob("*.jpg")):
+                image = cv2.imread(str(image_path))
+                if image is None:
+                    continue
+                boxes = model.predict(image, conf=0.5, classes=[0], verbose=False)[0].boxes
+                for x1, y1, x2, y2 in boxes.xyxy.cpu().numpy().astype(int).tolist():
+                    if x2 - x1 >= 24 and y2 - y1 >= 48:
+                        sprites.append(image[y1:y2, x1:x2].copy())
+        except Exception as e:
+            print(f"[bench] could not extract person sprites: {e}", flush=True)
+    if not sprites:
+        for shade in (60, 120, 180):
+            s = np.full((160, 64, 3), 255, np.uint8)
+            cv2.circle(s, (32, 20), 16, (shade, shade, shade), -1)
+            cv2.rectangle(s, (14, 40), (50, 110), (shade, 80, 40), -1)
+            cv2.rectangle(s, (16, 110), (30, 158), (40, 40, shade), -1)
+            cv2.rectangle(s, (34, 110), (48, 158), (40, 40, shade), -1)
+            sprites.append(s)
+    return sprites[:max_sprites]
+
+
+class SyntheticCapture:
+    """Deterministic moving crowd composited on a textured background.
+
+    *people* sprites (scaled to about a third of the frame height) bounce
+    around the frame at fixed seeded velocities.  ``fps=None`` produces
+    frames as fast as they are read; otherwise read() paces itself like a
+    camera.  After *frames* frames read() returns (False, None).
+    ``boxes`` holds the ground truth of the last frame read.
+    """
+
+    def __init__(self, width: int, height: int, people: int, sprites: list[np.ndarray],
+                 frames: int | None = None, fps: float | None = None, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        self._w, self._h = width, height
+        self._frames = frames
+        self._fps = fps
+        self._index = 0
+        self._opened = True
+        self._next_time = 0.0
+
+        # static background: gradient + noise, so encoding cost is realistic
+        gx = np.linspace(40, 200, width, dtype=np.float32)[None, :]
+        gy = np.linspace(30, 120, height, dtype=np.float32)[:, None]
+        base = (gx + gy)[:, :, None] * np.array([0.6, 0.8, 1.0], np.float32)
+        noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+        self._background = np.clip(base + noise, 0, 255).astype(np.uint8)
+
+        target_h = max(48, height // 3)
+        self._sprites = []
+        for i in range(people):
+            s = sprites[i % len(sprites)]
+            scale = target_h * rng.uniform(0.7, 1.1) / s.shape[0]
+            sw, sh = max(8, int(s.shape[1] * scale)), max(16, int(s.shape[0] * scale))
+            self._sprites.append(cv2.resize(s, (min(sw, width - 1), min(sh, height - 1))))
+        self._pos = np.column_stack([
+            rng.uniform(0, width - 64, people),
+            rng.uniform(0, max(1, height - target_h), people),
+        ]) if people else np.empty((0, 2))
+        self._vel = rng.uniform(-6, 6, (people, 2)) if people else np.empty((0, 2))
+        # (N, 5) person index, x1, y1, x2, y2 in drawing order (later ones on top)
+        self.boxes = np.empty((0, 5))
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._w)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._h)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self._fps or 30.0)
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        return False
+
+    def release(self) -> None:
+        self._opened = False
+
+    def read(self):
+        if not self._opened or (self._frames is not None and self._index >= self._frames):
+            return False, None
+        if self._fps:
+            now = time.perf_counter()
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + 1.0 / self._fps
+        frame = self._background.copy()
+        boxes = []
+        for i, sprite in enumerate(self._sprites):
+            sh, sw = sprite.shape[:2]
+            x, y = self._pos[i]
+            # bounce off the edges
+            if not 0 <= x + self._vel[i, 0] <= self._w - sw:
+                self._vel[i, 0] *= -1
+            if not 0 <= y + self._vel[i, 1] <= self._h - sh:
+                self._vel[i, 1] *= -1
+            self._pos[i] += self._vel[i]
+            xi = int(np.clip(self._pos[i, 0], 0, self._w - sw))
+            yi = int(np.clip(self._pos[i, 1], 0, self._h - sh))
+            frame[yi:yi + sh, xi:xi + sw] = sprite
+            boxes.append((i, xi, yi, xi + sw, yi + sh))
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+        self._index += 1
+        return True, frame
+
+
+class ClipCapture:
+    """Replays a recorded clip, resized to a target resolution and looped.
+
+    Frames are decoded once up front (up to *frames*), so decoding cost does
+    not show up as capture latency and every run sees identical input.
+    """
+
+    def __init__(self, path: Path, width: int, height: int, frames: int,
+                 fps: float | None = None) -> None:
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise ValueError(f"cannot open clip {path}")
+        self._clip_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        decoded = []
+        while len(decoded) < frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            decoded.append(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+        cap.release()
+        if not decoded:
+            raise ValueError(f"clip {path} has no frames")
+        self._decoded = decoded
+        self._w, self._h = width, height
+        self._frames = frames
+        self._fps = fps
+        self._index = 0
+        self._opened = True
+        self._next_time = 0.0
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._w)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._h)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self._fps or self._clip_fps)
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        return False
+
+    def release(self) -> None:
+        self._opened = False
+
+    def read(self):
+        if not self._opened or self._index >= self._frames:
+            return False, None
+        if self._fps:
+            now = time.perf_counter()
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + 1.0 / self._fps
+        frame = self._decoded[self._index % len(self._decoded)].copy()
+        self._index += 1
+        return True, frame
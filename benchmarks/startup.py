@@ -0,0 +1,139 @@
+"""
+Cold start benchmark — how fast the server listens and becomes ready.
+
+Launches the server in a fresh process several times and polls
+/api/health, recording:
+
+  * import_seconds: ``import backend.app`` alone (separate process)
+  * listen_seconds: process start until the first HTTP response
+  * ready_seconds:  process start until /api/health reports ready
+  * the warm-up stage durations reported by the server (import, model,
+    inference, face_recognition)
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--timeout 180] [--output startup.json]
+    python -m benchmarks.startup --exe dist/PersonDetector/PersonDetector.exe
+
+With --exe the built executable is measured instead (it always listens on
+port 8000 and opens a browser).  OS file caches make every run after the
+first one warmer than a true first launch after boot.
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.loadtest import _free_port
+from benchmarks.pipeline import _environment
+
+ROOT = Path(__file__).resolve().parent.parent
+_EXE_PORT = 8000
+
+
+def _health(port: int) -> dict | None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        conn.request("GET", "/api/health")
+        return json.loads(conn.getresponse().read())
+    except (OSError, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import backend.app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def run_once(command: list[str], port: int, timeout: float) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    listen = ready = None
+    health = None
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited: {proc.stderr.read().decode(errors='replace')[-2000:]}")
+            health = _health(port)
+            now = time.perf_counter() - t0
+            if health is not None:
+                if listen is None:
+                    listen = now
+                if health.get("ready") or health.get("status") == "error":
+                    ready = now if health.get("ready") else None
+                    break
+            time.sleep(0.02)
+        # face recognition warms up after readiness; wait briefly for its timing
+        deadline = time.perf_counter() + 10
+        while health and health.get("ready") and "face_recognition" not in health["stages"] \
+                and time.perf_counter() < deadline:
+            time.sleep(0.2)
+            health = _health(port) or health
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {
+        "listen_seconds": round(listen, 3) if listen is not None else None,
+        "ready_seconds": round(ready, 3) if ready is not None else None,
+        "error": health.get("error") if health else "never answered",
+        "stages": health.get("stages", {}) if health else {},
+    }
+
+
+def _median(runs: list[dict], key: str) -> float | None:
+    values = [r[key] for r in runs if r.get(key) is not None]
+    return round(float(np.median(values)), 3) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=180.0, help="seconds to wait for readiness")
+    parser.add_argument("--exe", type=Path, help="measure a built executable instead")
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        if args.exe:
+            port = _EXE_PORT
+            command = [str(args.exe.resolve())]
+        else:
+            port = _free_port()
+            command = [sys.executable, "-m", "uvicorn", "backend.app:app",
+                       "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+        print(f"[startup] run {i + 1}/{args.runs}", file=sys.stderr, flush=True)
+        runs.append(run_once(command, port, args.timeout))
+
+    stage_names = sorted({name for r in runs for name in r["stages"]})
+    report = {
+        "environment": _environment(),
+        "command": "exe" if args.exe else "uvicorn backend.app:app",
+        "import_seconds": None if args.exe else round(import_seconds(), 3),
+        "listen_seconds": _median(runs, "listen_seconds"),
+        "ready_seconds": _median(runs, "ready_seconds"),
+        "stages": {
+            name: round(float(np.median([r["stages"][name] for r in runs if name in r["stages"]])), 3)
+            for name in stage_names
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
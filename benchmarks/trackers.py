@@ -0,0 +1,222 @@
+"""
+Tracker benchmark — ID switches and per-frame cost of each tracker.
+
+Every clip's detections are produced once and then replayed through each
+tracker in backend/trackers.py, so all trackers see identical input and the
+timings cover tracking alone.
+
+Synthetic crowd clips (--crowd people, --seeds clips) come with ground
+truth: tracker output is matched to the true boxes every frame, and a
+person whose matched track ID changes counts as an ID switch.  Detections
+come from --model on the rendered frames, or with --no-model from the true
+boxes plus detector-like noise (jitter, misses, people hidden behind
+others, false positives), which needs neither torch nor ultralytics.
+
+Recorded --clip files have no ground truth; for them only the number of
+track IDs and their mean length (fewer, longer tracks = fewer breaks) are
+reported next to the cost.
+
+Usage:
+    python -m benchmarks.trackers [--trackers bytetrack,sort] [--frames 600]
+        [--crowd 8] [--seeds 3] [--resolution 1280x720] [--model yolov8n.pt]
+        [--no-model] [--miss-rate 0.05] [--clip video.mp4 ...] [--output trackers.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.trackers import TRACKERS, _greedy_match, iou_matrix, make_tracker
+from benchmarks.pipeline import _csv, _environment, _percentiles, _sprite_model
+from benchmarks.sources import ClipCapture, SyntheticCapture, person_sprites
+
+_MATCH_IOU = 0.5
+_FPS = 30.0
+
+
+def _visible(boxes: np.ndarray) -> np.ndarray:
+    """Share of each (N, 4) box not covered by the boxes drawn after it."""
+    visible = np.ones(len(boxes))
+    for i in range(len(boxes) - 1):
+        a, later = boxes[i], boxes[i + 1:]
+        w = np.clip(np.minimum(a[2], later[:, 2]) - np.maximum(a[0], later[:, 0]), 0, None)
+        h = np.clip(np.minimum(a[3], later[:, 3]) - np.maximum(a[1], later[:, 1]), 0, None)
+        area = (a[2] - a[0]) * (a[3] - a[1])
+        visible[i] = max(0.0, 1.0 - (w * h).sum() / max(area, 1.0))
+    return visible
+
+
+def _noisy_detections(truth: np.ndarray, size: tuple[int, int], rng: np.random.Generator,
+                      miss_rate: float, jitter: float, false_rate: float) -> np.ndarray:
+    """Detector-like (N, 5) output for one frame's true boxes."""
+    boxes = truth[:, 1:5]
+    keep = (_visible(boxes) >= 0.5) & (rng.random(len(boxes)) >= miss_rate)
+    boxes = boxes[keep]
+    heights = (boxes[:, 3] - boxes[:, 1])[:, None]
+    boxes = boxes + rng.normal(0.0, jitter, boxes.shape) * heights
+    conf = rng.uniform(0.4, 0.95, len(boxes))
+    dets = [np.column_stack([boxes, conf])]
+    n_false = rng.poisson(false_rate)
+    if n_false:
+        w, h = size
+        xy = rng.uniform(0, 1, (n_false, 2)) * [w * 0.9, h * 0.7]
+        wh = rng.uniform(0.05, 0.1, (n_false, 2)) * [w, h * 3]
+        dets.append(np.column_stack([xy, xy + wh, rng.uniform(0.45, 0.6, n_false)]))
+    return np.concatenate(dets).astype(np.float32)
+
+
+def _model_detections(model, frame, conf: float) -> np.ndarray:
+    boxes = model.predict(frame, conf=conf, classes=[0], verbose=False)[0].boxes
+    if boxes is None or not len(boxes):
+        return np.empty((0, 5), dtype=np.float32)
+    return boxes.data[:, :5].cpu().numpy().astype(np.float32)
+
+
+def synthetic_clip(args, seed: int, model) -> dict:
+    """Detections and ground truth of one synthetic crowd clip."""
+    width, height = args.size
+    sprites = person_sprites(model)
+    capture = SyntheticCapture(width, height, args.crowd, sprites, frames=args.frames, seed=seed)
+    rng = np.random.default_rng(seed)
+    dets, truth = [], []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        truth.append(capture.boxes.copy())
+        if model is not None:
+            dets.append(_model_detections(model, frame, args.conf))
+        else:
+            dets.append(_noisy_detections(capture.boxes, (width, height), rng,
+                                          args.miss_rate, args.jitter, args.false_rate))
+    return {"name": f"synthetic-{seed}", "shape": (height, width), "dets": dets, "truth": truth}
+
+
+def recorded_clip(path: Path, args, model) -> dict:
+    width, height = args.size
+    capture = ClipCapture(path, width, height, args.frames)
+    dets = []
+    for _ in range(args.frames):
+        ok, frame = capture.read()
+        if not ok:
+            break
+        dets.append(_model_detections(model, frame, args.conf))
+    return {"name": path.name, "shape": (height, width), "dets": dets, "truth": None}
+
+
+def replay(clip: dict, name: str) -> tuple[list[np.ndarray], list[float]]:
+    """Run one tracker over a clip's detections: per-frame tracks and seconds."""
+    tracker = make_tracker(name, _FPS)
+    out, seconds = [], []
+    perf = time.perf_counter
+    for dets in clip["dets"]:
+        t0 = perf()
+        tracks = tracker.update(dets, clip["shape"])
+        seconds.append(perf() - t0)
+        out.append(tracks)
+    return out, seconds
+
+
+def score(tracks: list[np.ndarray], truth: list[np.ndarray] | None) -> dict:
+    """ID switches and coverage against the ground truth, plus track counts."""
+    ids, inv = np.unique(np.concatenate([t[:, 4] for t in tracks]) if tracks else np.empty(0),
+                         return_inverse=True)
+    lengths = np.bincount(inv) if len(ids) else np.zeros(0)
+    result = {
+        "track_ids": int(len(ids)),
+        "mean_track_frames": round(float(lengths.mean()), 1) if len(lengths) else 0.0,
+    }
+    if truth is None:
+        return result
+    last: dict[int, int] = {}       # person -> track ID it was last matched to
+    switches = matched = total = 0
+    for people, frame_tracks in zip(truth, tracks):
+        total += len(people)
+        if not len(people) or not len(frame_tracks):
+            continue
+        rows, cols = _greedy_match(iou_matrix(people[:, 1:5], frame_tracks[:, :4]), _MATCH_IOU)
+        matched += len(rows)
+        for person, track_id in zip(people[rows, 0].astype(int).tolist(), frame_tracks[cols, 4].astype(int).tolist()):
+            if last.get(person, track_id) != track_id:
+                switches += 1
+            last[person] = track_id
+    people_seen = len({int(p) for frame in truth for p in frame[:, 0]})
+    result.update({
+        "id_switches": switches,
+        "ids_per_person": round(len(ids) / max(1, people_seen), 2),
+        "coverage": round(matched / max(1, total), 3),
+    })
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trackers", default=",".join(TRACKERS))
+    parser.add_argument("--frames", type=int, default=600, help="frames per clip")
+    parser.add_argument("--crowd", type=int, default=8, help="people per synthetic clip")
+    parser.add_argument("--seeds", type=int, default=3, help="synthetic clips")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--conf", type=float, default=0.45)
+    parser.add_argument("--no-model", action="store_true", help="simulate detections from the ground truth")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="--no-model: share of missed people")
+    parser.add_argument("--jitter", type=float, default=0.02, help="--no-model: box noise, share of box height")
+    parser.add_argument("--false-rate", type=float, default=0.2, help="--no-model: false positives per frame")
+    parser.add_argument("--clip", type=Path, action="append", default=[], help="recorded clip (repeatable)")
+    parser.add_argument("--output", type=Path, help="write JSON here as well as stdout")
+    args = parser.parse_args()
+    args.size = tuple(int(v) for v in args.resolution.lower().split("x"))
+    names = _csv(args.trackers)
+    unknown = [n for n in names if n not in TRACKERS]
+    if unknown:
+        parser.error(f"unknown tracker(s): {', '.join(unknown)}")
+    if args.no_model and args.clip:
+        parser.error("--clip needs the model")
+
+    model = None if args.no_model else _sprite_model(args.model)
+    clips = []
+    for seed in range(args.seeds):
+        print(f"[trackers] synthetic clip {seed}", file=sys.stderr, flush=True)
+        clips.append(synthetic_clip(args, seed, model))
+    for path in args.clip:
+        print(f"[trackers] {path.name}", file=sys.stderr, flush=True)
+        clips.append(recorded_clip(path, args, model))
+
+    results = {}
+    for name in names:
+        per_clip, seconds = {}, []
+        for clip in clips:
+            tracks, clip_seconds = replay(clip, name)
+            per_clip[clip["name"]] = score(tracks, clip["truth"])
+            seconds.extend(clip_seconds)
+        with_truth = [r for r in per_clip.values() if "id_switches" in r]
+        results[name] = {
+            "update": _percentiles(seconds),
+            "id_switches": sum(r["id_switches"] for r in with_truth) if with_truth else None,
+            "clips": per_clip,
+        }
+
+    report = {
+        "environment": _environment(),
+        "config": {
+            "frames": args.frames,
+            "crowd": args.crowd,
+            "seeds": args.seeds,
+            "resolution": list(args.size),
+            "detections": "simulated" if args.no_model else args.model,
+            "clips": [str(p) for p in args.clip],
+        },
+        "trackers": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,7 @@ def main() -> None:
         "--hidden-import", "backend",
         "--hidden-import", "backend.app",
         "--hidden-import", "backend.detector",
+        "--hidden-import", "backend.engine_state",
         "--hidden-import", "backend.routes",
         "--hidden-import", "backend.routes.stream",
         "--hidden-import", "backend.routes.controls",
@@ -94,7 +95,36 @@ def main() -> None:
         "--hidden-import", "backend.routes.stats",
         "--hidden-import", "backend.routes.screenshots",
         "--hidden-import", "backend.routes.faces",
+        "--hidden-import", "backend.routes.recording",
+        "--hidden-import", "backend.routes.history",
+        "--hidden-import", "backend.history",
+        "--hidden-import", "backend.routes.analytics",
+        "--hidden-import", "backend.analytics",
+        "--hidden-import", "backend.events",
+        "--hidden-import", "backend.routes.analysis",
+        "--hidden-import", "backend.offline",
+        "--hidden-import", "backend.detection_cache",
+        "--hidden-import", "backend.routes.metrics",
+        "--hidden-import", "backend.timing",
+        "--hidden-import", "backend.routes.profile",
+        "--hidden-import", "backend.routes.health",
+        "--hidden-import", "backend.profiler",
+        "--hidden-import", "backend.model_cache",
+        "--hidden-import", "backend.routes.resources",
+        "--hidden-import", "backend.resources",
+        "--hidden-import", "backend.engine_process",
+        "--hidden-import", "backend.frame_bus",
+        "--hidden-import", "backend.snapshots",
+        "--hidden-import", "backend.cluster",
+        "--hidden-import", "backend.routes.cluster",
+        "--hidden-import", "backend.recorder",
         "--hidden-import", "backend.face_db",
+        "--hidden-import", "backend.track_cache",
+        "--hidden-import", "backend.trackers",
+        "--hidden-import", "backend.reid",
+        "--hidden-import", "backend.jobs",
+        "--hidden-import", "backend.screenshot_store",
+        "--hidden-import", "backend.frame_ring",
         "--hidden-import", "concurrent.futures",
         "--hidden-import", "concurrent.futures.process",
         "--hidden-import", "multiprocessing",
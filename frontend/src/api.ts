@@ -1,4 +1,4 @@
-import type { Stats, Settings, Screenshot, FacePerson } from "./types";
+import type { Stats, Settings, ScreenshotPage, FacePerson } from "./types";
 
 const BASE = "/api";
 
@@ -42,7 +42,13 @@ export const updateSettings = (data: Partial<Settings>) =>
 
 // Screenshots
 export const takeScreenshot = () => json<{ status: string; filename?: string }>(fetch(`${BASE}/screenshot`, { method: "POST" }));
-export const fetchScreenshots = () => json<Screenshot[]>(fetch(`${BASE}/screenshots`));
+export const fetchScreenshots = (cursor?: string | null, limit = 60) => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set("cursor", cursor);
+  return json<ScreenshotPage>(fetch(`${BASE}/screenshots?${params}`));
+};
+export const screenshotUrl = (name: string) => `${BASE}/screenshots/${encodeURIComponent(name)}`;
+export const thumbnailUrl = (name: string) => `${BASE}/screenshots/${encodeURIComponent(name)}/thumb`;
 export const deleteScreenshot = (name: string) =>
   json<{ status: string }>(fetch(`${BASE}/screenshots/${encodeURIComponent(name)}`, { method: "DELETE" }));
 
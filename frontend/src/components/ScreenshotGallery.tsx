@@ -1,6 +1,6 @@
 import { useEffect, useState, useCallback } from "react";
 import type { Screenshot } from "../types";
-import { fetchScreenshots, deleteScreenshot } from "../api";
+import { fetchScreenshots, deleteScreenshot, screenshotUrl, thumbnailUrl } from "../api";
 import { useToast } from "./ui/useToast";
 import Modal from "./ui/Modal";
 import Skeleton from "./ui/Skeleton";
@@ -13,14 +13,18 @@ interface Props {
 export default function ScreenshotGallery({ screenshotCount }: Props) {
   const toast = useToast();
   const [shots, setShots] = useState<Screenshot[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [lightbox, setLightbox] = useState<number | null>(null);
   const [deleting, setDeleting] = useState<string | null>(null);
 
   const load = useCallback(async () => {
     try {
       setLoading(true);
-      setShots(await fetchScreenshots());
+      const page = await fetchScreenshots();
+      setShots(page.items);
+      setNextCursor(page.next_cursor);
     } catch {
       // ignore
     } finally {
@@ -28,6 +32,20 @@ export default function ScreenshotGallery({ screenshotCount }: Props) {
     }
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchScreenshots(nextCursor);
+      setShots((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch {
+      // ignore
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     load();
   }, [load, screenshotCount]);
@@ -87,7 +105,7 @@ export default function ScreenshotGallery({ screenshotCount }: Props) {
               onClick={() => setLightbox(i)}
             >
               <img
-                src={`/api/screenshots/${s.name}`}
+                src={thumbnailUrl(s.name)}
                 alt={s.name}
                 className="aspect-video object-cover w-full"
                 loading="lazy"
@@ -102,6 +120,15 @@ export default function ScreenshotGallery({ screenshotCount }: Props) {
               </button>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="col-span-3 py-1.5 text-xs text-gray-400 hover:text-white disabled:opacity-50 transition-colors"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       )}
 
@@ -110,7 +137,7 @@ export default function ScreenshotGallery({ screenshotCount }: Props) {
         {lightbox !== null && shots[lightbox] && (
           <div className="space-y-3">
             <img
-              src={`/api/screenshots/${shots[lightbox].name}`}
+              src={screenshotUrl(shots[lightbox].name)}
               alt={shots[lightbox].name}
               className="w-full rounded-lg"
             />
@@ -136,7 +163,7 @@ export default function ScreenshotGallery({ screenshotCount }: Props) {
                   </svg>
                 </button>
                 <a
-                  href={`/api/screenshots/${shots[lightbox].name}`}
+                  href={screenshotUrl(shots[lightbox].name)}
                   download={shots[lightbox].name}
                   className="p-1 text-gray-500 hover:text-accent transition-colors"
                 >
@@ -77,6 +77,36 @@ export default function SettingsPanel({ settings, onUpdate }: Props) {
         </div>
       </div>
 
+      {/* Tracker */}
+      <div>
+        <span className="text-sm text-gray-300 flex items-center gap-1.5 mb-1">
+          Tracker
+          <Tooltip text="ByteTrack keeps IDs best in crowds. SORT is lighter, for low-power machines and simple scenes. Switching starts new IDs.">
+            <svg className="w-3.5 h-3.5 text-gray-500 cursor-help" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth={2}>
+              <path strokeLinecap="round" strokeLinejoin="round" d="M8.228 9c.549-1.165 2.03-2 3.772-2 2.21 0 4 1.343 4 3 0 1.4-1.278 2.575-3.006 2.907-.542.104-.994.54-.994 1.093m0 3h.01M21 12a9 9 0 11-18 0 9 9 0 0118 0z" />
+            </svg>
+          </Tooltip>
+        </span>
+        <div className="flex gap-2">
+          {([
+            { label: "ByteTrack", value: "bytetrack" },
+            { label: "SORT (light)", value: "sort" },
+          ] as const).map((t) => (
+            <button
+              key={t.value}
+              onClick={() => onUpdate({ tracker: t.value })}
+              className={`flex-1 text-xs py-1.5 rounded-lg border transition-colors ${
+                settings.tracker === t.value
+                  ? "border-accent/40 bg-accent/10 text-accent"
+                  : "border-gray-700 text-gray-400 hover:border-gray-600"
+              }`}
+            >
+              {t.label}
+            </button>
+          ))}
+        </div>
+      </div>
+
       {/* Display toggles */}
       <div>
         <ToggleSwitch
@@ -6,10 +6,16 @@ const DEFAULT_SETTINGS: Settings = {
   confidence: 0.45,
   camera_index: 0,
   model_name: "yolov8n.pt",
+  model_loading: false,
   show_labels: true,
   show_confidence: true,
   face_recognition_enabled: false,
   face_recognition_tolerance: 0.6,
+  record_min_people: 0,
+  record_raw: false,
+  tracker: "bytetrack",
+  watch_fps: 2,
+  idle_timeout: 300,
 };
 
 export function useSettings() {
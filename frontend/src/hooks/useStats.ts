@@ -10,6 +10,9 @@ const DEFAULT_STATS: Stats = {
   screenshots: 0,
   running: false,
   paused: false,
+  state: "stopped",
+  zones: [],
+  lines: [],
 };
 
 export function useStats(intervalMs = 500): Stats {
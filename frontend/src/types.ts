@@ -6,16 +6,40 @@ export interface Stats {
   screenshots: number;
   running: boolean;
   paused: boolean;
+  state: "stopped" | "running" | "watching" | "paused" | "idle";
+  zones: ZoneStats[];
+  lines: LineStats[];
+}
+
+export interface ZoneStats {
+  name: string;
+  occupancy: number;
+  entered: number;
+  exited: number;
+  avg_dwell: number;
+  max_dwell: number;
+}
+
+export interface LineStats {
+  name: string;
+  in: number;
+  out: number;
 }
 
 export interface Settings {
   confidence: number;
   camera_index: number;
   model_name: string;
+  model_loading: boolean;
   show_labels: boolean;
   show_confidence: boolean;
   face_recognition_enabled: boolean;
   face_recognition_tolerance: number;
+  record_min_people: number;
+  record_raw: boolean;
+  tracker: "bytetrack" | "sort";
+  watch_fps: number;
+  idle_timeout: number;
 }
 
 export interface Screenshot {
@@ -23,6 +47,12 @@ export interface Screenshot {
   size: number;
 }
 
+export interface ScreenshotPage {
+  items: Screenshot[];
+  next_cursor: string | null;
+  total: number;
+}
+
 export interface FacePerson {
   name: string;
   sample_count: number;
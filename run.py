@@ -83,6 +83,7 @@ def start_server() -> None:
     print()
     print(f"  App is running at http://{host}:{port}")
     print(f"  Your browser should open automatically.")
+    print(f"  The detection model finishes loading in the background.")
     print()
     print(f"  Press Ctrl+C to stop.")
     print()
@@ -102,13 +103,10 @@ def main() -> None:
     install_and_build_frontend()
     ensure_model()
 
-    status("Loading detection model...  ", end="")
-    # force-import so the model loads before we say "done"
-    from backend.detector import DetectionEngine
-    DetectionEngine()
-    print("done")
     print()
 
+    # the server starts listening at once; the model loads and warms up in
+    # the background (progress at /api/health)
     start_server()
 
 
@@ -21,8 +21,9 @@ def main() -> None:
     print("  ======================================")
     print()
 
-    status("Loading detection model...  ", end="")
-    # This import triggers model load inside DetectionEngine.__init__
+    status("Loading application...  ", end="")
+    # cheap: the detection model loads in the background once the server
+    # is up (progress at /api/health)
     from backend.app import app  # noqa: F811
     print("done")
 
@@ -39,6 +40,7 @@ def main() -> None:
     print()
     print(f"  App is running at http://{host}:{port}")
     print(f"  Your browser should open automatically.")
+    print(f"  The detection model finishes loading in the background.")
     print()
     print(f"  Close this window to stop the application.")
     print()
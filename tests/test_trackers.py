@@ -0,0 +1,46 @@
+"""Trackers keep their own track IDs when several run in one process."""
+
+import importlib.util
+
+import numpy as np
+import pytest
+
+from backend.trackers import make_tracker
+
+
+def _has_bytetrack() -> bool:
+    try:
+        return importlib.util.find_spec("ultralytics.trackers.byte_tracker") is not None
+    except ImportError:
+        return False
+
+
+_SHAPE = (480, 640, 3)
+
+
+def _box(x: float, y: float) -> list[float]:
+    return [x, y, x + 40, y + 100, 0.9]
+
+
+def _ids(tracks: np.ndarray) -> set[int]:
+    return {int(t) for t in tracks[:, 4]}
+
+
+@pytest.mark.parametrize("name", [
+    pytest.param("bytetrack", marks=pytest.mark.skipif(not _has_bytetrack(), reason="needs ultralytics")),
+    "sort",
+])
+def test_interleaved_trackers_keep_separate_ids(name):
+    first = make_tracker(name, fps=30)
+    first_ids: set[int] = set()
+    for _ in range(5):
+        first_ids |= _ids(first.update([_box(50, 50), _box(300, 50)], _SHAPE))
+    assert first_ids == {1, 2}
+
+    # a second source starting up must not reset or share the first one's IDs
+    second = make_tracker(name, fps=30)
+    for step in range(5):
+        second.update([_box(100, 200)], _SHAPE)
+        tracks = first.update([_box(50, 50), _box(300, 50), _box(500, 300 + step)], _SHAPE)
+        first_ids |= _ids(tracks)
+    assert first_ids == {1, 2, 3}